@@ -0,0 +1,311 @@
+"""HTTP API load benchmark.
+
+Runs `ApiService` in-process under uvicorn, next to an AudioEngine fed by a
+synthetic capture thread at real-time block cadence, while a separate load
+process hammers `/api/status`, `/api/devices` and `PATCH /api/config` from
+keep-alive clients. For each concurrency level it reports requests/sec and
+latency percentiles, plus how the synthetic callback fared: its duration,
+how late it started, and xruns (blocks finished more than one period after
+they were due, which a real capture buffer would have overrun).
+
+Results can be saved as a baseline and later runs checked against it; any
+regression exits with status 1.
+
+Usage: python benchmarks/api_load.py [--clients 1,4,16] [--seconds 10]
+           [--baseline benchmarks/baselines/api_load.json] [--save-baseline] [--tolerance 0.2]
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import uvicorn
+
+from ondepi.api import ApiService
+from ondepi.audio import AudioEngine
+from ondepi.config import JournalConfig, load_config, save_config
+from ondepi.journal import EventJournal
+from ondepi.state import StreamState
+from ondepi.streamer import Streamer
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baselines" / "api_load.json"
+# Request mix per client, cycled: mostly dashboard polls, some device scans and config edits.
+MIX = ["status"] * 7 + ["devices"] + ["config"] * 2
+
+
+class SyntheticEngine(AudioEngine):
+    """AudioEngine that never opens a device; SyntheticCapture drives its callback."""
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class SyntheticCapture:
+    """Calls the engine's audio callback on a real-time grid and times every call."""
+
+    def __init__(self, engine: AudioEngine, sample_rate: int, block: int, channels: int) -> None:
+        self._engine = engine
+        self._block = block
+        self._period = block / sample_rate
+        rng = np.random.default_rng(0)
+        self._audio = (rng.standard_normal((block, channels)) * 0.1).astype(np.float32)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.reset()
+
+    def reset(self) -> None:
+        self.durations: list[float] = []
+        self.lateness: list[float] = []
+        self.xruns = 0
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="synthetic-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _run(self) -> None:
+        due = time.perf_counter()
+        while not self._stop.is_set():
+            due += self._period
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            started = time.perf_counter()
+            self._engine._callback(self._audio, self._block, None, None)
+            finished = time.perf_counter()
+            self.durations.append(finished - started)
+            self.lateness.append(max(started - due, 0.0))
+            if finished - due > self._period:
+                self.xruns += 1
+                missed = int((finished - due) / self._period)
+                due += missed * self._period  # a device would have dropped these blocks
+
+    def report(self) -> dict:
+        return {
+            "blocks": len(self.durations),
+            "callback_p50_ms": _ms(_percentile(self.durations, 50)),
+            "callback_p99_ms": _ms(_percentile(self.durations, 99)),
+            "callback_max_ms": _ms(max(self.durations, default=0.0)),
+            "lateness_p99_ms": _ms(_percentile(self.lateness, 99)),
+            "lateness_max_ms": _ms(max(self.lateness, default=0.0)),
+            "xruns": self.xruns,
+        }
+
+
+def generate_load(port: int, clients: int, seconds: float) -> dict:
+    """Runs in the load process: `clients` keep-alive connections for `seconds`."""
+    results: dict[str, list] = {name: [] for name in set(MIX)}
+    errors: dict[str, int] = {name: 0 for name in set(MIX)}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client(index: int) -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        latencies: dict[str, list] = {name: [] for name in set(MIX)}
+        failed = {name: 0 for name in set(MIX)}
+        step = index
+        while time.perf_counter() < deadline:
+            name = MIX[step % len(MIX)]
+            step += 1
+            started = time.perf_counter()
+            try:
+                status = _request(conn, name, step)
+            except (OSError, http.client.HTTPException):
+                # The server may have dropped the keep-alive socket (it does after a 500):
+                # retry once on a fresh one, as ApiConnection does, so this endpoint is not blamed.
+                conn.close()
+                try:
+                    status = _request(conn, name, step)
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    status = 0
+            elapsed = time.perf_counter() - started
+            if 200 <= status < 300:
+                latencies[name].append(elapsed)
+            else:
+                failed[name] += 1
+        conn.close()
+        with lock:
+            for name in latencies:
+                results[name] += latencies[name]
+                errors[name] += failed[name]
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"elapsed": time.perf_counter() - started, "latencies": results, "errors": errors}
+
+
+def _request(conn: http.client.HTTPConnection, name: str, step: int) -> int:
+    if name == "status":
+        conn.request("GET", "/api/status")
+    elif name == "devices":
+        conn.request("GET", "/api/devices")
+    else:
+        body = json.dumps({"metadata": {"track": f"load test {step}"}})
+        conn.request("PATCH", "/api/config", body=body, headers={"Content-Type": "application/json"})
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def run(clients_levels: list[int], seconds: float, sample_rate: int, block: int) -> dict:
+    os.chdir(ROOT)  # the web UI is served from ./web
+    with tempfile.TemporaryDirectory() as tmp:
+        config = load_config(ROOT / "config.example.toml", validate=False)  # valid, so PATCH is accepted
+        config.input.sample_rate = sample_rate
+        config_path = Path(tmp) / "config.toml"
+        save_config(config, config_path)
+        state = StreamState()
+        journal = EventJournal(JournalConfig())
+        engine = SyntheticEngine(config.input, state, journal=journal)
+        api = ApiService(
+            config,
+            state,
+            Streamer(config, state, journal=journal),
+            audio_engine=engine,
+            config_path=str(config_path),
+            journal=journal,
+        )
+        server = uvicorn.Server(uvicorn.Config(api.app, host="127.0.0.1", port=0, log_level="warning"))
+        threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+        while not server.started:
+            time.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        capture = SyntheticCapture(engine, sample_rate, block, config.input.channels)
+        capture.start()
+        scenarios = []
+        try:
+            with ProcessPoolExecutor(max_workers=1) as load:
+                load.submit(generate_load, port, 1, 0.5).result()  # warm up imports and routes
+                for clients in [0, *clients_levels]:
+                    capture.reset()
+                    if clients:
+                        outcome = load.submit(generate_load, port, clients, seconds).result()
+                    else:
+                        time.sleep(seconds)
+                        outcome = {"elapsed": seconds, "latencies": {}, "errors": {}}
+                    scenarios.append({"clients": clients, **_summarize(outcome), "audio": capture.report()})
+        finally:
+            capture.stop()
+            server.should_exit = True
+    return {
+        "host": {"machine": platform.machine(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "sample_rate": sample_rate,
+        "block": block,
+        "seconds": seconds,
+        "scenarios": scenarios,
+    }
+
+
+def _summarize(outcome: dict) -> dict:
+    latencies = outcome["latencies"]
+    every = [value for values in latencies.values() for value in values]
+    return {
+        "requests_per_second": round(len(every) / outcome["elapsed"], 1) if every else 0.0,
+        "p50_ms": _ms(_percentile(every, 50)),
+        "p99_ms": _ms(_percentile(every, 99)),
+        "errors": sum(outcome["errors"].values()),
+        "endpoints": {
+            name: {
+                "requests": len(values),
+                "p99_ms": _ms(_percentile(values, 99)),
+                "errors": outcome["errors"].get(name, 0),
+            }
+            for name, values in sorted(latencies.items())
+        },
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of `report` against `baseline`, matched by client count."""
+    previous = {scenario["clients"]: scenario for scenario in baseline.get("scenarios", [])}
+    regressions = []
+    for scenario in report["scenarios"]:
+        base = previous.get(scenario["clients"])
+        if base is None:
+            continue
+        label = f"{scenario['clients']} clients"
+        if scenario["requests_per_second"] < base["requests_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: {scenario['requests_per_second']} req/s < baseline {base['requests_per_second']}"
+            )
+        if base["p99_ms"] and scenario["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p99 {scenario['p99_ms']} ms > baseline {base['p99_ms']} ms")
+        if scenario["audio"]["xruns"] > base["audio"]["xruns"]:
+            regressions.append(f"{label}: {scenario['audio']['xruns']} xruns > baseline {base['audio']['xruns']}")
+        if scenario["audio"]["callback_p99_ms"] > base["audio"]["callback_p99_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{label}: callback p99 {scenario['audio']['callback_p99_ms']} ms"
+                f" > baseline {base['audio']['callback_p99_ms']} ms"
+            )
+    return regressions
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OndePi HTTP API load benchmark")
+    parser.add_argument("--clients", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each level")
+    parser.add_argument("--sample-rate", type=int, default=44100)
+    parser.add_argument("--block", type=int, default=1024)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    levels = [int(item) for item in args.clients.split(",") if item]
+    report = run(levels, args.seconds, args.sample_rate, args.block)
+    print(json.dumps(report, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"baseline saved to {baseline_path}", file=sys.stderr)
+        return
+    if not baseline_path.exists():
+        return
+    baseline = json.loads(baseline_path.read_text())
+    if baseline.get("host") != report["host"]:
+        print(f"note: baseline was recorded on {baseline.get('host')}", file=sys.stderr)
+    regressions = compare(report, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
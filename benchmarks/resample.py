@@ -0,0 +1,54 @@
+"""Resampler CPU benchmark.
+
+Streams one minute of stereo noise through each quality preset in
+callback-sized blocks and reports CPU milliseconds per second of audio (and
+the equivalent share of one core).
+
+Usage: python benchmarks/resample.py [--in-rate 48000] [--out-rate 44100] [--block 1024]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from ondepi.resample import QUALITY_PRESETS, PolyphaseResampler
+
+SECONDS = 60
+
+
+def measure(in_rate: int, out_rate: int, block: int, quality: str) -> dict:
+    rng = np.random.default_rng(0)
+    audio = (rng.standard_normal((in_rate * SECONDS, 2)) * 0.1).astype(np.float32)
+    resampler = PolyphaseResampler(in_rate, out_rate, 2, quality)
+    started = time.process_time()
+    for index in range(0, audio.shape[0], block):
+        resampler.process(audio[index : index + block])
+    cpu = time.process_time() - started
+    return {
+        "quality": quality,
+        "taps": resampler.taps,
+        "cpu_ms_per_audio_second": round(cpu / SECONDS * 1000, 3),
+        "core_percent": round(cpu / SECONDS * 100, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OndePi resampler benchmark")
+    parser.add_argument("--in-rate", type=int, default=48000)
+    parser.add_argument("--out-rate", type=int, default=44100)
+    parser.add_argument("--block", type=int, default=1024)
+    args = parser.parse_args()
+    report = {
+        "in_rate": args.in_rate,
+        "out_rate": args.out_rate,
+        "block": args.block,
+        "results": [measure(args.in_rate, args.out_rate, args.block, quality) for quality in QUALITY_PRESETS],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Cold-start benchmark for OndePi.
+
+Measures, in milliseconds:
+- import time of the main modules, each in a fresh interpreter;
+- `ondepi --check-config` wall time;
+- startup milestones of a real `ondepi` process (HTTP listening, audio stack
+  imported, first audio block) as reported by `/api/status`.
+
+Usage: python benchmarks/startup.py --config config.toml [--port 18090] [--timeout 20]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+from ondepi.config import load_config, save_config
+
+ROOT = Path(__file__).resolve().parents[1]
+MODULES = ["ondepi.config", "ondepi.main", "ondepi.api", "ondepi.audio", "sounddevice"]
+
+
+def import_ms(module: str) -> float | None:
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; print((time.perf_counter() - start) * 1000)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return round(float(result.stdout.strip()), 1)
+
+
+def check_config_ms(config: Path) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "ondepi.main", "--config", str(config), "--check-config"],
+        capture_output=True,
+    )
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def server_milestones(config: Path, port: int, timeout: float) -> dict:
+    app_config = load_config(config, validate=False)
+    app_config.web.bind = "127.0.0.1"
+    app_config.web.port = port
+
+    with tempfile.TemporaryDirectory() as tmp:
+        run_config = Path(tmp) / "config.toml"
+        save_config(app_config, run_config)
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "ondepi.main", "--config", str(run_config)],
+            cwd=ROOT,  # the web UI is served from ./web
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        first_response_ms = None
+        marks: dict = {}
+        try:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                try:
+                    url = f"http://127.0.0.1:{port}/api/status"
+                    with urllib.request.urlopen(url, timeout=1) as response:  # nosec - local usage
+                        payload = json.loads(response.read().decode("utf-8"))
+                    if first_response_ms is None:
+                        first_response_ms = round((time.perf_counter() - started) * 1000, 1)
+                    marks = payload.get("startup", {})
+                    if "first_audio" in marks:
+                        break
+                except OSError:
+                    pass
+                time.sleep(0.05)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    return {"first_http_response_ms": first_response_ms, "milestones_ms": marks}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OndePi startup benchmark")
+    parser.add_argument("--config", default="config.toml")
+    parser.add_argument("--port", type=int, default=18090)
+    parser.add_argument("--timeout", type=float, default=20.0)
+    args = parser.parse_args()
+
+    config = Path(args.config)
+    report = {
+        "imports_ms": {module: import_ms(module) for module in MODULES},
+        "check_config_ms": check_config_ms(config),
+        **server_milestones(config, args.port, args.timeout),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
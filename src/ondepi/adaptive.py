@@ -0,0 +1,83 @@
+"""Adaptive bitrate: step the encoder down a bitrate ladder when the uplink congests.
+
+On a slow uplink ffmpeg's send buffer fills, its encode speed drops below
+real time and PCM backs up in the pipe queue. The ladder steps down one rung
+after `down_after_seconds` of that, and back up one rung only after a longer
+`up_after_seconds` of clearly healthy readings, so a link hovering at the
+threshold does not flap between two bitrates.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+from .config import AdaptiveBitrateConfig
+
+# Readings count as healthy (for stepping back up) only well clear of the down thresholds.
+RECOVER_SPEED = 0.99  # a live input caps encode speed at ~1.0x
+RECOVER_BACKLOG_FRACTION = 0.25
+
+
+@dataclass
+class BitrateStep:
+    from_kbps: int
+    to_kbps: int
+    reason: str  # "congested" or "recovered"
+    speed: Optional[float]
+    backlog_blocks: int
+    sustained_seconds: float
+
+
+class BitrateLadder:
+    """Decides bitrate steps from encoder speed and PCM backlog readings."""
+
+    def __init__(self, config: AdaptiveBitrateConfig, ceiling_kbps: int) -> None:
+        self._config = config
+        # Highest first; never above the configured stream bitrate.
+        self.rungs = [ceiling_kbps] + sorted({step for step in config.ladder_kbps if step < ceiling_kbps}, reverse=True)
+        self._index = 0
+        self._congested_since: Optional[float] = None
+        self._healthy_since: Optional[float] = None
+
+    @property
+    def bitrate_kbps(self) -> int:
+        return self.rungs[self._index]
+
+    def hold(self) -> None:
+        """Forget partial evidence, e.g. when a new encoder starts."""
+        self._congested_since = self._healthy_since = None
+
+    def observe(self, now: float, speed: Optional[float], backlog_blocks: int) -> Optional[BitrateStep]:
+        """Feed one reading; returns the step to take, if any."""
+        config = self._config
+        congested = backlog_blocks >= config.max_backlog_blocks or (speed is not None and speed < config.min_speed)
+        healthy = (speed is None or speed >= RECOVER_SPEED) and (
+            backlog_blocks <= config.max_backlog_blocks * RECOVER_BACKLOG_FRACTION
+        )
+        if congested:
+            self._healthy_since = None
+            if self._congested_since is None:
+                self._congested_since = now
+            sustained = now - self._congested_since
+            if sustained >= config.down_after_seconds and self._index < len(self.rungs) - 1:
+                return self._step(self._index + 1, "congested", speed, backlog_blocks, sustained)
+        elif healthy:
+            self._congested_since = None
+            if self._healthy_since is None:
+                self._healthy_since = now
+            sustained = now - self._healthy_since
+            if sustained >= config.up_after_seconds and self._index > 0:
+                return self._step(self._index - 1, "recovered", speed, backlog_blocks, sustained)
+        else:
+            # Between the thresholds: neither direction accumulates.
+            self._congested_since = self._healthy_since = None
+        return None
+
+    def _step(
+        self, index: int, reason: str, speed: Optional[float], backlog_blocks: int, sustained: float
+    ) -> BitrateStep:
+        step = BitrateStep(self.bitrate_kbps, self.rungs[index], reason, speed, backlog_blocks, round(sustained, 2))
+        self._index = index
+        self._congested_since = self._healthy_since = None
+        return step
+
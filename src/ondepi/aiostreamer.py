@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Optional
+
+from .azuracast import AzuraCastClient
+from .config import AppConfig
+from .journal import EventJournal
+from .reconnect import PROBE_INTERVAL_SECONDS, probe_server_async
+from .state import StreamState, Subscription
+from .streamer import (
+    PCM_QUEUE_BLOCKS,
+    SPAN_PROBE_WAIT,
+    SPAN_RETRY_SLEEP,
+    SPAN_SPAWN,
+    StreamProcess,
+    Streamer,
+    _gain_command,
+    _note_progress,
+    _note_stderr,
+    _stall_idle,
+)
+from .trace import TRACER, now_ns
+
+if TYPE_CHECKING:
+    from .audio import AudioEngine
+
+CONTROL_TIMEOUT_SECONDS = 15.0
+TERMINATE_TIMEOUT_SECONDS = 5.0
+PCM_POLL_SECONDS = 0.01
+DEFAULT_BLOCK_FRAMES = 1024  # sizes the PCM ring when the driver picks the block size
+
+_control_loop: Optional[asyncio.AbstractEventLoop] = None
+_control_lock = threading.Lock()
+
+
+def control_loop() -> asyncio.AbstractEventLoop:
+    """Shared event loop for streamers not bound to the web server's loop.
+
+    Runs in one daemon thread however many streams use it.
+    """
+    global _control_loop
+    with _control_lock:
+        if _control_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="ondepi-control", daemon=True).start()
+            _control_loop = loop
+        return _control_loop
+
+
+class PcmRing:
+    """Bounded single-producer/single-consumer byte ring for encoder PCM.
+
+    The audio thread copies each block into a preallocated buffer and then
+    advances a counter; it never takes a lock, allocates or wakes the event
+    loop. A loop task polls `take()`.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._buffer = memoryview(bytearray(capacity))
+        self._written = 0  # advanced by the producer only
+        self._read = 0  # advanced by the consumer only
+        self._blocks_in = 0
+        self._blocks_out = 0
+
+    def put_nowait(self, chunk) -> bool:  # noqa: ANN001
+        """Copy one block in; False (and nothing copied) when it does not fit."""
+        data = memoryview(chunk.astype("float32", order="C", copy=False)).cast("B")
+        size = len(data)
+        capacity = len(self._buffer)
+        if self._written - self._read + size > capacity:
+            return False
+        start = self._written % capacity
+        first = min(size, capacity - start)
+        self._buffer[start : start + first] = data[:first]
+        self._buffer[: size - first] = data[first:]
+        self._written += size  # publish only after the bytes are in place
+        self._blocks_in += 1
+        return True
+
+    def take(self) -> bytes:
+        """Everything queued so far, oldest first."""
+        blocks = self._blocks_in
+        end = self._written
+        capacity = len(self._buffer)
+        start = self._read % capacity
+        size = end - self._read
+        if start + size <= capacity:
+            data = bytes(self._buffer[start : start + size])
+        else:
+            data = bytes(self._buffer[start:]) + bytes(self._buffer[: start + size - capacity])
+        self._read = end
+        self._blocks_out = blocks
+        return data
+
+    def qsize(self) -> int:
+        return max(self._blocks_in - self._blocks_out, 0)
+
+    def empty(self) -> bool:
+        return self._written == self._read
+
+
+@dataclass
+class AsyncStreamProcess(StreamProcess):
+    pcm: PcmRing = field(default_factory=lambda: PcmRing(PCM_QUEUE_BLOCKS * DEFAULT_BLOCK_FRAMES * 2 * 4))
+    readers: list[asyncio.Task] = field(default_factory=list)
+    workers: list[asyncio.Task] = field(default_factory=list)
+
+
+class AsyncStreamer(Streamer):
+    """Streamer whose lifecycle runs as tasks on a single asyncio event loop.
+
+    One supervisor task per stream owns spawn, wait, classify, backoff and
+    respawn. `stop()` cancels it wherever it is (waiting on ffmpeg, in a
+    backoff sleep or probing the server), so start/stop/retry are ordered by
+    the loop instead of racing between threads. Pipe I/O, metadata pushes,
+    backoff and the stall watchdog are tasks on the same loop rather than
+    threads per stream (Python < 3.12 may still use a helper thread to reap
+    each child).
+
+    The sync `start()`/`stop()` may be called from any thread except the loop's
+    own; code running on the loop awaits `start_async()`/`stop_async()`.
+    """
+
+    def __init__(
+        self,
+        config: AppConfig,
+        state: StreamState,
+        azuracast: Optional[AzuraCastClient] = None,
+        audio_engine: Optional[AudioEngine] = None,
+        journal: Optional[EventJournal] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        super().__init__(config, state, azuracast=azuracast, audio_engine=audio_engine, journal=journal)
+        self._loop = loop
+        self._supervisor: Optional[asyncio.Task] = None
+        self._metadata_task: Optional[asyncio.Task] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Run on `loop` (e.g. uvicorn's) from now on; ignored while a stream is active."""
+        if not self._active():
+            self._loop = loop
+
+    def start(self) -> None:
+        self._call(self.start_async())
+
+    def stop(self) -> None:
+        self._call(self.stop_async())
+
+    async def start_async(self) -> None:
+        if self._active():
+            return
+        self._stop_requested = False
+        self._state.update(retry_count=0, last_retry_at=None, last_exit_code=None, last_exit_class=None)
+        session = await self._spawn_encoder(is_retry=False)  # spawn errors reach the caller
+        self._supervisor = asyncio.create_task(self._supervise(session))
+
+    async def stop_async(self) -> None:
+        self._stop_requested = True
+        supervisor = self._supervisor
+        if supervisor is None or supervisor.done():
+            return
+        supervisor.cancel()
+        await asyncio.wait({supervisor})
+
+    def _active(self) -> bool:
+        return self._supervisor is not None and not self._supervisor.done()
+
+    def _call(self, coro: Coroutine[Any, Any, None]) -> None:
+        if self._loop is None:
+            self._loop = control_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            coro.close()
+            raise RuntimeError("called on the streamer's event loop; await start_async()/stop_async()")
+        asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout=CONTROL_TIMEOUT_SECONDS)
+
+    async def _supervise(self, session: AsyncStreamProcess) -> None:
+        try:
+            while True:
+                exit_code = await self._wait_session(session)
+                if self._stop_requested:
+                    return
+                plan = self._plan_retry(session, exit_code)
+                if plan is None:
+                    return
+                policy, delay = plan
+                self._retrying = True
+                try:
+                    started = now_ns()
+                    await asyncio.sleep(delay)
+                    if TRACER.enabled:
+                        started = TRACER.span(SPAN_RETRY_SLEEP, started)
+                    if policy.probe and self._config.general.preflight_probe:
+                        await self._wait_for_server_async()
+                        if TRACER.enabled:
+                            TRACER.span(SPAN_PROBE_WAIT, started)
+                finally:
+                    self._retrying = False
+                try:
+                    session = await self._spawn_encoder(is_retry=True)
+                except (OSError, ValueError) as exc:
+                    self._state.update(last_error=f"encoder restart failed: {exc}")
+                    return
+        except asyncio.CancelledError:
+            await self._terminate()
+            raise
+
+    async def _spawn_encoder(self, is_retry: bool) -> AsyncStreamProcess:
+        started = now_ns()
+        offload = self._offload_dsp()
+        gain_updates = self._subscribe_gain() if offload else None
+        meter_read, meter_write = os.pipe() if offload else (None, None)
+        try:
+            command = self.build_ffmpeg_command(meter_write)
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                stdin=asyncio.subprocess.PIPE if self._audio_engine or offload else None,
+                pass_fds=(meter_write,) if offload else (),
+            )
+        except BaseException:
+            if offload:
+                gain_updates.close()
+                os.close(meter_read)
+            raise
+        finally:
+            if offload:
+                os.close(meter_write)
+        input_cfg = self._config.input
+        block_bytes = (input_cfg.blocksize or DEFAULT_BLOCK_FRAMES) * input_cfg.channels * 4
+        session = AsyncStreamProcess(
+            command=command, process=process, offload=offload, pcm=PcmRing(PCM_QUEUE_BLOCKS * block_bytes)
+        )
+        self._on_spawned(session, is_retry)
+        if TRACER.enabled:
+            TRACER.span(SPAN_SPAWN, started)
+        session.readers += [
+            asyncio.create_task(self._read_pipe(process.stdout, session, _note_progress)),
+            asyncio.create_task(self._read_pipe(process.stderr, session, _note_stderr)),
+        ]
+        if offload:
+            meter = asyncio.StreamReader()
+            loop = asyncio.get_running_loop()
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(meter), open(meter_read, "rb"))
+            session.readers.append(asyncio.create_task(self._read_pipe(meter, session, self._note_meter)))
+            session.workers.append(asyncio.create_task(self._push_gain_async(session, gain_updates)))
+        if self._audio_engine and process.stdin and not offload:
+            session.workers.append(asyncio.create_task(self._write_pcm_async(session)))
+            self._audio_consumer = self._build_audio_consumer(session)
+            self._audio_engine.add_consumer(self._audio_consumer)
+        if self._config.general.stall_timeout_seconds > 0:
+            session.workers.append(asyncio.create_task(self._watch_stall_async(session)))
+        if self._azuracast:
+            await asyncio.to_thread(self._azuracast.update_streamer_metadata, self._config.metadata)
+            if self._metadata_task is None or self._metadata_task.done():
+                self._metadata_task = asyncio.create_task(self._metadata_loop_async())
+        return session
+
+    async def _wait_session(self, session: AsyncStreamProcess) -> Optional[int]:
+        exit_code = await session.process.wait()
+        await self._end_session(session)
+        self._state.update(streaming=False, last_exit_code=exit_code)
+        return exit_code
+
+    async def _end_session(self, session: AsyncStreamProcess) -> None:
+        session.exited.set()
+        self._cleanup_audio()
+        if self._metadata_task:
+            self._metadata_task.cancel()
+            self._metadata_task = None
+        for task in session.workers:
+            task.cancel()
+        # Let the readers drain what ffmpeg wrote before exiting (the stderr tail classifies it).
+        _, pending = await asyncio.wait(session.readers, timeout=1)
+        for task in pending:
+            task.cancel()
+        self._process = None
+
+    async def _terminate(self) -> None:
+        session = self._process
+        if not isinstance(session, AsyncStreamProcess):
+            return
+        process = session.process
+        self._cleanup_audio()
+        if process.stdin:
+            process.stdin.close()  # EOF lets ffmpeg flush the last frames
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), TERMINATE_TIMEOUT_SECONDS)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+        await self._end_session(session)
+        self._state.update(streaming=False)
+        self._record("stream.stop", "stream stopped by request")
+        if self._azuracast:
+            await asyncio.to_thread(self._azuracast.update_streamer_metadata, self._config.metadata)
+
+    async def _wait_for_server_async(self) -> None:
+        reported = False
+        while True:
+            stream = self._config.stream
+            timeout = self._config.general.preflight_timeout_seconds
+            error = await probe_server_async(stream.server, stream.port, timeout)
+            if error is None:
+                return
+            message = f"{stream.server}:{stream.port} unreachable: {error}"
+            self._state.update(last_error=message)
+            if not reported:
+                self._record("stream.probe", message, error=error)
+                reported = True
+            await asyncio.sleep(PROBE_INTERVAL_SECONDS)
+
+    async def _metadata_loop_async(self) -> None:
+        while True:
+            metadata_cfg = self._config.metadata
+            if metadata_cfg.push_enabled and self._azuracast:
+                attempts = max(metadata_cfg.retry_attempts, 0)
+                for attempt in range(attempts + 1):
+                    if attempt:
+                        await asyncio.sleep(max(metadata_cfg.retry_delay_seconds, 0))
+                    error = await asyncio.to_thread(self._azuracast.update_streamer_metadata_safe, metadata_cfg)
+                    if not error:
+                        break
+                    self._state.update(last_error=f"metadata update failed: {error}")
+                    retry = {"retry": attempt} if attempt else {}
+                    self._record("metadata.error", f"metadata update failed: {error}", **retry)
+            await asyncio.sleep(metadata_cfg.push_interval_seconds)
+
+    def _build_audio_consumer(self, session: AsyncStreamProcess) -> Callable:
+        def _consumer(chunk):
+            # Runs on the audio thread: copy into the ring; the writer task polls it.
+            if not session.pcm.put_nowait(chunk):
+                session.dropped_blocks += 1
+
+        return _consumer
+
+    async def _write_pcm_async(self, session: AsyncStreamProcess) -> None:
+        stdin = session.process.stdin
+        assert stdin is not None
+        try:
+            while True:
+                data = session.pcm.take()
+                if not data:
+                    await asyncio.sleep(PCM_POLL_SECONDS)
+                    continue
+                session.write_started_at = time.monotonic()
+                stdin.write(data)
+                await stdin.drain()
+                session.bytes_accepted += len(data)
+                session.last_accept_at = time.monotonic()
+                session.write_started_at = None
+        except (ConnectionError, OSError):
+            if not self._stop_requested:
+                self._state.update(last_error="Audio pipeline broken")
+        finally:
+            session.write_started_at = None
+            stdin.close()
+
+    @staticmethod
+    async def _read_pipe(
+        pipe: Optional[asyncio.StreamReader],
+        session: AsyncStreamProcess,
+        note: Callable[[StreamProcess, bytes], None],
+    ) -> None:
+        if pipe is None:
+            return
+        while raw := await pipe.readline():
+            note(session, raw)
+
+    async def _push_gain_async(self, session: AsyncStreamProcess, updates: Subscription) -> None:
+        stdin = session.process.stdin
+        assert stdin is not None
+        with updates:
+            while (snapshot := await updates.next()) is not None:
+                try:
+                    stdin.write(_gain_command(snapshot.gain_db))
+                    await stdin.drain()
+                except (OSError, RuntimeError):
+                    return  # ffmpeg exited
+
+    async def _watch_stall_async(self, session: AsyncStreamProcess) -> None:
+        timeout = self._config.general.stall_timeout_seconds
+        interval = min(0.5, timeout / 4)
+        while True:
+            await asyncio.sleep(interval)
+            idle = _stall_idle(session, timeout)
+            if idle is not None:
+                self._on_stall(session, idle, timeout)
+                return
+
+    def _cleanup_audio(self) -> None:
+        if self._audio_engine and self._audio_consumer:
+            self._audio_engine.remove_consumer(self._audio_consumer)
+            self._audio_consumer = None
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from .audio import AudioEngine
+from .config import AnalysisConfig, InputConfig
+
+MIN_BAND_HZ = 30.0
+# Anti-alias filter: pass up to 80% of the decimated Nyquist, ~80 dB down from it on.
+LOWPASS_TAPS_PER_STEP = 48
+LOWPASS_CUTOFF = 0.45  # of the decimated sample rate
+LOWPASS_KAISER_BETA = 8.0
+
+
+@dataclass
+class _Layout:
+    """Everything derived from the analysis config, swapped as one on a config change."""
+
+    config: AnalysisConfig
+    step: int
+    taps: np.ndarray  # reversed low-pass kernel, empty without decimation
+    window: np.ndarray
+    edges: np.ndarray
+    band_hz: np.ndarray
+    ring: np.ndarray
+    write_index: int = 0
+    pending: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.float32))  # filter history
+
+
+class SpectrumAnalyzer:
+    """Spectrum and waveform frames computed off the audio thread.
+
+    The audio callback only writes a decimated mono copy into a ring buffer,
+    low-passed first by a windowed-sinc FIR so content above the reduced
+    Nyquist does not fold into the bands. A worker thread runs the windowed
+    FFT at a fixed rate and keeps the latest frames as compact uint8 payloads
+    ready to serve.
+    """
+
+    def __init__(
+        self,
+        config: AnalysisConfig,
+        input_cfg: InputConfig,
+        audio_engine: Optional[AudioEngine] = None,
+    ) -> None:
+        self._config = config
+        self._input_cfg = input_cfg
+        self._audio_engine = audio_engine
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._layout = _build_layout(config, input_cfg)
+        self._spectrum = bytes(len(self._layout.band_hz) - 1)
+        self._waveform = bytes(config.waveform_points * 2)
+        self._seq = 0
+        self._compute_seconds = 0.0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if self._audio_engine:
+            self._audio_engine.add_consumer(self.consume)
+
+    def stop(self) -> None:
+        if self._audio_engine:
+            self._audio_engine.remove_consumer(self.consume)
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def update_config(self, config: AnalysisConfig, input_cfg: InputConfig) -> None:
+        if config == self._config and input_cfg == self._input_cfg:
+            return
+        layout = _build_layout(config, input_cfg)
+        self._spectrum = bytes(len(layout.band_hz) - 1)
+        self._waveform = bytes(config.waveform_points * 2)
+        # One reference swap; the callback and worker each read the layout once per pass.
+        self._layout = layout
+        self._config = config
+        self._input_cfg = input_cfg
+
+    def consume(self, chunk: np.ndarray) -> None:
+        layout = self._layout
+        mono = chunk.mean(axis=1) if chunk.ndim == 2 else chunk
+        if layout.step > 1:
+            samples = _decimate(layout, mono.astype(np.float32, copy=False))
+        else:
+            samples = mono
+        ring = layout.ring
+        size = len(ring)
+        samples = samples[-size:]
+        start = layout.write_index % size
+        end = start + len(samples)
+        if end <= size:
+            ring[start:end] = samples
+        else:
+            split = size - start
+            ring[start:] = samples[:split]
+            ring[: end - size] = samples[split:]
+        layout.write_index += len(samples)
+
+    def spectrum(self) -> bytes:
+        return self._spectrum
+
+    def waveform(self) -> bytes:
+        return self._waveform
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def layout(self) -> dict:
+        layout = self._layout
+        return {
+            "bands": len(layout.band_hz) - 1,
+            "band_edges_hz": [round(float(value), 1) for value in layout.band_hz],
+            "waveform_points": layout.config.waveform_points,
+            "update_hz": layout.config.update_hz,
+            "min_db": layout.config.min_db,
+        }
+
+    def status(self) -> dict:
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "seq": self._seq,
+            "compute_ms": self._compute_seconds * 1000,
+        }
+
+    @staticmethod
+    def _latest(layout: _Layout, count: int) -> np.ndarray:
+        size = len(layout.ring)
+        end = layout.write_index % size
+        indices = (np.arange(end - count, end)) % size
+        return layout.ring[indices]
+
+    def _run(self) -> None:
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            self._compute()
+            self._compute_seconds = time.perf_counter() - started
+            deadline += 1.0 / max(self._config.update_hz, 1)
+            delay = deadline - time.monotonic()
+            if delay < 0:
+                deadline = time.monotonic()
+                delay = 0
+            self._stop.wait(delay)
+
+    def _compute(self) -> None:
+        layout = self._layout
+        config = layout.config
+        frame = self._latest(layout, config.fft_size)
+        power = np.abs(np.fft.rfft(frame * layout.window)) ** 2
+        energies = np.add.reduceat(power, layout.edges[:-1]) / np.diff(layout.edges)
+        # Normalise so a full-scale sine lands near 0 dB.
+        scale = (layout.window.sum() / 2) ** 2
+        spectrum = quantize_db(10 * np.log10(energies / scale + 1e-20), config.min_db)
+
+        points = config.waveform_points
+        samples = self._latest(layout, points * max(len(frame) // points, 1)).reshape(points, -1)
+        pairs = np.stack([samples.min(axis=1), samples.max(axis=1)], axis=1)
+        waveform = np.clip((pairs + 1.0) * 127.5, 0, 255).astype(np.uint8).tobytes()
+        if layout is not self._layout:
+            return  # config changed mid-frame; these sizes are stale
+        self._spectrum = spectrum
+        self._waveform = waveform
+        self._seq += 1
+
+
+def _build_layout(config: AnalysisConfig, input_cfg: InputConfig) -> _Layout:
+    step = max(config.decimation, 1)
+    edges, band_hz = band_layout(config.fft_size, input_cfg.sample_rate / step, config.bands)
+    return _Layout(
+        config=config,
+        step=step,
+        taps=lowpass_taps(step)[::-1].copy() if step > 1 else np.zeros(0, dtype=np.float32),
+        window=np.hanning(config.fft_size).astype(np.float32),
+        edges=edges,
+        band_hz=band_hz,
+        ring=np.zeros(config.fft_size * 2, dtype=np.float32),
+    )
+
+
+def _decimate(layout: _Layout, mono: np.ndarray) -> np.ndarray:
+    """Low-pass and keep every `step`-th output, carrying filter history across blocks."""
+    joined = np.concatenate((layout.pending, mono))
+    width = len(layout.taps)
+    count = (len(joined) - width) // layout.step + 1 if len(joined) >= width else 0
+    # Only the kept outputs are computed: one dot product per decimated sample.
+    windows = np.lib.stride_tricks.sliding_window_view(joined, width)[: count * layout.step : layout.step]
+    layout.pending = joined[count * layout.step :]
+    return windows @ layout.taps
+
+
+def lowpass_taps(decimation: int) -> np.ndarray:
+    """Kaiser-windowed sinc low-pass, unity DC gain, cutting off below fs / (2 * decimation)."""
+    count = LOWPASS_TAPS_PER_STEP * decimation + 1
+    cutoff = LOWPASS_CUTOFF / decimation  # cycles per input sample
+    offsets = np.arange(count) - (count - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * offsets) * np.kaiser(count, LOWPASS_KAISER_BETA)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def band_layout(fft_size: int, sample_rate: float, bands: int) -> tuple[np.ndarray, np.ndarray]:
+    """Log-spaced FFT bin edges (each band at least one bin wide) and their frequencies."""
+    bins = fft_size // 2 + 1
+    nyquist = sample_rate / 2
+    hz = np.geomspace(MIN_BAND_HZ, nyquist, bands + 1)
+    edges = np.round(hz / nyquist * (bins - 1)).astype(np.int64)
+    edges[0] = max(edges[0], 1)
+    for index in range(1, len(edges)):
+        edges[index] = max(edges[index], edges[index - 1] + 1)
+    edges = edges[edges < bins - 1]
+    # The last edge is exclusive so the top band reaches the Nyquist bin.
+    edges = np.append(edges, bins)
+    return edges, np.minimum(edges, bins - 1) * nyquist / (bins - 1)
+
+
+def quantize_db(values: np.ndarray, min_db: float) -> bytes:
+    scaled = (values - min_db) / -min_db * 255
+    return np.clip(scaled, 0, 255).astype(np.uint8).tobytes()
@@ -1,16 +1,38 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+import asyncio
+import json
+import time
+from typing import TYPE_CHECKING, AsyncIterator
 
-from .config import AppConfig
-from .state import StreamState
-from .audio import AudioEngine
-from .streamer import Streamer
-import sounddevice as sd
-import numpy as np
-from .config import save_config, validate_config, validation_errors, validation_issues
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+
+from . import startup as startup_marks
+from .assets import StaticAssets
+from .config import (
+    AppConfig,
+    merge_dicts,
+    save_config,
+    validate_config,
+    validation_errors,
+    validation_issues,
+)
+from .log import set_log_level
+from .scheduling import memory_lock_status
+from .state import StreamState, Subscription
+from .trace import TRACER, configure_tracing
+
+if TYPE_CHECKING:
+    from .analysis import SpectrumAnalyzer
+    from .audio import AudioEngine
+    from .history import LevelHistory
+    from .journal import EventJournal
+    from .latency import LatencyProbe
+    from .monitor import MonitorStream
+    from .recorder import ArchiveRecorder
+    from .stations import StationSupervisor
+    from .streamer import Streamer
 
 
 class ApiService:
@@ -21,12 +43,28 @@ class ApiService:
         streamer: Streamer,
         audio_engine: AudioEngine | None = None,
         config_path: str | None = None,
+        recorder: ArchiveRecorder | None = None,
+        monitor: MonitorStream | None = None,
+        analyzer: SpectrumAnalyzer | None = None,
+        history: LevelHistory | None = None,
+        journal: EventJournal | None = None,
+        defer_audio: bool = False,
+        stations: StationSupervisor | None = None,
     ) -> None:
         self._config = config
         self._state = state
         self._streamer = streamer
         self._audio_engine = audio_engine
         self._config_path = config_path
+        self._recorder = recorder
+        self._monitor = monitor
+        self._analyzer = analyzer
+        self._history = history
+        self._journal = journal
+        self._audio_pending = defer_audio
+        self._stations = stations
+        self._latency_probe: LatencyProbe | None = None
+        self._assets = StaticAssets("web")
         self.app = FastAPI(title="OndePi")
         self._register_routes()
 
@@ -40,6 +78,10 @@ class ApiService:
                 "state": self._state.as_dict(),
                 "stream": self._streamer.status(),
                 "device": self._audio_engine.device_status() if self._audio_engine else None,
+                "recorder": self._recorder.status() if self._recorder else None,
+                "monitor": self._monitor.status() if self._monitor else None,
+                "startup": startup_marks.marks(),
+                "memory_lock": memory_lock_status(),
                 "config": {
                     "valid": len(errors) == 0,
                     "errors": errors,
@@ -47,8 +89,19 @@ class ApiService:
                 },
             }
 
+        @app.get("/api/state/events")
+        def state_events(interval: float = 0.1) -> StreamingResponse:
+            subscription = self._state.subscribe()
+            return StreamingResponse(
+                _state_event_stream(subscription, max(interval, 0.02)),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-store"},
+            )
+
         @app.get("/api/devices")
         def list_devices() -> dict:
+            import sounddevice as sd
+
             devices = []
             current_device = None
             if self._config and self._config.input.alsa_device:
@@ -67,6 +120,9 @@ class ApiService:
 
         @app.post("/api/test-input")
         def test_input() -> dict:
+            import numpy as np
+            import sounddevice as sd
+
             try:
                 cfg = self._config.input
                 frames = int(cfg.sample_rate * 2)
@@ -86,10 +142,14 @@ class ApiService:
 
         @app.post("/api/stream/start")
         def start() -> dict:
+            if self._stations:
+                raise HTTPException(status_code=409, detail="Multi-station mode: use /api/stations/{id}")
+            if self._audio_pending:
+                raise HTTPException(status_code=503, detail="Audio stack is still starting")
             try:
                 self._streamer.start()
             except Exception as exc:  # pragma: no cover - runtime only
-                self._state.last_error = str(exc)
+                self._state.update(last_error=str(exc))
                 raise HTTPException(status_code=500, detail=str(exc)) from exc
             return {"ok": True}
 
@@ -98,6 +158,25 @@ class ApiService:
             self._streamer.stop()
             return {"ok": True}
 
+        @app.get("/api/latency-probe")
+        def latency_results() -> dict:
+            return {"results": self._latency_probe.results() if self._latency_probe else []}
+
+        @app.post("/api/latency-probe")
+        def latency_probe() -> dict:
+            if self._audio_pending:
+                raise HTTPException(status_code=503, detail="Audio stack is still starting")
+            if not self._audio_engine or not self._streamer.status()["running"]:
+                raise HTTPException(status_code=409, detail="Start the stream before probing latency")
+            if self._latency_probe is None:
+                from .latency import LatencyProbe
+
+                self._latency_probe = LatencyProbe(self._audio_engine, self._journal)
+            try:
+                return self._latency_probe.run(self._config)
+            except RuntimeError as exc:
+                raise HTTPException(status_code=409, detail=str(exc)) from exc
+
         @app.get("/api/config")
         def get_config() -> dict:
             return self._config.to_dict()
@@ -113,60 +192,263 @@ class ApiService:
             except Exception as exc:
                 raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-            self._config = updated
-            self._streamer.update_config(updated)
-            if self._audio_engine:
-                self._audio_engine.update_input(updated.input)
-            return {"ok": True}
+            return {"ok": True, **self._apply_config(updated)}
 
         @app.patch("/api/config")
         def patch_config(payload: dict) -> dict:
             if not self._config_path:
                 raise HTTPException(status_code=500, detail="Config path not set")
             try:
-                merged = _merge_dicts(self._config.to_dict(), payload)
+                merged = merge_dicts(self._config.to_dict(), payload)
                 updated = AppConfig.from_dict(merged)
                 validate_config(updated)
                 save_config(updated, self._config_path)
             except Exception as exc:
                 raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-            self._config = updated
-            self._streamer.update_config(updated)
-            if self._audio_engine:
-                self._audio_engine.update_input(updated.input)
-            return {"ok": True}
+            return {"ok": True, **self._apply_config(updated)}
+
+        @app.get("/api/monitor")
+        def monitor_stream() -> StreamingResponse:
+            if not self._monitor or not self._config.monitor.enabled:
+                raise HTTPException(status_code=404, detail="Monitor disabled")
+            return StreamingResponse(
+                self._monitor.listen(),
+                media_type=self._monitor.media_type,
+                headers={"Cache-Control": "no-store"},
+            )
+
+        @app.get("/api/spectrum/layout")
+        def spectrum_layout() -> dict:
+            return self._require_analyzer().layout()
+
+        @app.get("/api/spectrum")
+        def spectrum() -> Response:
+            analyzer = self._require_analyzer()
+            return _binary_frame(analyzer.spectrum(), analyzer.seq)
+
+        @app.get("/api/waveform")
+        def waveform() -> Response:
+            analyzer = self._require_analyzer()
+            return _binary_frame(analyzer.waveform(), analyzer.seq)
+
+        @app.get("/api/history")
+        def history(
+            start: float | None = None,
+            end: float | None = None,
+            resolution: int | None = None,
+        ) -> dict:
+            if not self._history or not self._config.history.enabled:
+                raise HTTPException(status_code=404, detail="History disabled")
+            end = time.time() if end is None else end
+            start = end - 3600 if start is None else start
+            try:
+                return self._history.query(start, end, resolution)
+            except ValueError as exc:
+                raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+        @app.get("/api/events")
+        def events(
+            since: int = 0,
+            kind: str | None = None,
+            start: float | None = None,
+            end: float | None = None,
+            limit: int = 200,
+        ) -> dict:
+            if not self._journal:
+                raise HTTPException(status_code=404, detail="Journal disabled")
+            kinds = [item for item in kind.split(",") if item] if kind else None
+            selected = self._journal.query(since=since, kinds=kinds, start=start, end=end, limit=limit)
+            return {
+                "latest": self._journal.latest_seq(),
+                "kinds": self._journal.kinds(),
+                "events": [event.as_dict() for event in selected],
+            }
+
+        @app.get("/api/trace")
+        def trace(seconds: float = 10.0) -> dict:
+            if not TRACER.enabled:
+                raise HTTPException(status_code=404, detail="Tracing disabled")
+            return TRACER.chrome_trace(max(seconds, 0.0))
+
+        @app.get("/api/stations")
+        def list_stations() -> dict:
+            supervisor = self._require_stations()
+            station_ids = supervisor.station_ids()
+            return {"stations": [supervisor.status(station_id) for station_id in station_ids]}
+
+        @app.get("/api/stations/{station_id}/status")
+        def station_status(station_id: str) -> dict:
+            return self._station_call(lambda supervisor: supervisor.status(station_id))
+
+        @app.post("/api/stations/{station_id}/stream/start")
+        def station_start(station_id: str) -> dict:
+            return self._station_call(lambda supervisor: supervisor.request(station_id, "start"))
+
+        @app.post("/api/stations/{station_id}/stream/stop")
+        def station_stop(station_id: str) -> dict:
+            return self._station_call(lambda supervisor: supervisor.request(station_id, "stop"))
+
+        @app.post("/api/stations/{station_id}/gain")
+        def station_gain(station_id: str, payload: dict) -> dict:
+            gain_db = payload.get("gain_db")
+            if not isinstance(gain_db, (int, float)):
+                raise HTTPException(status_code=400, detail="gain_db must be number")
+            return self._station_call(
+                lambda supervisor: supervisor.request(station_id, "gain", gain_db=float(gain_db))
+            )
 
         @app.post("/api/gain")
         def set_gain(payload: dict) -> dict:
             gain_db = payload.get("gain_db")
             if not isinstance(gain_db, (int, float)):
                 raise HTTPException(status_code=400, detail="gain_db must be number")
-            self._state.gain_db = float(gain_db)
-            return {"ok": True, "gain_db": self._state.gain_db}
-
-        app.mount("/", StaticFiles(directory="web", html=True), name="web")
+            snapshot = self._state.update(gain_db=float(gain_db))
+            return {"ok": True, "gain_db": snapshot.gain_db}
 
         @app.on_event("startup")
         def startup() -> None:
-            if self._audio_engine:
-                self._audio_engine.start()
+            self._streamer.bind_loop(asyncio.get_running_loop())
+            self._start_components()
 
         @app.on_event("shutdown")
         def shutdown() -> None:
+            if self._stations:
+                self._stations.stop()
+            if self._history:
+                self._history.stop()
+            if self._analyzer:
+                self._analyzer.stop()
+            if self._recorder:
+                self._recorder.stop()
             if self._audio_engine:
                 self._audio_engine.stop()
+            if self._journal:
+                self._journal.stop()
+
+        # Registered last so it never shadows an API route.
+        @app.api_route("/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+        def static(path: str, request: Request) -> Response:
+            response = self._assets.response(path, request.headers, head=request.method == "HEAD")
+            if response is None:
+                raise HTTPException(status_code=404, detail="Not Found")
+            return response
+
+    @property
+    def config(self) -> AppConfig:
+        return self._config
+
+    def attach_audio(
+        self,
+        audio_engine: AudioEngine,
+        recorder: ArchiveRecorder | None = None,
+        monitor: MonitorStream | None = None,
+        analyzer: SpectrumAnalyzer | None = None,
+        history: LevelHistory | None = None,
+    ) -> None:
+        """Plug in the audio stack once it has been built after the server is listening."""
+        self._audio_engine = audio_engine
+        self._recorder = recorder
+        self._monitor = monitor
+        self._analyzer = analyzer
+        self._history = history
+        self._streamer.attach_audio_engine(audio_engine)
+        self._audio_pending = False
+        self._start_components()
+
+    def _start_components(self) -> None:
+        if self._journal:
+            self._journal.start()
+        if self._stations:
+            self._stations.start()
+        if self._audio_engine:
+            self._audio_engine.start()
+        if self._recorder and self._config.recorder.enabled:
+            self._recorder.start()
+        if self._analyzer and self._config.analysis.enabled:
+            self._analyzer.start()
+        if self._history and self._config.history.enabled:
+            self._history.start()
+
+    def _require_stations(self) -> StationSupervisor:
+        if not self._stations:
+            raise HTTPException(status_code=404, detail="No stations configured")
+        return self._stations
+
+    def _station_call(self, call) -> dict:  # noqa: ANN001
+        from .stations import StationError
+
+        supervisor = self._require_stations()
+        try:
+            return call(supervisor)
+        except KeyError as exc:
+            raise HTTPException(status_code=404, detail=f"Unknown station {exc}") from exc
+        except StationError as exc:
+            raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+    def _require_analyzer(self) -> SpectrumAnalyzer:
+        if not self._analyzer or not self._config.analysis.enabled:
+            raise HTTPException(status_code=404, detail="Analysis disabled")
+        return self._analyzer
+
+    def _apply_config(self, updated: AppConfig) -> dict:
+        """Push an accepted config to every running component; returns what callers should know."""
+        self._config = updated
+        set_log_level(updated.general.log_level)
+        configure_tracing(updated.trace)
+        if self._journal:
+            self._journal.record("config.update", "configuration updated")
+        self._streamer.update_config(updated)
+        if self._audio_engine:
+            self._audio_engine.update_input(updated.input)
+            self._audio_engine.update_fallback(updated.fallback)
+        if self._recorder:
+            self._recorder.update_config(updated.recorder, updated.input)
+            if updated.recorder.enabled:
+                self._recorder.start()
+            else:
+                self._recorder.stop()
+        if self._monitor:
+            self._monitor.update_config(updated.monitor, updated.input)
+        if self._analyzer:
+            self._analyzer.update_config(updated.analysis, updated.input)
+            if updated.analysis.enabled:
+                self._analyzer.start()
+            else:
+                self._analyzer.stop()
+        if self._history:
+            self._history.update_config(updated.history, updated.input.channels)
+            if updated.history.enabled:
+                self._history.start()
+            else:
+                self._history.stop()
+        result: dict = {}
+        if self._stations:
+            result["stations"] = self._stations.update_config(updated)
+        if bool(self._stations) != bool(updated.stations):
+            # Single- vs multi-station mode is chosen at startup.
+            result["restart_required"] = True
+        return result
+
 
-        @app.get("/", response_class=HTMLResponse)
-        def root() -> HTMLResponse:
-            return HTMLResponse("", status_code=307, headers={"Location": "/index.html"})
+async def _state_event_stream(subscription: Subscription, interval: float) -> AsyncIterator[bytes]:
+    # Level updates arrive at the meter rate; the subscription conflates them and
+    # the interval caps how often a browser is woken.
+    try:
+        while True:
+            snapshot = await subscription.next()
+            if snapshot is None:
+                return
+            payload = json.dumps(snapshot.as_dict())
+            yield f"id: {snapshot.version}\ndata: {payload}\n\n".encode("utf-8")
+            await asyncio.sleep(interval)
+    finally:
+        subscription.close()
 
 
-def _merge_dicts(base: dict, patch: dict) -> dict:
-    merged = dict(base)
-    for key, value in patch.items():
-        if isinstance(value, dict) and isinstance(merged.get(key), dict):
-            merged[key] = _merge_dicts(merged[key], value)
-        else:
-            merged[key] = value
-    return merged
+def _binary_frame(payload: bytes, seq: int) -> Response:
+    return Response(
+        content=payload,
+        media_type="application/octet-stream",
+        headers={"Cache-Control": "no-store", "X-Frame-Seq": str(seq)},
+    )
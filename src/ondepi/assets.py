@@ -0,0 +1,119 @@
+"""In-memory static assets for the web UI.
+
+Files are read, hashed and compressed once when the API is built. Scripts and
+stylesheets are also served under content-hashed names (`app.<hash>.js`) that
+index.html is rewritten to reference, so browsers cache them forever and only
+revalidate the small HTML page. Brotli variants need the optional `brotli`
+package; gzip is always available.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+HASHED_SUFFIXES = (".js", ".css")
+HASH_LENGTH = 12
+
+
+@dataclass
+class Asset:
+    media_type: str
+    cache_control: str
+    etag: str
+    variants: Dict[str, bytes] = field(default_factory=dict)  # content-encoding -> body, "" is identity
+
+
+class StaticAssets:
+    def __init__(self, directory: str | Path) -> None:
+        root = Path(directory)
+        if not root.is_dir():
+            raise RuntimeError(f"Static directory '{root}' does not exist")
+        self._assets: Dict[str, Asset] = {}
+        sources = {
+            path.relative_to(root).as_posix(): path.read_bytes() for path in sorted(root.rglob("*")) if path.is_file()
+        }
+        renames: Dict[str, str] = {}
+        for name, body in sources.items():
+            if name.endswith(HASHED_SUFFIXES):
+                hashed = _hashed_name(name, body)
+                renames[name] = hashed
+                self._add(hashed, body, IMMUTABLE)
+        for name, body in sources.items():
+            if name.endswith(".html"):
+                body = _rewrite_references(body, renames)
+            self._add(name, body, REVALIDATE)
+
+    @property
+    def names(self) -> list[str]:
+        return sorted(self._assets)
+
+    def response(self, path: str, headers: Mapping[str, str], head: bool = False) -> Optional[Response]:
+        """Response for `path` ("/" is index.html), or None if unknown."""
+        name = path.strip("/") or "index.html"
+        asset = self._assets.get(name)
+        if asset is None:
+            return None
+        encoding = _negotiate(headers.get("accept-encoding", ""), asset.variants)
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+        response_headers = {"Cache-Control": asset.cache_control, "ETag": etag, "Vary": "Accept-Encoding"}
+        if _etag_matches(headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=response_headers)
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        body = asset.variants[encoding]
+        response_headers["Content-Length"] = str(len(body))
+        return Response(b"" if head else body, media_type=asset.media_type, headers=response_headers)
+
+    def _add(self, name: str, body: bytes, cache_control: str) -> None:
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        asset = Asset(media_type, cache_control, hashlib.sha256(body).hexdigest()[:HASH_LENGTH], {"": body})
+        compressed = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                asset.variants[encoding] = data
+        self._assets[name] = asset
+
+
+def _hashed_name(name: str, body: bytes) -> str:
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:HASH_LENGTH]}{dot}{suffix}"
+
+
+def _rewrite_references(html: bytes, renames: Mapping[str, str]) -> bytes:
+    text = html.decode("utf-8")
+    for name, hashed in renames.items():
+        text = re.sub(rf'(\b(?:src|href)=")/?{re.escape(name)}"', rf'\g<1>/{hashed}"', text)
+    return text.encode("utf-8")
+
+
+def _negotiate(accept_encoding: str, variants: Mapping[str, bytes]) -> str:
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if coding and not any(param.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000") for param in params):
+            accepted.add(coding)
+    for encoding in ("br", "gzip"):
+        if encoding in variants and (encoding in accepted or "*" in accepted):
+            return encoding
+    return ""
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [item.strip() for item in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
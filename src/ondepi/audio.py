@@ -1,14 +1,41 @@
 from __future__ import annotations
 
+import logging
 from dataclasses import dataclass, field
 from threading import Event, Lock, Thread
-from typing import Callable, Optional
+from time import monotonic
+from typing import TYPE_CHECKING, Callable, Optional
 
 import numpy as np
-import sounddevice as sd
 
-from .config import InputConfig
+from . import startup
+from .config import FallbackConfig, InputConfig, SchedulingConfig, input_latency
+from .fallback import Crossfade, FallbackSource, SilenceDetector
+from .journal import EventJournal
+from .log import log_event
+from .resample import COMMON_RATES, PolyphaseResampler
+from .scheduling import apply_capture_policy
 from .state import LevelState, StreamState
+from .trace import TRACER, now_ns
+
+if TYPE_CHECKING:
+    import sounddevice as sd
+
+logger = logging.getLogger(__name__)
+
+# Levels reach StreamState (and its subscribers) at this rate, from a
+# publisher thread rather than the audio callback.
+LEVEL_PUBLISH_SECONDS = 0.05
+
+_SPAN_CALLBACK = TRACER.name_id("audio.callback")
+_SPAN_ROUTE = TRACER.name_id("audio.route")
+_SPAN_RESAMPLE = TRACER.name_id("audio.resample")
+_SPAN_FALLBACK = TRACER.name_id("audio.fallback")
+_SPAN_GAIN = TRACER.name_id("audio.gain")
+_SPAN_INJECTION = TRACER.name_id("audio.injection")
+_SPAN_CLIPPER = TRACER.name_id("audio.clipper")
+_SPAN_METER = TRACER.name_id("audio.meter")
+_SPAN_CONSUMER = TRACER.name_id("audio.consumer")
 
 
 @dataclass
@@ -52,99 +79,430 @@ class SoftClipper:
         return np.tanh(self.drive * data).astype(np.float32)
 
 
+class ChannelRouter:
+    """Mixes captured channels into output channels with one matmul per block.
+
+    `matrix` has one row per output channel and one gain per captured channel.
+    The returned block is a view of a reused buffer, so consumers that keep it
+    must copy.
+    """
+
+    def __init__(self, matrix: np.ndarray, max_frames: int = 4096) -> None:
+        self._gains = np.ascontiguousarray(np.asarray(matrix, dtype=np.float32).T)
+        self._out = np.empty((max_frames, self._gains.shape[1]), dtype=np.float32)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._gains.T
+
+    def route(self, block: np.ndarray) -> np.ndarray:
+        frames = block.shape[0]
+        if frames > self._out.shape[0]:
+            self._out = np.empty((frames, self._gains.shape[1]), dtype=np.float32)
+        out = self._out[:frames]
+        np.matmul(block, self._gains, out=out)
+        return out
+
+
+def mix_matrix(input_cfg: InputConfig) -> Optional[np.ndarray]:
+    """Routing matrix for the config, or None when capture maps 1:1 to output."""
+    capture = input_cfg.capture_channels or input_cfg.channels
+    if input_cfg.mix_matrix:
+        return np.asarray(input_cfg.mix_matrix, dtype=np.float32)
+    if capture == input_cfg.channels:
+        return None
+    # Default: output channel i takes input i (mono inputs feed every output).
+    matrix = np.zeros((input_cfg.channels, capture), dtype=np.float32)
+    for channel in range(input_cfg.channels):
+        matrix[channel, channel % capture] = 1.0
+    return matrix
+
+
 @dataclass
 class AudioStatus:
     last_levels: Optional[LevelState] = None
 
 
+@dataclass
+class Injection:
+    """Samples mixed once into the live signal, e.g. the latency probe marker."""
+
+    samples: np.ndarray
+    position: int = 0
+    started_at: Optional[float] = None
+    capture_delay: float = 0.0
+    done: Event = field(default_factory=Event)
+
+
 AudioConsumer = Callable[[np.ndarray], None]
 
 
+def _consumer_label(consumer: AudioConsumer) -> str:
+    """`Streamer._build_audio_consumer._consumer` style name for trace spans."""
+    name = getattr(consumer, "__qualname__", None) or type(consumer).__qualname__
+    return name.replace(".<locals>", "")
+
+
 class AudioEngine:
-    def __init__(self, input_cfg: InputConfig, state: StreamState) -> None:
+    def __init__(
+        self,
+        input_cfg: InputConfig,
+        state: StreamState,
+        journal: Optional[EventJournal] = None,
+        scheduling: Optional[SchedulingConfig] = None,
+        fallback: Optional[FallbackConfig] = None,
+    ) -> None:
         self._input_cfg = input_cfg
         self._state = state
+        self._journal = journal
+        self._scheduling = scheduling
+        self._scheduling_report: Optional[dict] = None
+        self._policy_pending = False
         self._meter = AudioMeter()
         self._gain = GainController()
         self._clipper = SoftClipper()
         self._stream: Optional[sd.InputStream] = None
         self._consumers: list[AudioConsumer] = []
+        self._consumer_spans: dict[AudioConsumer, int] = {}
         self._lock = Lock()
         self._running = Event()
+        self._stopping = Event()
         self._thread: Optional[Thread] = None
         self._device_status = "idle"
         self._last_device_error: Optional[str] = None
+        self._callback_status_count = 0
+        self._callback_status_reported = 0
+        self._last_callback_status: Optional[sd.CallbackFlags] = None
+        self._first_block_seen = False
+        self._block_frames = 0
+        self._injection: Optional[Injection] = None
+        self._resampler: Optional[PolyphaseResampler] = None
+        self._capture_rate: Optional[int] = None
+        self._native_rates: list[int] = []
+        self._router: Optional[ChannelRouter] = None
+        self._source_levels: Optional[tuple[np.ndarray, np.ndarray]] = None
+        self._fallback_cfg = fallback or FallbackConfig()
+        self._filler: Optional[FallbackSource] = None
+        self._crossfade = Crossfade(0)
+        self._silence: Optional[SilenceDetector] = None
+        self._fallback_reason: Optional[str] = None
+        self._fallback_switches = 0
+        self._fallback_seconds = 0.0
+        self._fallback_thread: Optional[Thread] = None
+        self._publish_thread: Optional[Thread] = None
+        self._pending_levels: Optional[LevelState] = None  # written by the callback, taken by the publisher
+        self._deliver_lock = Lock()
+        self._timeline = 0.0  # monotonic time up to which audio has been delivered
 
     def start(self) -> None:
         if self._running.is_set():
             return
         self._clipper.enabled = self._input_cfg.limiter_enabled
         self._clipper.drive = self._input_cfg.limiter_drive
+        self._stopping.clear()
         self._running.set()
+        self._timeline = monotonic()
         self._thread = Thread(target=self._run_loop, daemon=True)
         self._thread.start()
+        self._publish_thread = Thread(target=self._publish_loop, name="level-publisher", daemon=True)
+        self._publish_thread.start()
+        if self._fallback_cfg.enabled:
+            self._start_fallback()
 
     def stop(self) -> None:
         if not self._running.is_set():
             return
         self._running.clear()
+        self._stopping.set()
         if self._stream:
             self._stream.stop()
             self._stream.close()
             self._stream = None
+        for thread in (self._thread, self._fallback_thread, self._publish_thread):
+            if thread and thread.is_alive():
+                thread.join(timeout=3)
+        self._fallback_thread = None
+        self._publish_thread = None
+        self._filler = None
 
     def add_consumer(self, consumer: AudioConsumer) -> None:
         with self._lock:
             self._consumers.append(consumer)
+            self._consumer_spans[consumer] = TRACER.name_id(f"audio.consumer.{_consumer_label(consumer)}")
 
     def remove_consumer(self, consumer: AudioConsumer) -> None:
         with self._lock:
             if consumer in self._consumers:
                 self._consumers.remove(consumer)
+                if consumer not in self._consumers:
+                    self._consumer_spans.pop(consumer, None)
+
+    def replace_consumer(self, old: AudioConsumer, new: AudioConsumer) -> None:
+        """Swap `old` for `new` between two blocks, so no block reaches both or neither."""
+        with self._lock:
+            if old in self._consumers:
+                self._consumers[self._consumers.index(old)] = new
+                if old not in self._consumers:
+                    self._consumer_spans.pop(old, None)
+            else:
+                self._consumers.append(new)
+            self._consumer_spans[new] = TRACER.name_id(f"audio.consumer.{_consumer_label(new)}")
+
+    def inject(self, samples: np.ndarray) -> Injection:
+        """Mix `samples` (frames x channels) into the signal from the next block on."""
+        injection = Injection(samples=np.asarray(samples, dtype=np.float32))
+        self._injection = injection
+        return injection
 
     def update_input(self, input_cfg: InputConfig) -> None:
         self._input_cfg = input_cfg
         self._clipper.enabled = input_cfg.limiter_enabled
         self._clipper.drive = input_cfg.limiter_drive
-        if self._stream:
+        if self._running.is_set():
+            self.stop()
+            self.start()
+
+    def update_fallback(self, fallback: FallbackConfig) -> None:
+        if fallback == self._fallback_cfg:
+            return
+        self._fallback_cfg = fallback
+        if self._running.is_set():
             self.stop()
             self.start()
 
     def _callback(self, indata, frames, time, status) -> None:  # noqa: ANN001
+        if TRACER.enabled:
+            started = now_ns()
+            self._deliver(indata, time, status, True)
+            TRACER.span(_SPAN_CALLBACK, started)
+        else:
+            self._deliver(indata, time, status, False)
+
+    def _deliver(self, indata, time, status, traced: bool) -> None:  # noqa: ANN001
+        if not self._first_block_seen:
+            self._first_block_seen = True
+            startup.mark("first_audio")
+        if self._policy_pending:
+            # PortAudio owns the callback thread, so pin it from inside, once per stream.
+            self._policy_pending = False
+            self._scheduling_report = apply_capture_policy(self._scheduling) if self._scheduling else None
         if status:
-            self._state.last_error = str(status)
-        self._gain.gain_db = self._state.gain_db
-        gained = self._gain.apply(indata)
-        clipped = self._clipper.apply(gained)
-        levels = self._meter.compute_levels(clipped)
-        self._state.levels = levels
-        with self._lock:
-            consumers = list(self._consumers)
-        for consumer in consumers:
-            try:
-                consumer(clipped)
-            except Exception:  # pragma: no cover - consumer errors are non-fatal
+            # Logging takes locks and walks frames; the publisher thread reports these.
+            self._callback_status_count += 1
+            self._last_callback_status = status
+        started = now_ns() if traced else 0
+        if self._router is not None:
+            self._source_levels = (
+                np.sqrt(np.mean(np.square(indata), axis=0)),
+                np.max(np.abs(indata), axis=0),
+            )
+            indata = self._router.route(indata)
+            if traced:
+                started = TRACER.span(_SPAN_ROUTE, started)
+        if self._resampler is not None:
+            indata = self._resampler.process(indata)
+            if traced:
+                TRACER.span(_SPAN_RESAMPLE, started)
+            if indata.shape[0] == 0:
+                return
+        self._timeline = monotonic()
+        self._process_block(indata, time)
+
+    def _process_block(self, block: Optional[np.ndarray], timing) -> None:  # noqa: ANN001
+        """Everything after capture: fallback mix, gain, marker, limiter, meters, consumers.
+
+        `block` is None when the fallback thread fills a gap in the device audio.
+        With tracing on, each stage is recorded as a span.
+        """
+        with self._deliver_lock:
+            traced = TRACER.enabled
+            started = now_ns() if traced else 0
+            if self._filler is not None:
+                block = self._mix_fallback(block)
+                if traced:
+                    started = TRACER.span(_SPAN_FALLBACK, started)
+            elif block is None:
+                return
+            frames = block.shape[0]
+            self._block_frames = frames
+            self._gain.gain_db = self._state.gain_db
+            gained = self._gain.apply(block)
+            if traced:
+                started = TRACER.span(_SPAN_GAIN, started)
+            injection = self._injection
+            if injection is not None:
+                gained = self._mix_injection(gained, injection, timing)
+                if traced:
+                    started = TRACER.span(_SPAN_INJECTION, started)
+            clipped = self._clipper.apply(gained)
+            if traced:
+                started = TRACER.span(_SPAN_CLIPPER, started)
+            # A plain reference swap: the callback never takes the state's write
+            # lock or wakes subscribers itself.
+            self._pending_levels = self._meter.compute_levels(clipped)
+            with self._lock:
+                consumers = list(self._consumers)
+                spans = self._consumer_spans if traced else None
+            if traced:
+                started = TRACER.span(_SPAN_METER, started)
+            for consumer in consumers:
+                try:
+                    consumer(clipped)
+                except Exception:  # pragma: no cover - consumer errors are non-fatal
+                    continue
+                finally:
+                    if spans is not None:
+                        started = TRACER.span(spans.get(consumer, _SPAN_CONSUMER), started)
+
+    def _mix_fallback(self, live: Optional[np.ndarray]) -> np.ndarray:
+        assert self._filler is not None
+        frames = live.shape[0] if live is not None else self._fallback_cfg.block_frames
+        seconds = frames / self._input_cfg.sample_rate
+        if live is None:
+            reason: Optional[str] = "device"
+        elif self._silence and self._silence.update(float(np.max(np.abs(live), initial=0.0)), seconds):
+            reason = "silence"
+        else:
+            reason = None
+        if reason != self._fallback_reason:
+            if reason and not self._fallback_reason:
+                self._fallback_switches += 1
+                self._record("fallback.engaged", f"fallback {self._filler.kind} engaged ({reason})")
+            elif not reason:
+                self._record("fallback.released", "input audio restored")
+            self._fallback_reason = reason
+        mixed = self._crossfade.mix(live, self._filler, frames, 1.0 if reason else 0.0)
+        if self._crossfade.share > 0:
+            self._fallback_seconds += seconds
+        return mixed
+
+    def _start_fallback(self) -> None:
+        cfg = self._fallback_cfg
+        rate = self._input_cfg.sample_rate
+        self._filler = FallbackSource(cfg, rate, self._input_cfg.channels)
+        if self._filler.error:
+            self._record("fallback.error", self._filler.error)
+        self._crossfade = Crossfade(int(rate * cfg.crossfade_ms / 1000))
+        self._silence = (
+            SilenceDetector(cfg.silence_threshold_db, cfg.silence_timeout_seconds)
+            if cfg.silence_timeout_seconds > 0
+            else None
+        )
+        self._fallback_reason = None
+        self._fallback_thread = Thread(target=self._fallback_loop, daemon=True)
+        self._fallback_thread.start()
+
+    def _fallback_loop(self) -> None:
+        """Fill gaps in device audio with filler blocks at real-time cadence.
+
+        The device callback advances `_timeline` to now on every block. Once it
+        has lagged for `gap_ms`, the missing audio is filled from the timeline
+        onward and then paced against the monotonic clock, so consumers see
+        no hole in the sample stream and the encoder never starves.
+        """
+        cfg = self._fallback_cfg
+        period = cfg.block_frames / self._input_cfg.sample_rate
+        grace = cfg.gap_ms / 1000
+        while not self._stopping.is_set():
+            now = monotonic()
+            behind = now - self._timeline
+            if behind < grace:
+                self._stopping.wait(grace - behind)
                 continue
+            if behind > grace + 1.0:
+                self._timeline = now - grace  # after a suspend, don't replay minutes of filler
+            while self._timeline + period <= now and not self._stopping.is_set():
+                self._process_block(None, None)
+                self._timeline += period
+            self._stopping.wait(max(self._timeline + period - monotonic(), 0.0))
+
+    def _publish_loop(self) -> None:
+        """Off the audio thread: fold in the newest levels and report callback status."""
+        while not self._stopping.wait(LEVEL_PUBLISH_SECONDS):
+            self._publish_levels()
+            self._report_callback_status()
+
+    def _publish_levels(self) -> None:
+        levels, self._pending_levels = self._pending_levels, None
+        if levels is not None:
+            self._state.update(levels=levels)
+
+    def _report_callback_status(self) -> None:
+        count = self._callback_status_count
+        if count == self._callback_status_reported:
+            return
+        logger.warning(
+            "PortAudio callback status: %s (%d callbacks)",
+            self._last_callback_status,
+            count - self._callback_status_reported,
+            extra={"event": "device.status"},
+        )
+        self._callback_status_reported = count
+
+    def _mix_injection(self, block: np.ndarray, injection: Injection, timing) -> np.ndarray:  # noqa: ANN001
+        if injection.started_at is None:
+            # Stamp the marker with the ADC time of this block, so the capture
+            # buffering that blocksize/latency control is part of the measurement.
+            try:
+                injection.capture_delay = max(timing.currentTime - timing.inputBufferAdcTime, 0.0)
+            except AttributeError:
+                injection.capture_delay = 0.0
+            injection.started_at = monotonic() - injection.capture_delay
+        part = injection.samples[injection.position : injection.position + block.shape[0]]
+        mixed = np.array(block, dtype=np.float32)  # never write into PortAudio's buffer
+        mixed[: part.shape[0]] += part
+        injection.position += part.shape[0]
+        if injection.position >= injection.samples.shape[0]:
+            self._injection = None
+            injection.done.set()
+        return mixed
 
     def _run_loop(self) -> None:
         while self._running.is_set():
             try:
+                # Imported here so PortAudio initialises on this background
+                # thread rather than while the process is starting up.
+                import sounddevice as sd
+
+                startup.mark("portaudio_ready")
+                matrix = mix_matrix(self._input_cfg)
+                self._router = ChannelRouter(matrix) if matrix is not None else None
+                self._source_levels = None
+                capture_rate = self._negotiate_rate(sd)
+                self._capture_rate = capture_rate
+                target_rate = self._input_cfg.sample_rate
+                self._resampler = (
+                    PolyphaseResampler(
+                        capture_rate,
+                        target_rate,
+                        self._input_cfg.channels,
+                        self._input_cfg.resample_quality,
+                    )
+                    if capture_rate != target_rate
+                    else None
+                )
                 self._stream = sd.InputStream(
-                    samplerate=self._input_cfg.sample_rate,
-                    channels=self._input_cfg.channels,
+                    samplerate=capture_rate,
+                    channels=self._capture_channels(),
                     dtype="float32",
                     device=self._input_cfg.alsa_device or None,
+                    blocksize=self._input_cfg.blocksize,
+                    latency=input_latency(self._input_cfg),
                     callback=self._callback,
                     finished_callback=self._on_finished,
                 )
+                self._policy_pending = True
                 self._stream.start()
-                self._state.last_error = None
+                self._state.update(last_error=None)
                 self._device_status = "connected"
                 self._last_device_error = None
+                self._record("device.connected", f"audio device {self._input_cfg.alsa_device} opened")
                 while self._running.is_set() and self._stream and self._stream.active:
-                    self._running.wait(0.5)
+                    self._stopping.wait(0.5)
             except Exception as exc:  # pragma: no cover - runtime only
-                self._state.last_error = f"audio device error: {exc}"
+                self._state.update(last_error=f"audio device error: {exc}")
+                if self._last_device_error != str(exc):
+                    self._record("device.error", f"audio device error: {exc}")
                 self._device_status = "error"
                 self._last_device_error = str(exc)
             finally:
@@ -156,19 +514,106 @@ class AudioEngine:
                     self._stream = None
             if self._running.is_set():
                 self._device_status = "reconnecting"
-                self._running.wait(2)
+                self._stopping.wait(2)
+
+    def _negotiate_rate(self, sd) -> int:  # noqa: ANN001
+        """Pick a rate the device opens at natively, so ALSA never has to convert."""
+        cfg = self._input_cfg
+        device = cfg.alsa_device or None
+        candidates = [cfg.capture_rate or cfg.sample_rate]
+        try:
+            candidates.append(int(sd.query_devices(device, "input")["default_samplerate"]))
+        except Exception:
+            pass
+        candidates.extend(COMMON_RATES)
+        supported = []
+        for rate in dict.fromkeys(candidates):
+            try:
+                sd.check_input_settings(
+                    device=device, channels=self._capture_channels(), dtype="float32", samplerate=rate
+                )
+            except Exception:
+                continue
+            supported.append(rate)
+        self._native_rates = sorted(supported)
+        if cfg.capture_rate:
+            if cfg.capture_rate not in supported:
+                raise ValueError(f"device does not support capture_rate {cfg.capture_rate}")
+            return cfg.capture_rate
+        if not supported:
+            raise ValueError("device supports none of the common sample rates")
+        if cfg.sample_rate in supported:
+            return cfg.sample_rate
+        # Prefer the closest rate above the target: no lost bandwidth, least work.
+        above = [rate for rate in supported if rate > cfg.sample_rate]
+        return min(above) if above else max(supported)
+
+    def _capture_channels(self) -> int:
+        return self._input_cfg.capture_channels or self._input_cfg.channels
 
     def _on_finished(self) -> None:
-        self._state.last_error = "audio stream stopped"
+        self._state.update(last_error="audio stream stopped")
         self._device_status = "disconnected"
+        self._record("device.disconnected", "audio stream stopped")
+
+    def _record(self, kind: str, message: str) -> None:
+        log_event(logger, kind, message, device=self._input_cfg.alsa_device)
+        if self._journal:
+            self._journal.record(kind, message, device=self._input_cfg.alsa_device)
 
     def device_status(self) -> dict:
         return {
             "status": self._device_status,
             "last_error": self._last_device_error,
+            "callback_status": str(self._last_callback_status) if self._last_callback_status else None,
+            "callback_status_count": self._callback_status_count,
             "device": self._input_cfg.alsa_device,
             "sample_rate": self._input_cfg.sample_rate,
+            "capture_rate": self._capture_rate,
+            "native_rates": self._native_rates,
+            "resample_quality": self._input_cfg.resample_quality if self._resampler else None,
             "channels": self._input_cfg.channels,
+            "capture_channels": self._capture_channels(),
+            "routing": self._router.matrix.tolist() if self._router else None,
+            "sources": self._source_meters(),
             "limiter_enabled": self._clipper.enabled,
             "limiter_drive": self._clipper.drive,
+            "blocksize": self._input_cfg.blocksize,
+            "latency": self._input_cfg.latency,
+            "block_frames": self._block_frames,
+            "input_latency_ms": self._stream_latency_ms(),
+            "fallback": self._fallback_status(),
+            "scheduling": self._scheduling_report,
         }
+
+    def _fallback_status(self) -> dict:
+        filler = self._filler
+        return {
+            "enabled": self._fallback_cfg.enabled,
+            "source": filler.kind if filler else None,
+            "active": self._crossfade.share > 0,
+            "share": round(self._crossfade.share, 3),
+            "reason": self._fallback_reason,
+            "switches": self._fallback_switches,
+            "seconds": round(self._fallback_seconds, 1),
+            "error": filler.error if filler else None,
+        }
+
+    def _source_meters(self) -> Optional[list[dict]]:
+        levels = self._source_levels
+        if levels is None:
+            return None
+        rms, peak = levels
+        return [
+            {"channel": index + 1, "rms": float(rms[index]), "peak": float(peak[index])}
+            for index in range(len(rms))
+        ]
+
+    def _stream_latency_ms(self) -> Optional[float]:
+        stream = self._stream
+        if stream is None:
+            return None
+        try:
+            return round(float(stream.latency) * 1000, 2)
+        except Exception:
+            return None
@@ -2,15 +2,33 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
 import urllib.request
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="OndePi CLI")
     parser.add_argument("--host", default="http://127.0.0.1:8090")
-    parser.add_argument("command", choices=["status", "start", "stop"])
+    parser.add_argument("command", choices=["status", "start", "stop", "top", "fleet"])
+    parser.add_argument("action", nargs="?", choices=["status", "start", "stop"], default="status", help="fleet action")
+    parser.add_argument("--interval", type=float, default=0.5, help="top: refresh interval in seconds")
+    parser.add_argument("--inventory", default="nodes.toml", help="fleet: TOML file listing [[nodes]]")
+    parser.add_argument("--timeout", type=float, default=None, help="fleet: per-node timeout in seconds")
+    parser.add_argument("--concurrency", type=int, default=32, help="fleet: nodes contacted at once")
+    parser.add_argument("--json", action="store_true", help="fleet: print JSON instead of a table")
     args = parser.parse_args()
 
+    if args.command == "fleet":
+        from .fleet import run_fleet
+
+        sys.exit(run_fleet(args.inventory, args.action, args.json, args.timeout, args.concurrency))
+
+    if args.command == "top":
+        from .top import run_top
+
+        run_top(args.host, interval=max(args.interval, 0.1))
+        return
+
     if args.command == "status":
         url = f"{args.host}/api/status"
         with urllib.request.urlopen(url) as response:  # nosec - local usage
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict
 
@@ -23,6 +23,14 @@ class GeneralConfig:
     retry_initial_delay_seconds: int = 3
     retry_max_delay_seconds: int = 30
     retry_max_attempts: int = 0
+    preflight_probe: bool = True
+    preflight_timeout_seconds: float = 2.0
+    stall_timeout_seconds: float = 10.0
+    streamer_backend: str = "thread"
+    log_file: str = ""
+    log_max_kib: int = 1024
+    log_backups: int = 3
+    log_rate_limit_seconds: float = 10.0
 
 
 @dataclass
@@ -33,6 +41,12 @@ class InputConfig:
     channels: int = 2
     limiter_enabled: bool = True
     limiter_drive: float = 1.5
+    blocksize: int = 0
+    latency: str = "high"
+    capture_rate: int = 0
+    resample_quality: str = "medium"
+    capture_channels: int = 0
+    mix_matrix: list[list[float]] = field(default_factory=list)
 
 
 @dataclass
@@ -46,6 +60,9 @@ class StreamConfig:
     username: str = "source"
     password: str = ""
     icy: bool = True
+    low_latency: bool = False
+    encoder: str = "ffmpeg"
+    dsp: str = "python"
 
 
 @dataclass
@@ -82,6 +99,110 @@ class AzuraCastConfig:
     access_token: str = ""
 
 
+@dataclass
+class RecorderConfig:
+    enabled: bool = False
+    directory: str = "recordings"
+    sample_format: str = "s16"
+    segment_seconds: int = 3600
+    buffer_kib: int = 1024
+    queue_blocks: int = 2048
+    preallocate: bool = True
+    fsync_interval_seconds: int = 10
+    retention_max_age_hours: int = 168
+    retention_max_mib: int = 0
+
+
+@dataclass
+class MonitorConfig:
+    enabled: bool = True
+    format: str = "mp3"
+    bitrate_kbps: int = 96
+    ring_chunks: int = 64
+
+
+@dataclass
+class AnalysisConfig:
+    enabled: bool = True
+    fft_size: int = 2048
+    decimation: int = 2
+    bands: int = 48
+    update_hz: int = 25
+    waveform_points: int = 128
+    min_db: float = -90.0
+
+
+@dataclass
+class HistoryConfig:
+    enabled: bool = True
+    path: str = ""
+
+
+@dataclass
+class FallbackConfig:
+    enabled: bool = False
+    source: str = "tone"
+    file: str = ""
+    tone_hz: float = 1000.0
+    level_db: float = -20.0
+    crossfade_ms: int = 50
+    gap_ms: int = 200
+    block_frames: int = 1024
+    silence_timeout_seconds: float = 0.0
+    silence_threshold_db: float = -60.0
+
+
+@dataclass
+class JournalConfig:
+    capacity: int = 2000
+    path: str = ""
+    flush_interval_seconds: float = 2.0
+    segment_max_kib: int = 1024
+    segments_kept: int = 8
+
+
+@dataclass
+class SchedulingConfig:
+    capture_cpus: list[int] = field(default_factory=list)
+    capture_realtime_priority: int = 0
+    capture_nice: int = 0
+    encoder_cpus: list[int] = field(default_factory=list)
+    encoder_realtime_priority: int = 0
+    encoder_nice: int = 0
+    mlockall: bool = False
+
+
+@dataclass
+class AdaptiveBitrateConfig:
+    enabled: bool = False
+    ladder_kbps: list[int] = field(default_factory=lambda: [256, 192, 128, 96, 64])
+    min_speed: float = 0.97
+    max_backlog_blocks: int = 64
+    down_after_seconds: float = 5.0
+    up_after_seconds: float = 60.0
+
+
+@dataclass
+class TraceConfig:
+    enabled: bool = False
+    capacity: int = 65536
+
+
+@dataclass
+class StationConfig:
+    """One pipeline in multi-station mode; section tables override the top-level config."""
+
+    id: str = ""
+    cpu_affinity: list[int] = field(default_factory=list)
+    input: Dict[str, Any] = field(default_factory=dict)
+    stream: Dict[str, Any] = field(default_factory=dict)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    azuracast: Dict[str, Any] = field(default_factory=dict)
+
+
+STATION_SECTIONS = ("input", "stream", "metadata", "azuracast")
+
+
 @dataclass
 class AppConfig:
     general: GeneralConfig
@@ -91,6 +212,16 @@ class AppConfig:
     web: WebConfig
     serial: SerialConfig
     azuracast: AzuraCastConfig
+    recorder: RecorderConfig = field(default_factory=RecorderConfig)
+    monitor: MonitorConfig = field(default_factory=MonitorConfig)
+    analysis: AnalysisConfig = field(default_factory=AnalysisConfig)
+    history: HistoryConfig = field(default_factory=HistoryConfig)
+    journal: JournalConfig = field(default_factory=JournalConfig)
+    fallback: FallbackConfig = field(default_factory=FallbackConfig)
+    scheduling: SchedulingConfig = field(default_factory=SchedulingConfig)
+    trace: TraceConfig = field(default_factory=TraceConfig)
+    adaptive_bitrate: AdaptiveBitrateConfig = field(default_factory=AdaptiveBitrateConfig)
+    stations: list[StationConfig] = field(default_factory=list)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -101,6 +232,16 @@ class AppConfig:
             "web": self.web.__dict__,
             "serial": self.serial.__dict__,
             "azuracast": self.azuracast.__dict__,
+            "recorder": self.recorder.__dict__,
+            "monitor": self.monitor.__dict__,
+            "analysis": self.analysis.__dict__,
+            "history": self.history.__dict__,
+            "journal": self.journal.__dict__,
+            "fallback": self.fallback.__dict__,
+            "scheduling": self.scheduling.__dict__,
+            "trace": self.trace.__dict__,
+            "adaptive_bitrate": self.adaptive_bitrate.__dict__,
+            "stations": [dict(station.__dict__) for station in self.stations],
         }
 
     @staticmethod
@@ -113,8 +254,29 @@ class AppConfig:
             web=WebConfig(**_section(data, "web")),
             serial=SerialConfig(**_section(data, "serial")),
             azuracast=AzuraCastConfig(**_section(data, "azuracast")),
+            recorder=RecorderConfig(**_section(data, "recorder")),
+            monitor=MonitorConfig(**_section(data, "monitor")),
+            analysis=AnalysisConfig(**_section(data, "analysis")),
+            history=HistoryConfig(**_section(data, "history")),
+            journal=JournalConfig(**_section(data, "journal")),
+            fallback=FallbackConfig(**_section(data, "fallback")),
+            scheduling=SchedulingConfig(**_section(data, "scheduling")),
+            trace=TraceConfig(**_section(data, "trace")),
+            adaptive_bitrate=AdaptiveBitrateConfig(**_section(data, "adaptive_bitrate")),
+            stations=[StationConfig(**item) for item in _table_list(data, "stations")],
         )
 
+    def for_station(self, station_id: str) -> "AppConfig":
+        """Resolve one station's full config: top-level sections plus its overrides."""
+        station = next((item for item in self.stations if item.id == station_id), None)
+        if station is None:
+            raise KeyError(f"Unknown station '{station_id}'")
+        data = self.to_dict()
+        data["stations"] = []
+        for key in STATION_SECTIONS:
+            data[key] = merge_dicts(data[key], getattr(station, key))
+        return AppConfig.from_dict(data)
+
 
 def _section(data: Dict[str, Any], key: str) -> Dict[str, Any]:
     value = data.get(key, {})
@@ -123,6 +285,23 @@ def _section(data: Dict[str, Any], key: str) -> Dict[str, Any]:
     return value
 
 
+def _table_list(data: Dict[str, Any], key: str) -> list[Dict[str, Any]]:
+    value = data.get(key, [])
+    if not isinstance(value, list) or not all(isinstance(item, dict) for item in value):
+        raise ValueError(f"Expected '{key}' to be an array of tables")
+    return value
+
+
+def merge_dicts(base: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    merged = dict(base)
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_dicts(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
 def load_config(path: str | Path, validate: bool = True) -> AppConfig:
     config_path = Path(path)
     if not config_path.exists():
@@ -155,6 +334,17 @@ def ensure_config(
     return True
 
 
+def input_latency(input_cfg: InputConfig) -> str | float:
+    """Value for sounddevice's ``latency``: "low", "high" or a float in seconds."""
+    value = str(input_cfg.latency).strip().lower()
+    if value in ("low", "high"):
+        return value
+    seconds = float(value)
+    if not seconds > 0:
+        raise ValueError("latency must be > 0")
+    return seconds
+
+
 def validation_issues(config: AppConfig) -> list[dict[str, str]]:
     issues: list[dict[str, str]] = []
     if config.input.channels not in (1, 2):
@@ -163,8 +353,35 @@ def validation_issues(config: AppConfig) -> list[dict[str, str]]:
         issues.append({"field": "input.sample_rate", "message": "must be > 0"})
     if config.input.limiter_drive <= 0:
         issues.append({"field": "input.limiter_drive", "message": "must be > 0"})
+    if config.input.blocksize < 0:
+        issues.append({"field": "input.blocksize", "message": "must be >= 0 (0 = PortAudio default)"})
+    issues.extend(_routing_issues(config.input))
+    if config.input.capture_rate < 0:
+        issues.append({"field": "input.capture_rate", "message": "must be >= 0 (0 = negotiate)"})
+    if config.input.resample_quality not in ("low", "medium", "high"):
+        issues.append({"field": "input.resample_quality", "message": "must be low, medium, or high"})
+    try:
+        input_latency(config.input)
+    except ValueError:
+        issues.append({"field": "input.latency", "message": "must be low, high, or seconds > 0"})
+    if config.general.log_level not in ("debug", "info", "warning", "error"):
+        issues.append({"field": "general.log_level", "message": "must be debug, info, warning, or error"})
+    if config.general.log_max_kib < 0 or config.general.log_backups < 0:
+        issues.append({"field": "general.log_max_kib", "message": "log_max_kib and log_backups must be >= 0"})
+    if config.general.streamer_backend not in ("thread", "asyncio"):
+        issues.append({"field": "general.streamer_backend", "message": "must be thread or asyncio"})
     if config.stream.format not in {"mp3", "aac", "opus"}:
         issues.append({"field": "stream.format", "message": "must be mp3, aac, or opus"})
+    if config.stream.encoder not in ("ffmpeg", "native"):
+        issues.append({"field": "stream.encoder", "message": "must be ffmpeg or native"})
+    elif config.stream.encoder == "native" and config.stream.format != "mp3":
+        issues.append({"field": "stream.encoder", "message": "native encoder supports mp3 only"})
+    if config.stream.dsp not in ("python", "ffmpeg"):
+        issues.append({"field": "stream.dsp", "message": "must be python or ffmpeg"})
+    elif config.stream.dsp == "ffmpeg" and config.stream.encoder != "ffmpeg":
+        issues.append({"field": "stream.dsp", "message": "ffmpeg DSP needs stream.encoder = 'ffmpeg'"})
+    elif config.stream.dsp == "ffmpeg" and config.fallback.enabled:
+        issues.append({"field": "stream.dsp", "message": "the fallback source needs dsp = 'python'"})
     if config.stream.bitrate_kbps <= 0:
         issues.append({"field": "stream.bitrate_kbps", "message": "must be > 0"})
     if not config.stream.server:
@@ -192,6 +409,149 @@ def validation_issues(config: AppConfig) -> list[dict[str, str]]:
         issues.append({"field": "general.retry_max_delay_seconds", "message": "must be >= 0"})
     if config.general.retry_max_attempts < 0:
         issues.append({"field": "general.retry_max_attempts", "message": "must be >= 0"})
+    if config.general.preflight_timeout_seconds <= 0:
+        issues.append({"field": "general.preflight_timeout_seconds", "message": "must be > 0"})
+    if config.general.stall_timeout_seconds < 0:
+        issues.append({"field": "general.stall_timeout_seconds", "message": "must be >= 0 (0 disables)"})
+    if config.recorder.enabled:
+        if not config.recorder.directory:
+            issues.append({"field": "recorder.directory", "message": "is required when enabled"})
+        if config.recorder.sample_format not in {"s16", "f32"}:
+            issues.append({"field": "recorder.sample_format", "message": "must be s16 or f32"})
+        if config.recorder.segment_seconds <= 0:
+            issues.append({"field": "recorder.segment_seconds", "message": "must be > 0"})
+        if config.recorder.buffer_kib <= 0:
+            issues.append({"field": "recorder.buffer_kib", "message": "must be > 0"})
+        if config.recorder.queue_blocks <= 0:
+            issues.append({"field": "recorder.queue_blocks", "message": "must be > 0"})
+    if config.recorder.fsync_interval_seconds < 0:
+        issues.append({"field": "recorder.fsync_interval_seconds", "message": "must be >= 0"})
+    if config.recorder.retention_max_age_hours < 0:
+        issues.append({"field": "recorder.retention_max_age_hours", "message": "must be >= 0"})
+    if config.recorder.retention_max_mib < 0:
+        issues.append({"field": "recorder.retention_max_mib", "message": "must be >= 0"})
+    if config.monitor.format not in {"mp3", "wav"}:
+        issues.append({"field": "monitor.format", "message": "must be mp3 or wav"})
+    if config.monitor.bitrate_kbps <= 0:
+        issues.append({"field": "monitor.bitrate_kbps", "message": "must be > 0"})
+    if config.monitor.ring_chunks <= 0:
+        issues.append({"field": "monitor.ring_chunks", "message": "must be > 0"})
+    if config.analysis.fft_size < 64 or config.analysis.fft_size & (config.analysis.fft_size - 1):
+        issues.append({"field": "analysis.fft_size", "message": "must be a power of two >= 64"})
+    if config.analysis.decimation <= 0:
+        issues.append({"field": "analysis.decimation", "message": "must be > 0"})
+    if not (1 <= config.analysis.bands <= 255):
+        issues.append({"field": "analysis.bands", "message": "must be 1-255"})
+    if config.analysis.update_hz <= 0:
+        issues.append({"field": "analysis.update_hz", "message": "must be > 0"})
+    if not (1 <= config.analysis.waveform_points <= config.analysis.fft_size):
+        issues.append({"field": "analysis.waveform_points", "message": "must be 1-fft_size"})
+    if config.analysis.min_db >= 0:
+        issues.append({"field": "analysis.min_db", "message": "must be < 0"})
+    if config.journal.capacity <= 0:
+        issues.append({"field": "journal.capacity", "message": "must be > 0"})
+    if config.journal.flush_interval_seconds <= 0:
+        issues.append({"field": "journal.flush_interval_seconds", "message": "must be > 0"})
+    if config.journal.segment_max_kib <= 0:
+        issues.append({"field": "journal.segment_max_kib", "message": "must be > 0"})
+    if config.journal.segments_kept <= 0:
+        issues.append({"field": "journal.segments_kept", "message": "must be > 0"})
+    fallback = config.fallback
+    if fallback.source not in ("tone", "silence", "file"):
+        issues.append({"field": "fallback.source", "message": "must be tone, silence, or file"})
+    if fallback.enabled and fallback.source == "file" and not fallback.file:
+        issues.append({"field": "fallback.file", "message": "is required for a file source"})
+    if fallback.crossfade_ms < 0:
+        issues.append({"field": "fallback.crossfade_ms", "message": "must be >= 0"})
+    if fallback.gap_ms <= 0:
+        issues.append({"field": "fallback.gap_ms", "message": "must be > 0"})
+    if fallback.block_frames <= 0:
+        issues.append({"field": "fallback.block_frames", "message": "must be > 0"})
+    if fallback.silence_timeout_seconds < 0:
+        issues.append({"field": "fallback.silence_timeout_seconds", "message": "must be >= 0 (0 disables)"})
+    scheduling = config.scheduling
+    for name in ("capture", "encoder"):
+        cpus = getattr(scheduling, f"{name}_cpus")
+        if any(not isinstance(cpu, int) or cpu < 0 for cpu in cpus):
+            issues.append({"field": f"scheduling.{name}_cpus", "message": "must be CPU numbers >= 0"})
+        if not (0 <= getattr(scheduling, f"{name}_realtime_priority") <= 99):
+            issues.append({"field": f"scheduling.{name}_realtime_priority", "message": "must be 0-99"})
+        if not (-20 <= getattr(scheduling, f"{name}_nice") <= 19):
+            issues.append({"field": f"scheduling.{name}_nice", "message": "must be -20..19"})
+    if config.trace.capacity <= 0:
+        issues.append({"field": "trace.capacity", "message": "must be > 0"})
+    issues.extend(_adaptive_bitrate_issues(config))
+    if config.stations:
+        # Top-level pipeline sections are only defaults for the stations.
+        issues = [issue for issue in issues if issue["field"].split(".")[0] not in STATION_SECTIONS]
+        issues.extend(_station_issues(config))
+    return issues
+
+
+def _adaptive_bitrate_issues(config: AppConfig) -> list[dict[str, str]]:
+    adaptive = config.adaptive_bitrate
+    issues: list[dict[str, str]] = []
+    ladder = adaptive.ladder_kbps
+    if any(not isinstance(step, int) or step <= 0 for step in ladder):
+        issues.append({"field": "adaptive_bitrate.ladder_kbps", "message": "must be bitrates in kbps > 0"})
+    elif adaptive.enabled and not any(step < config.stream.bitrate_kbps for step in ladder):
+        issues.append({"field": "adaptive_bitrate.ladder_kbps", "message": "needs a step below stream.bitrate_kbps"})
+    if not (0 < adaptive.min_speed <= 1):
+        issues.append({"field": "adaptive_bitrate.min_speed", "message": "must be > 0 and <= 1"})
+    if adaptive.max_backlog_blocks <= 0:
+        issues.append({"field": "adaptive_bitrate.max_backlog_blocks", "message": "must be > 0"})
+    if adaptive.down_after_seconds <= 0:
+        issues.append({"field": "adaptive_bitrate.down_after_seconds", "message": "must be > 0"})
+    if adaptive.up_after_seconds < adaptive.down_after_seconds:
+        issues.append({"field": "adaptive_bitrate.up_after_seconds", "message": "must be >= down_after_seconds"})
+    if adaptive.enabled and (config.stream.encoder != "ffmpeg" or config.general.streamer_backend != "thread"):
+        issues.append(
+            {
+                "field": "adaptive_bitrate.enabled",
+                "message": "needs stream.encoder = 'ffmpeg' and general.streamer_backend = 'thread'",
+            }
+        )
+    return issues
+
+
+def _routing_issues(input_cfg: InputConfig) -> list[dict[str, str]]:
+    if not 0 <= input_cfg.capture_channels <= 64:
+        return [{"field": "input.capture_channels", "message": "must be 0-64 (0 = same as channels)"}]
+    matrix = input_cfg.mix_matrix
+    if not matrix:
+        return []
+    capture = input_cfg.capture_channels or input_cfg.channels
+    rows_ok = isinstance(matrix, list) and len(matrix) == input_cfg.channels
+    if not rows_ok or any(not isinstance(row, list) or len(row) != capture for row in matrix):
+        message = f"must be {input_cfg.channels} rows of {capture} gains (one row per output channel)"
+        return [{"field": "input.mix_matrix", "message": message}]
+    if any(isinstance(gain, bool) or not isinstance(gain, (int, float)) for row in matrix for gain in row):
+        return [{"field": "input.mix_matrix", "message": "gains must be numbers"}]
+    return []
+
+
+def _station_issues(config: AppConfig) -> list[dict[str, str]]:
+    issues: list[dict[str, str]] = []
+    seen: set[str] = set()
+    for index, station in enumerate(config.stations):
+        prefix = f"stations[{station.id or index}]"
+        if not station.id:
+            issues.append({"field": f"{prefix}.id", "message": "is required"})
+            continue
+        if station.id in seen:
+            issues.append({"field": f"{prefix}.id", "message": "must be unique"})
+            continue
+        seen.add(station.id)
+        if any(not isinstance(cpu, int) or cpu < 0 for cpu in station.cpu_affinity):
+            issues.append({"field": f"{prefix}.cpu_affinity", "message": "must be CPU numbers >= 0"})
+        try:
+            resolved = config.for_station(station.id)
+        except (TypeError, ValueError) as exc:
+            issues.append({"field": prefix, "message": str(exc)})
+            continue
+        for issue in validation_issues(resolved):
+            if issue["field"].split(".")[0] in STATION_SECTIONS:
+                issues.append({"field": f"{prefix}.{issue['field']}", "message": issue["message"]})
     return issues
 
 
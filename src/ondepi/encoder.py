@@ -0,0 +1,55 @@
+"""In-process encoders for the native streamer.
+
+An encoder turns float32 (frames, channels) blocks from the AudioEngine into
+bytes ready for the Icecast mount. Bindings are optional dependencies and are
+only imported when the native backend is selected.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from .config import InputConfig, StreamConfig
+
+NATIVE_FORMATS = ("mp3",)
+
+
+class Encoder:
+    """Interface for in-process encoders."""
+
+    content_type = "application/octet-stream"
+
+    def encode(self, block: np.ndarray) -> bytes:
+        raise NotImplementedError
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class LameEncoder(Encoder):
+    """MP3 (CBR) through the `lameenc` binding of libmp3lame."""
+
+    content_type = "audio/mpeg"
+
+    def __init__(self, bitrate_kbps: int, sample_rate: int, channels: int, quality: int = 2) -> None:
+        try:
+            import lameenc
+        except ImportError as exc:
+            raise RuntimeError("stream.encoder = 'native' needs lameenc (pip install ondepi[native])") from exc
+        self._lame = lameenc.Encoder()
+        self._lame.set_bit_rate(bitrate_kbps)
+        self._lame.set_in_sample_rate(sample_rate)
+        self._lame.set_channels(channels)
+        self._lame.set_quality(quality)
+
+    def encode(self, block: np.ndarray) -> bytes:
+        pcm = np.clip(block, -1.0, 1.0) * 32767.0
+        return bytes(self._lame.encode(pcm.astype("<i2").tobytes()))
+
+    def flush(self) -> bytes:
+        return bytes(self._lame.flush())
+
+
+def create_encoder(stream: StreamConfig, input_cfg: InputConfig) -> Encoder:
+    if stream.format.lower() == "mp3":
+        return LameEncoder(stream.bitrate_kbps, input_cfg.sample_rate, input_cfg.channels)
+    raise ValueError(f"no native encoder for '{stream.format}'; use stream.encoder = 'ffmpeg'")
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import subprocess
+from typing import Optional
+
+import numpy as np
+
+from .config import FallbackConfig
+
+MAX_FILE_SECONDS = 600
+
+
+class FallbackSource:
+    """Memory-resident filler loop (tone, silence or a pre-decoded file)."""
+
+    def __init__(self, config: FallbackConfig, sample_rate: int, channels: int) -> None:
+        self.error: Optional[str] = None
+        self.kind = config.source
+        if config.source == "file":
+            try:
+                self._loop = decode_file(config.file, sample_rate, channels)
+            except (OSError, RuntimeError, subprocess.SubprocessError) as exc:
+                self.error = f"fallback file unusable, using tone: {exc}"
+                self.kind = "tone"
+        if self.kind == "tone":
+            self._loop = tone_loop(config.tone_hz, config.level_db, sample_rate, channels)
+        elif self.kind == "silence":
+            self._loop = np.zeros((sample_rate, channels), dtype=np.float32)
+        self._position = 0
+
+    def read(self, frames: int) -> np.ndarray:
+        loop = self._loop
+        size = loop.shape[0]
+        start = self._position
+        if start + frames <= size:
+            block = loop[start : start + frames]
+        else:
+            indices = (start + np.arange(frames)) % size
+            block = loop[indices]
+        self._position = (start + frames) % size
+        return block
+
+
+class SilenceDetector:
+    """Reports silence once the peak stays below a threshold for `timeout` seconds."""
+
+    def __init__(self, threshold_db: float, timeout: float) -> None:
+        self._threshold = 10 ** (threshold_db / 20)
+        self._timeout = timeout
+        self._quiet_for = 0.0
+
+    @property
+    def silent(self) -> bool:
+        return self._timeout > 0 and self._quiet_for >= self._timeout
+
+    def update(self, peak: float, seconds: float) -> bool:
+        self._quiet_for = self._quiet_for + seconds if peak < self._threshold else 0.0
+        return self.silent
+
+
+class Crossfade:
+    """Per-frame linear ramp of the fallback share between 0 (live) and 1 (filler)."""
+
+    def __init__(self, frames: int) -> None:
+        self._step = 1.0 / max(frames, 1)
+        self.share = 0.0
+
+    def mix(
+        self,
+        live: Optional[np.ndarray],
+        filler: FallbackSource,
+        frames: int,
+        target: float,
+    ) -> np.ndarray:
+        if self.share == target == 0.0 and live is not None:
+            return live
+        if self.share == target == 1.0:
+            return filler.read(frames)
+        direction = np.sign(target - self.share) * self._step
+        ramp = self.share + direction * np.arange(1, frames + 1, dtype=np.float32)
+        ramp = np.clip(ramp, min(self.share, target), max(self.share, target))
+        self.share = float(ramp[-1])
+        gains = ramp[:, None]
+        mixed = filler.read(frames) * gains
+        if live is not None:
+            mixed += live * (1.0 - gains)
+        return mixed.astype(np.float32, copy=False)
+
+
+def tone_loop(frequency: float, level_db: float, sample_rate: int, channels: int) -> np.ndarray:
+    # One second holds a whole number of cycles for integer frequencies, so it loops seamlessly.
+    t = np.arange(sample_rate, dtype=np.float64) / sample_rate
+    tone = (10 ** (level_db / 20)) * np.sin(2 * np.pi * round(frequency) * t)
+    return np.repeat(tone[:, None], channels, axis=1).astype(np.float32)
+
+
+def decode_file(path: str, sample_rate: int, channels: int) -> np.ndarray:
+    if not path:
+        raise RuntimeError("fallback.file is not set")
+    command = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        path,
+        "-t",
+        str(MAX_FILE_SECONDS),
+        "-vn",
+        "-ac",
+        str(channels),
+        "-ar",
+        str(sample_rate),
+        "-f",
+        "f32le",
+        "pipe:1",
+    ]
+    result = subprocess.run(command, capture_output=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", errors="ignore").strip() or "decode failed")
+    samples = np.frombuffer(result.stdout, dtype=np.float32)
+    if samples.size < channels:
+        raise RuntimeError("file decoded to no audio")
+    return samples[: samples.size - samples.size % channels].reshape(-1, channels).copy()
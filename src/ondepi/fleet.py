@@ -0,0 +1,263 @@
+"""`ondepi-cli fleet`: status and start/stop across many OndePi nodes at once.
+
+Nodes come from a TOML inventory:
+
+    timeout = 5.0          # per-node seconds, optional
+
+    [[nodes]]
+    name = "venue-a"
+    url = "http://10.0.1.20:8090"
+
+Every node is queried concurrently on one event loop, each over its own
+keep-alive connection that is reused for the follow-up status request.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional, Sequence
+from urllib.parse import urlsplit
+
+try:
+    import tomllib  # Python 3.11+
+except ModuleNotFoundError:  # pragma: no cover - py310 fallback
+    import tomli as tomllib  # type: ignore[import-not-found]
+
+from .top import ApiError
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_CONCURRENCY = 32
+ACTIONS = ("status", "start", "stop")
+
+
+@dataclass
+class Node:
+    name: str
+    url: str
+    timeout: float = DEFAULT_TIMEOUT
+
+
+@dataclass
+class NodeResult:
+    node: Node
+    status: Optional[dict] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.node.name,
+            "url": self.node.url,
+            "ok": self.ok,
+            "error": self.error,
+            "seconds": round(self.seconds, 3),
+            "status": self.status,
+        }
+
+
+def load_inventory(path: str | Path) -> list[Node]:
+    with Path(path).open("rb") as handle:
+        data = tomllib.load(handle)
+    default_timeout = float(data.get("timeout", DEFAULT_TIMEOUT))
+    nodes: list[Node] = []
+    for index, item in enumerate(data.get("nodes", [])):
+        if not isinstance(item, dict) or not item.get("url"):
+            raise ValueError(f"nodes[{index}]: url is required")
+        name = str(item.get("name") or urlsplit(item["url"]).netloc)
+        if any(node.name == name for node in nodes):
+            raise ValueError(f"nodes[{index}]: duplicate name '{name}'")
+        nodes.append(Node(name=name, url=str(item["url"]), timeout=float(item.get("timeout", default_timeout))))
+    if not nodes:
+        raise ValueError("inventory has no [[nodes]]")
+    return nodes
+
+
+class NodeConnection:
+    """HTTP/1.1 keep-alive connection to one node, reopened when it breaks."""
+
+    def __init__(self, node: Node) -> None:
+        parts = urlsplit(node.url)
+        if parts.scheme not in ("", "http"):
+            raise ValueError(f"{node.name}: only http:// nodes are supported")
+        self._host = parts.hostname or "127.0.0.1"
+        self._port = parts.port or 80
+        self._prefix = parts.path.rstrip("/")
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self.connections = 0
+
+    async def request(self, method: str, path: str) -> dict:
+        reused = self._writer is not None
+        try:
+            status, body = await self._exchange(method, path)
+        except (OSError, asyncio.IncompleteReadError, ApiError):
+            self.close()
+            if not reused:
+                raise
+            # The node may have dropped the idle connection: retry once on a fresh one.
+            status, body = await self._exchange(method, path)
+        if status >= 400:
+            detail = _detail(body)
+            raise ApiError(f"{method} {path}: HTTP {status}" + (f" ({detail})" if detail else ""))
+        return json.loads(body or b"{}")
+
+    async def _exchange(self, method: str, path: str) -> tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
+            self.connections += 1
+        assert self._reader is not None
+        self._writer.write(
+            f"{method} {self._prefix}{path} HTTP/1.1\r\nHost: {self._host}:{self._port}\r\n"
+            f"Content-Length: 0\r\nConnection: keep-alive\r\n\r\n".encode("ascii")
+        )
+        await self._writer.drain()
+        status_line = await self._reader.readline()
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise ApiError(f"{method} {path}: malformed response")
+        headers = {}
+        while (line := await self._reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked()
+        else:
+            body = await self._reader.readexactly(int(headers.get("content-length", 0)))
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return int(parts[1]), body
+
+    async def _read_chunked(self) -> bytes:
+        assert self._reader is not None
+        body = bytearray()
+        while True:
+            size = int((await self._reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await self._reader.readline()
+                return bytes(body)
+            body += await self._reader.readexactly(size)
+            await self._reader.readline()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+class FleetClient:
+    """Runs one action on every node, at most `concurrency` at a time."""
+
+    def __init__(self, nodes: Sequence[Node], concurrency: int = DEFAULT_CONCURRENCY) -> None:
+        self.nodes = list(nodes)
+        self._connections: dict[str, NodeConnection] = {}
+        self._concurrency = max(concurrency, 1)
+
+    def connection(self, node: Node) -> NodeConnection:
+        """The node's keep-alive connection, created on first use (raises ValueError for a bad URL)."""
+        connection = self._connections.get(node.name)
+        if connection is None:
+            connection = self._connections[node.name] = NodeConnection(node)
+        return connection
+
+    async def run(self, action: str) -> list[NodeResult]:
+        if action not in ACTIONS:
+            raise ValueError(f"unknown action '{action}'")
+        slots = asyncio.Semaphore(self._concurrency)
+        return list(await asyncio.gather(*(self._run_node(node, action, slots) for node in self.nodes)))
+
+    async def _run_node(self, node: Node, action: str, slots: asyncio.Semaphore) -> NodeResult:
+        result = NodeResult(node)
+        async with slots:
+            started = time.monotonic()
+            try:
+                result.status = await asyncio.wait_for(self._call(node, action), node.timeout)
+            except asyncio.TimeoutError:
+                connection = self._connections.get(node.name)
+                if connection is not None:
+                    connection.close()
+                result.error = f"timed out after {node.timeout:g}s"
+            except (OSError, asyncio.IncompleteReadError, ApiError, ValueError) as exc:
+                result.error = str(exc) or exc.__class__.__name__
+            result.seconds = time.monotonic() - started
+        return result
+
+    async def _call(self, node: Node, action: str) -> dict:
+        connection = self.connection(node)
+        if action != "status":
+            await connection.request("POST", f"/api/stream/{action}")
+        return await connection.request("GET", "/api/status")
+
+    def close(self) -> None:
+        for connection in self._connections.values():
+            connection.close()
+
+
+def format_table(results: Sequence[NodeResult]) -> str:
+    header = ("NODE", "STATE", "GAIN", "RETRIES", "ENCODER", "TIME", "ERROR")
+    rows = [header]
+    for result in results:
+        state = (result.status or {}).get("state") or {}
+        stream = (result.status or {}).get("stream") or {}
+        if not result.ok:
+            rows.append((result.node.name, "unreachable", "", "", "", f"{result.seconds * 1000:.0f}ms", result.error))
+            continue
+        on_air = "on air" if state.get("streaming") else ("retrying" if stream.get("retrying") else "stopped")
+        rows.append(
+            (
+                result.node.name,
+                on_air,
+                f"{state.get('gain_db', 0.0):+.1f} dB",
+                str(state.get("retry_count", 0)),
+                str(stream.get("encoder", "ffmpeg")),
+                f"{result.seconds * 1000:.0f}ms",
+                state.get("last_error") or "",
+            )
+        )
+    widths = [max(len(str(row[column])) for row in rows) for column in range(len(header))]
+    return "\n".join(
+        "  ".join(str(cell).ljust(width) for cell, width in zip(row, widths)).rstrip() for row in rows
+    )
+
+
+def run_fleet(
+    inventory: str | Path,
+    action: str = "status",
+    as_json: bool = False,
+    timeout: Optional[float] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> int:
+    """Print the fleet's status after `action`; returns 1 if any node failed."""
+    nodes = load_inventory(inventory)
+    if timeout is not None:
+        for node in nodes:
+            node.timeout = timeout
+
+    async def _run() -> list[NodeResult]:
+        client = FleetClient(nodes, concurrency)
+        try:
+            return await client.run(action)
+        finally:
+            client.close()
+
+    results = asyncio.run(_run())
+    if as_json:
+        print(json.dumps([result.as_dict() for result in results], indent=2))
+    else:
+        print(format_table(results))
+        failed = sum(not result.ok for result in results)
+        print(f"\n{len(results) - failed}/{len(results)} nodes ok")
+    return 1 if any(not result.ok for result in results) else 0
+
+
+def _detail(body: bytes) -> Any:
+    try:
+        return json.loads(body).get("detail")
+    except (ValueError, AttributeError):
+        return None
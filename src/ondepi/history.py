@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import math
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .audio import AudioEngine
+from .config import HistoryConfig
+
+# (seconds per row, rows kept): 24 h at 1 s, 24 h at 10 s, 7 days at 1 min.
+TIERS = ((1, 86400), (10, 8640), (60, 10080))
+MAX_QUERY_POINTS = 5000
+QUEUE_BLOCKS = 4096  # ~90 s of 1024-frame blocks at 48 kHz
+
+
+def history_dtype(channels: int) -> np.dtype:
+    return np.dtype(
+        [
+            ("t", "<i8"),
+            ("min", "<f4", (channels,)),
+            ("max", "<f4", (channels,)),
+            ("rms", "<f4", (channels,)),
+            ("peak", "<f4", (channels,)),
+        ]
+    )
+
+
+class _Tier:
+    """Fixed-size ring of rows indexed by (t // resolution) % size."""
+
+    def __init__(self, resolution: int, size: int, channels: int, path: Optional[Path]) -> None:
+        self.resolution = resolution
+        self.size = size
+        self.rows = _open_rows(path, size, history_dtype(channels))
+        self._acc_t: Optional[int] = None
+        self._acc_min = np.full(channels, np.inf, dtype=np.float32)
+        self._acc_max = np.full(channels, -np.inf, dtype=np.float32)
+        self._acc_sq = np.zeros(channels, dtype=np.float64)
+        self._acc_peak = np.zeros(channels, dtype=np.float32)
+        self._acc_rows = 0
+
+    def add(self, t: int, row_min, row_max, row_rms, row_peak) -> Optional[tuple]:
+        """Fold one finer row in; returns the finished row when the bucket rolls over."""
+        bucket = t - t % self.resolution
+        finished = None
+        if self._acc_t is not None and bucket != self._acc_t:
+            finished = self._commit()
+        self._acc_t = bucket
+        np.minimum(self._acc_min, row_min, out=self._acc_min)
+        np.maximum(self._acc_max, row_max, out=self._acc_max)
+        self._acc_sq += np.square(row_rms, dtype=np.float64)
+        np.maximum(self._acc_peak, row_peak, out=self._acc_peak)
+        self._acc_rows += 1
+        return finished
+
+    def _commit(self) -> tuple:
+        rms = np.sqrt(self._acc_sq / max(self._acc_rows, 1)).astype(np.float32)
+        row = (self._acc_t, self._acc_min.copy(), self._acc_max.copy(), rms, self._acc_peak.copy())
+        self.rows[(self._acc_t // self.resolution) % self.size] = row
+        self._acc_min.fill(np.inf)
+        self._acc_max.fill(-np.inf)
+        self._acc_sq.fill(0)
+        self._acc_peak.fill(0)
+        self._acc_rows = 0
+        return row
+
+    def flush(self) -> None:
+        if isinstance(self.rows, np.memmap):
+            self.rows.flush()
+
+
+class LevelHistory:
+    """Per-second min/max/RMS/peak per channel with 10 s and 1 min rollups.
+
+    Memory is fixed at construction; with `path` set the rings are memory-mapped
+    `.npy` files so history survives restarts. The audio callback only reduces
+    each block to one row and queues it; a worker thread writes the rings, so
+    page faults and msync never stall the callback.
+    """
+
+    def __init__(
+        self,
+        config: HistoryConfig,
+        channels: int,
+        audio_engine: Optional[AudioEngine] = None,
+        clock=time.time,
+    ) -> None:
+        self._config = config
+        self._channels = channels
+        self._audio_engine = audio_engine
+        self._clock = clock
+        self._tiers = _build_tiers(config, channels)
+        self._lock = threading.Lock()  # rings; never taken on the audio path
+        self._queue: queue.Queue = queue.Queue(maxsize=QUEUE_BLOCKS)
+        self._dropped_blocks = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def update_config(self, config: HistoryConfig, channels: int) -> None:
+        """Adopt a new config; a new channel count or path starts from empty rings."""
+        rebuild = channels != self._channels or config.path != self._config.path
+        self._config = config
+        if not rebuild:
+            return
+        tiers = _build_tiers(config, channels)
+        with self._lock:
+            self._drain_locked()
+            for tier in self._tiers:
+                tier.flush()
+            self._tiers = tiers
+            self._channels = channels
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="level-history", daemon=True)
+        self._thread.start()
+        if self._audio_engine:
+            self._audio_engine.add_consumer(self.consume)
+
+    def stop(self) -> None:
+        if self._audio_engine:
+            self._audio_engine.remove_consumer(self.consume)
+        self._running = False
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        with self._lock:
+            self._drain_locked()
+            for tier in self._tiers:
+                tier.flush()
+
+    def consume(self, chunk: np.ndarray) -> None:
+        if chunk.ndim == 1:
+            chunk = chunk.reshape(-1, 1)
+        if not len(chunk):
+            return
+        t = int(self._clock())
+        row_min = chunk.min(axis=0)
+        row_max = chunk.max(axis=0)
+        rms = np.sqrt(np.mean(np.square(chunk), axis=0))
+        peak = np.maximum(np.abs(row_min), np.abs(row_max))
+        try:
+            self._queue.put_nowait((t, row_min, row_max, rms, peak))
+        except queue.Full:
+            self._dropped_blocks += 1
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                row = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._add_row(row)
+                self._drain_locked()
+
+    def _drain_locked(self) -> None:
+        while True:
+            try:
+                row = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._add_row(row)
+
+    def _add_row(self, row: tuple) -> None:
+        # Rows queued before a channel change no longer fit the rings.
+        if len(row[1]) == self._channels:
+            self._add(0, *row)
+
+    def _add(self, index: int, t: int, row_min, row_max, rms, peak) -> None:
+        finished = self._tiers[index].add(t, row_min, row_max, rms, peak)
+        if finished is not None and index + 1 < len(self._tiers):
+            self._add(index + 1, *finished)
+
+    def query(self, start: float, end: float, resolution: Optional[int] = None) -> dict:
+        """Rows in [start, end] at `resolution` seconds; cost scales with points returned."""
+        if end < start:
+            raise ValueError("end must be >= start")
+        span = end - start
+        if resolution is None:
+            resolution = next(
+                (res for res, _ in TIERS if span / res <= 1000),
+                max(TIERS[-1][0], int(math.ceil(span / 1000))),
+            )
+        if resolution <= 0:
+            raise ValueError("resolution must be > 0")
+
+        with self._lock:
+            # Fold in what the worker has not reached yet, so a query sees every consumed block.
+            self._drain_locked()
+            tiers, channels = self._tiers, self._channels
+        tier = [tier for tier in tiers if tier.resolution <= resolution][-1]
+        group = max(resolution // tier.resolution, 1)
+        # Snap to a multiple of the tier first so the grid below reaches `end`.
+        resolution = group * tier.resolution
+        first = int(start) - int(start) % resolution
+        points = int((end - first) // resolution) + 1
+        if points > MAX_QUERY_POINTS:
+            raise ValueError(f"query would return {points} points (max {MAX_QUERY_POINTS})")
+        times = first + np.arange(points) * resolution
+        fine = (times[:, None] + np.arange(group) * tier.resolution).ravel()
+        with self._lock:
+            rows = tier.rows[(fine // tier.resolution) % tier.size]
+        valid = rows["t"] == fine
+
+        shape = (points, group, channels)
+        mins = np.where(valid[:, None], rows["min"], np.nan).reshape(shape)
+        maxs = np.where(valid[:, None], rows["max"], np.nan).reshape(shape)
+        peaks = np.where(valid[:, None], rows["peak"], np.nan).reshape(shape)
+        sq = np.where(valid[:, None], np.square(rows["rms"], dtype=np.float64), 0.0).reshape(shape)
+        counts = valid.reshape(points, group).sum(axis=1)
+        present = counts > 0
+        rms = np.sqrt(sq.sum(axis=1) / np.maximum(counts, 1)[:, None])
+        result = {
+            "min": _rows_or_none(np.fmin.reduce(mins, axis=1), present),
+            "max": _rows_or_none(np.fmax.reduce(maxs, axis=1), present),
+            "rms": _rows_or_none(rms, present),
+            "peak": _rows_or_none(np.fmax.reduce(peaks, axis=1), present),
+        }
+        return {
+            "resolution": resolution,
+            "channels": channels,
+            "t": times.tolist(),
+            **result,
+        }
+
+
+def _build_tiers(config: HistoryConfig, channels: int) -> list[_Tier]:
+    directory = Path(config.path) if config.path else None
+    if directory:
+        directory.mkdir(parents=True, exist_ok=True)
+    return [
+        _Tier(resolution, size, channels, directory / f"levels-{resolution}s.npy" if directory else None)
+        for resolution, size in TIERS
+    ]
+
+
+def _rows_or_none(values: np.ndarray, present: np.ndarray) -> list:
+    return [row.tolist() if ok else None for row, ok in zip(values, present)]
+
+
+def _open_rows(path: Optional[Path], size: int, dtype: np.dtype) -> np.ndarray:
+    if path is None:
+        rows = np.zeros(size, dtype=dtype)
+        rows["t"] = -1
+        return rows
+    if path.exists():
+        try:
+            rows = np.lib.format.open_memmap(path, mode="r+")
+            if rows.dtype == dtype and rows.shape == (size,):
+                return rows
+        except (ValueError, OSError):
+            pass
+    rows = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(size,))
+    rows["t"] = -1
+    return rows
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import base64
+import socket
+from typing import Optional
+
+from .config import InputConfig, MetadataConfig, StreamConfig
+from .reconnect import AUTH, CODEC, MOUNT_IN_USE, NETWORK, UNKNOWN
+
+USER_AGENT = "OndePi"
+MAX_RESPONSE_BYTES = 8192
+
+_STATUS_CLASSES = {401: AUTH, 403: MOUNT_IN_USE, 415: CODEC}
+
+
+class IcecastError(Exception):
+    """Source connection failure, tagged with a reconnect exit class."""
+
+    def __init__(self, message: str, exit_class: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.exit_class = exit_class
+        self.status = status
+
+
+class IcecastSource:
+    """Minimal Icecast source client.
+
+    Uses HTTP PUT (Icecast >= 2.4) and falls back to the legacy SOURCE method
+    when the server rejects PUT. The connection is independent of the encoder,
+    so a reconnect only re-opens the socket.
+    """
+
+    def __init__(
+        self,
+        stream: StreamConfig,
+        metadata: MetadataConfig,
+        input_cfg: InputConfig,
+        content_type: str,
+        timeout: float = 10.0,
+        send_timeout: Optional[float] = None,
+    ) -> None:
+        self._stream = stream
+        self._metadata = metadata
+        self._input = input_cfg
+        self._content_type = content_type
+        self._timeout = timeout
+        self._send_timeout = send_timeout
+        self._sock: Optional[socket.socket] = None
+        self.method = "PUT"
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def connect(self) -> None:
+        self.close()
+        try:
+            self._handshake("PUT")
+        except IcecastError as exc:
+            if exc.status not in (400, 405, 501):
+                raise
+            self._handshake("SOURCE")
+
+    def send(self, data: bytes) -> None:
+        if self._sock is None:
+            raise IcecastError("not connected", NETWORK)
+        try:
+            self._sock.sendall(data)
+        except OSError as exc:
+            self.close()
+            raise IcecastError(f"send failed: {str(exc) or exc.__class__.__name__}", NETWORK) from exc
+
+    def close(self) -> None:
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _handshake(self, method: str) -> None:
+        stream = self._stream
+        try:
+            sock = socket.create_connection((stream.server, stream.port), timeout=self._timeout)
+        except OSError as exc:
+            raise IcecastError(f"connect to {stream.server}:{stream.port} failed: {exc}", NETWORK) from exc
+        try:
+            sock.sendall(self._request(method))
+            status, reason = _read_status(sock)
+        except OSError as exc:
+            sock.close()
+            raise IcecastError(f"handshake failed: {str(exc) or exc.__class__.__name__}", NETWORK) from exc
+        if status not in (100, 200):
+            sock.close()
+            raise IcecastError(
+                f"server refused source: {status} {reason}".strip(),
+                _STATUS_CLASSES.get(status, UNKNOWN),
+                status,
+            )
+        sock.settimeout(self._send_timeout)
+        self._sock = sock
+        self.method = method
+
+    def _request(self, method: str) -> bytes:
+        stream = self._stream
+        metadata = self._metadata
+        credentials = base64.b64encode(f"{stream.username}:{stream.password}".encode("utf-8")).decode("ascii")
+        mount = "/" + stream.mount.lstrip("/")
+        version = "HTTP/1.1" if method == "PUT" else "HTTP/1.0"
+        headers = [
+            f"{method} {mount} {version}",
+            f"Host: {stream.server}:{stream.port}",
+            f"User-Agent: {USER_AGENT}",
+            f"Authorization: Basic {credentials}",
+            f"Content-Type: {self._content_type}",
+            f"Ice-Public: {int(metadata.public)}",
+            f"Ice-Name: {metadata.name}",
+            f"Ice-Description: {metadata.description}",
+            f"Ice-Genre: {metadata.genre}",
+            f"Ice-Audio-Info: bitrate={stream.bitrate_kbps};channels={self._input.channels};"
+            f"samplerate={self._input.sample_rate}",
+        ]
+        if method == "PUT":
+            headers.append("Expect: 100-continue")
+        return ("\r\n".join(headers) + "\r\n\r\n").encode("utf-8")
+
+
+def _read_status(sock: socket.socket) -> tuple[int, str]:
+    """Read the response head and return its status code and reason."""
+    data = b""
+    while b"\r\n\r\n" not in data and b"\n\n" not in data:
+        chunk = sock.recv(1024)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > MAX_RESPONSE_BYTES:
+            break
+    line = data.split(b"\n", 1)[0].decode("latin-1").strip()
+    parts = line.split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith(("HTTP/", "ICE/")) or not parts[1].isdigit():
+        raise OSError(f"unexpected response {line!r}" if line else "connection closed")
+    return int(parts[1]), parts[2] if len(parts) > 2 else ""
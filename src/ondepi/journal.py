@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from .config import JournalConfig
+
+SEGMENT_PREFIX = "events-"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+@dataclass
+class JournalEvent:
+    seq: int
+    ts: float
+    kind: str
+    message: str
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "seq": self.seq,
+            "ts": self.ts,
+            "kind": self.kind,
+            "message": self.message,
+            "data": self.data,
+        }
+
+
+class EventJournal:
+    """Append-only incident journal.
+
+    Recent events live in a bounded ring with a per-kind index. When a path is
+    configured, a background thread appends batches to size-rotated JSONL
+    segments and the tail is reloaded on startup.
+    """
+
+    def __init__(self, config: JournalConfig, clock=time.time) -> None:
+        self._config = config
+        self._clock = clock
+        capacity = max(config.capacity, 1)
+        self._events: deque[JournalEvent] = deque(maxlen=capacity)
+        self._by_kind: Dict[str, deque[JournalEvent]] = {}
+        self._lock = threading.Lock()
+        self._next_seq = 1
+        self._pending: list[JournalEvent] = []
+        self._flush_event = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._directory = Path(config.path) if config.path else None
+        self._bytes_in_segment = 0
+        self._segment_index = 0
+        self.write_errors = 0
+        if self._directory:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            self._load_tail()
+
+    def start(self) -> None:
+        if not self._directory or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._flush_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def record(self, kind: str, message: str, **data: Any) -> JournalEvent:
+        with self._lock:
+            event = JournalEvent(
+                seq=self._next_seq,
+                ts=self._clock(),
+                kind=kind,
+                message=message,
+                data=data,
+            )
+            self._next_seq += 1
+            self._append(event)
+            if self._directory:
+                self._pending.append(event)
+        return event
+
+    def query(
+        self,
+        since: int = 0,
+        kinds: Optional[Iterable[str]] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        limit: int = 200,
+    ) -> list[JournalEvent]:
+        """Events with seq > since, optionally filtered by kind and [start, end]."""
+        with self._lock:
+            if kinds:
+                sources = [self._by_kind[kind] for kind in kinds if kind in self._by_kind]
+            else:
+                sources = [self._events]
+            selected: list[JournalEvent] = []
+            for source in sources:
+                selected.extend(_slice(source, since, start, end))
+        if kinds and len(sources) > 1:
+            selected.sort(key=lambda event: event.seq)
+        return selected[-limit:] if limit > 0 else selected
+
+    def latest_seq(self) -> int:
+        return self._next_seq - 1
+
+    def kinds(self) -> list[str]:
+        with self._lock:
+            return sorted(self._by_kind)
+
+    def _append(self, event: JournalEvent) -> None:
+        self._events.append(event)
+        index = self._by_kind.get(event.kind)
+        if index is None:
+            index = deque(maxlen=self._events.maxlen)
+            self._by_kind[event.kind] = index
+        index.append(event)
+        oldest = self._events[0].seq
+        for kind_events in self._by_kind.values():
+            while kind_events and kind_events[0].seq < oldest:
+                kind_events.popleft()
+
+    def _run(self) -> None:
+        interval = max(self._config.flush_interval_seconds, 0.1)
+        while not self._stop.is_set():
+            self._flush_event.wait(interval)
+            self._flush_event.clear()
+            self._flush()
+        self._flush()
+
+    def _flush(self) -> None:
+        with self._lock:
+            batch = self._pending
+            self._pending = []
+        if not batch or not self._directory:
+            return
+        payload = "".join(json.dumps(event.as_dict(), separators=(",", ":")) + "\n" for event in batch)
+        encoded = payload.encode("utf-8")
+        try:
+            if self._bytes_in_segment and self._bytes_in_segment + len(encoded) > self._segment_bytes():
+                self._rotate()
+            with self._segment_path(self._segment_index).open("ab") as handle:
+                handle.write(encoded)
+            self._bytes_in_segment += len(encoded)
+        except OSError:
+            self.write_errors += 1
+
+    def _rotate(self) -> None:
+        self._segment_index += 1
+        self._bytes_in_segment = 0
+        keep = max(self._config.segments_kept, 1)
+        for path in self._segments()[:-keep + 1 or None]:
+            path.unlink(missing_ok=True)
+
+    def _segment_bytes(self) -> int:
+        return max(self._config.segment_max_kib, 1) * 1024
+
+    def _segment_path(self, index: int) -> Path:
+        assert self._directory is not None
+        return self._directory / f"{SEGMENT_PREFIX}{index:06d}{SEGMENT_SUFFIX}"
+
+    def _segments(self) -> list[Path]:
+        assert self._directory is not None
+        return sorted(self._directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    def _load_tail(self) -> None:
+        segments = self._segments()
+        if not segments:
+            return
+        last = segments[-1]
+        self._segment_index = int(last.name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+        self._bytes_in_segment = last.stat().st_size
+        loaded: deque[JournalEvent] = deque(maxlen=self._events.maxlen)
+        for path in segments[-2:]:
+            for line in path.read_text(encoding="utf-8", errors="ignore").splitlines():
+                try:
+                    raw = json.loads(line)
+                    loaded.append(JournalEvent(**raw))
+                except (ValueError, TypeError):
+                    continue
+        for event in loaded:
+            self._append(event)
+        if loaded:
+            self._next_seq = loaded[-1].seq + 1
+
+
+def _slice(
+    events: Sequence[JournalEvent],
+    since: int,
+    start: Optional[float],
+    end: Optional[float],
+) -> list[JournalEvent]:
+    # Events are appended in seq and time order, so both filters are bisections.
+    low = bisect.bisect_right(events, since, key=_seq_key)
+    if start is not None:
+        low = max(low, bisect.bisect_left(events, start, key=_ts_key))
+    high = len(events)
+    if end is not None:
+        high = bisect.bisect_right(events, end, key=_ts_key)
+    return list(islice(events, low, high)) if low < high else []
+
+
+def _seq_key(event: JournalEvent) -> int:
+    return event.seq
+
+
+def _ts_key(event: JournalEvent) -> float:
+    return event.ts
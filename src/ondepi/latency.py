@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import os
+import select
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+from .audio import AudioEngine
+from .config import AppConfig, StreamConfig
+from .journal import EventJournal
+
+MARKER_HZ = 3000.0
+MARKER_SECONDS = 0.25
+MARKER_LEVEL = 0.25
+RECEIVER_RATE = 16000
+WINDOW_FRAMES = 256  # 16 ms at RECEIVER_RATE; MARKER_HZ sits exactly on a DFT bin
+SETTLE_SECONDS = 2.0
+
+
+class LatencyProbe:
+    """Measures glass-to-Icecast latency of the running stream.
+
+    A local ffmpeg listener decodes the public mount. Once Icecast's
+    burst-on-connect has drained, a short marker tone is mixed into the live
+    signal and the delay until it comes back out of the mount is recorded
+    together with the input/stream settings that produced it.
+    """
+
+    def __init__(
+        self,
+        audio_engine: AudioEngine,
+        journal: Optional[EventJournal] = None,
+        keep: int = 20,
+    ) -> None:
+        self._audio_engine = audio_engine
+        self._journal = journal
+        self._results: deque[dict] = deque(maxlen=keep)
+        self._busy = threading.Lock()
+
+    def results(self) -> list[dict]:
+        return list(self._results)
+
+    def run(self, config: AppConfig, timeout: float = 10.0) -> dict:
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError("a latency probe is already running")
+        try:
+            result = self._measure(config, timeout)
+        finally:
+            self._busy.release()
+        self._results.append(result)
+        if self._journal:
+            message = (
+                f"latency {result['latency_ms']} ms" if result["detected"] else "latency marker not detected"
+            )
+            self._journal.record("latency.probe", message, **result)
+        return result
+
+    def _measure(self, config: AppConfig, timeout: float) -> dict:
+        input_cfg = config.input
+        process = subprocess.Popen(
+            build_receiver_command(config.stream),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        assert process.stdout is not None
+        reader = _PcmReader(process.stdout.fileno())
+        latency_ms: Optional[float] = None
+        injection = None
+        try:
+            deadline = time.monotonic() + SETTLE_SECONDS
+            while time.monotonic() < deadline:
+                if reader.read(deadline - time.monotonic()) is None and process.poll() is not None:
+                    raise RuntimeError("could not listen to the mount; is the stream running?")
+            injection = self._audio_engine.inject(
+                marker_tone(input_cfg.sample_rate, input_cfg.channels)
+            )
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                window = reader.read(deadline - time.monotonic())
+                if window is None:
+                    if process.poll() is not None:
+                        break
+                    continue
+                if injection.started_at is None:
+                    continue  # audio older than the marker
+                if tone_ratio(window, RECEIVER_RATE, MARKER_HZ) >= 0.6 and _rms(window) >= 0.01:
+                    latency_ms = round((reader.arrived_at - injection.started_at) * 1000, 1)
+                    break
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        return {
+            "at": time.time(),
+            "detected": latency_ms is not None,
+            "latency_ms": latency_ms,
+            "capture_delay_ms": round(injection.capture_delay * 1000, 1) if injection else None,
+            "resolution_ms": round(WINDOW_FRAMES / RECEIVER_RATE * 1000, 1),
+            "settings": {
+                "blocksize": input_cfg.blocksize,
+                "latency": input_cfg.latency,
+                "sample_rate": input_cfg.sample_rate,
+                "low_latency": config.stream.low_latency,
+                "format": config.stream.format,
+                "bitrate_kbps": config.stream.bitrate_kbps,
+            },
+        }
+
+
+class _PcmReader:
+    """Splits the receiver's f32le output into fixed windows, noting arrival time."""
+
+    def __init__(self, fd: int) -> None:
+        self._fd = fd
+        self._buffer = bytearray()
+        self.arrived_at = 0.0
+
+    def read(self, timeout: float) -> Optional[np.ndarray]:
+        size = WINDOW_FRAMES * 4
+        if len(self._buffer) < size:
+            ready, _, _ = select.select([self._fd], [], [], max(timeout, 0.0))
+            if not ready:
+                return None
+            data = os.read(self._fd, 65536)
+            if not data:
+                return None
+            self._buffer.extend(data)
+            self.arrived_at = time.monotonic()
+            if len(self._buffer) < size:
+                return None
+        window = np.frombuffer(bytes(self._buffer[:size]), dtype=np.float32)
+        del self._buffer[:size]
+        return window
+
+
+def build_receiver_command(stream: StreamConfig) -> list[str]:
+    mount = stream.mount.lstrip("/")
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-fflags",
+        "nobuffer",
+        "-flags",
+        "low_delay",
+        "-analyzeduration",
+        "0",
+        "-i",
+        f"http://{stream.server}:{stream.port}/{mount}",
+        "-vn",
+        "-ac",
+        "1",
+        "-ar",
+        str(RECEIVER_RATE),
+        "-f",
+        "f32le",
+        "pipe:1",
+    ]
+
+
+def marker_tone(
+    sample_rate: int,
+    channels: int,
+    seconds: float = MARKER_SECONDS,
+    frequency: float = MARKER_HZ,
+    level: float = MARKER_LEVEL,
+) -> np.ndarray:
+    frames = int(sample_rate * seconds)
+    t = np.arange(frames, dtype=np.float32) / sample_rate
+    tone = level * np.sin(2 * np.pi * frequency * t)
+    ramp = min(int(sample_rate * 0.005), frames // 2)  # 5 ms fades avoid clicks
+    if ramp:
+        fade = np.linspace(0.0, 1.0, ramp, dtype=np.float32)
+        tone[:ramp] *= fade
+        tone[-ramp:] *= fade[::-1]
+    return np.repeat(tone[:, None], channels, axis=1).astype(np.float32)
+
+
+def tone_ratio(window: np.ndarray, sample_rate: int, frequency: float) -> float:
+    """Share of the window's energy at `frequency` (single-bin DFT, 1.0 = pure tone)."""
+    energy = float(np.dot(window, window))
+    if energy <= 0:
+        return 0.0
+    n = window.shape[0]
+    phase = 2 * np.pi * frequency / sample_rate * np.arange(n)
+    real = float(np.dot(window, np.cos(phase)))
+    imag = float(np.dot(window, np.sin(phase)))
+    return 2 * (real * real + imag * imag) / (n * energy)
+
+
+def find_marker(
+    samples: np.ndarray,
+    sample_rate: int = RECEIVER_RATE,
+    frequency: float = MARKER_HZ,
+    threshold: float = 0.6,
+) -> Optional[int]:
+    """Index of the first window that carries the marker tone, if any."""
+    for start in range(0, samples.shape[0] - WINDOW_FRAMES + 1, WINDOW_FRAMES):
+        window = samples[start : start + WINDOW_FRAMES]
+        if tone_ratio(window, sample_rate, frequency) >= threshold and _rms(window) >= 0.01:
+            return start
+    return None
+
+
+def _rms(window: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(np.square(window))))
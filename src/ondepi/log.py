@@ -0,0 +1,152 @@
+"""Structured logging: JSON lines written by a background thread.
+
+Emitting threads only build a LogRecord and put it on a SimpleQueue; the
+audio callback does not log at all and leaves reporting to a helper thread.
+Message formatting, JSON encoding and file I/O happen in the listener
+thread; repeated messages are rate-limited before they are queued.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from .config import GeneralConfig
+
+LOGGER_NAME = "ondepi"
+LEVELS = ("debug", "info", "warning", "error")
+
+# Journal event kinds logged at warning level; everything else is info.
+WARNING_EVENTS = frozenset(
+    {
+        "device.error",
+        "device.disconnected",
+        "fallback.engaged",
+        "fallback.error",
+        "metadata.error",
+        "station.crash",
+        "stream.exit",
+        "stream.giveup",
+        "stream.probe",
+        "stream.stall",
+    }
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key in ("event", "data", "suppressed"):
+            value = getattr(record, key, None)
+            if value:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Passes one record per logger and message template per `window` seconds.
+
+    The next record let through carries `suppressed`, the number dropped in
+    between. Keys are the unformatted template, so this costs one dict lookup.
+    """
+
+    def __init__(self, window: float) -> None:
+        super().__init__()
+        self._window = window
+        self._seen: dict[tuple, list] = {}
+        self._lock = threading.Lock()  # records arrive from many threads
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self._window <= 0:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and record.created - entry[0] < self._window:
+                entry[1] += 1
+                return False
+            if entry is not None and entry[1]:
+                record.suppressed = entry[1]
+            self._seen[key] = [record.created, 0]
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging(general: GeneralConfig, suffix: str = "") -> None:
+    """Route the `ondepi` loggers through the queue to stderr or `log_file`.
+
+    `suffix` is appended to the file name, so station workers get their own file.
+    """
+    global _listener
+    shutdown_logging()
+    if general.log_file:
+        path = Path(general.log_file)
+        if suffix:
+            path = path.with_name(f"{path.stem}.{suffix}{path.suffix}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler: logging.Handler = logging.handlers.RotatingFileHandler(
+            path,
+            maxBytes=max(general.log_max_kib, 0) * 1024,
+            backupCount=max(general.log_backups, 0),
+            encoding="utf-8",
+        )
+    else:
+        handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(records)
+    queue_handler.addFilter(RateLimitFilter(general.log_rate_limit_seconds))
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [queue_handler]
+    logger.propagate = False
+    set_log_level(general.log_level)
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+
+
+def set_log_level(level: str) -> None:
+    logging.getLogger(LOGGER_NAME).setLevel(level.upper() if level in LEVELS else logging.INFO)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.handlers = []
+        logger.propagate = True
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def log_event(logger: logging.Logger, kind: str, message: str, **data) -> None:  # noqa: ANN003
+    """Log a journal event with its kind and fields."""
+    level = logging.WARNING if kind in WARNING_EVENTS else logging.INFO
+    logger.log(level, message, extra={"event": kind, "data": data})
+
+
+atexit.register(shutdown_logging)
@@ -2,29 +2,45 @@ from __future__ import annotations
 
 import argparse
 import sys
+import threading
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Sequence
 
-import uvicorn
-
-from .api import ApiService
-from .audio import AudioEngine
-from .azuracast import AzuraCastClient
+from . import startup
 from .config import (
     DEFAULT_EXAMPLE_PATH,
     DEFAULT_CONFIG_PATH,
+    AppConfig,
     ensure_config,
     interactive_setup,
     load_config,
     validation_errors,
 )
+from .log import configure_logging
+from .scheduling import lock_memory
 from .state import StreamState
-from .streamer import Streamer
+from .trace import configure_tracing
+
+if TYPE_CHECKING:
+    import uvicorn
 
+    from .api import ApiService
+    from .journal import EventJournal
 
-def main() -> None:
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
     parser = argparse.ArgumentParser(description="OndePi live source")
     parser.add_argument("--config", default=str(DEFAULT_CONFIG_PATH), help="Path to config file")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--check-config",
+        action="store_true",
+        help="Validate the config file and exit without starting audio or the web server",
+    )
+    args = parser.parse_args(argv)
+
+    if args.check_config:
+        sys.exit(check_config(Path(args.config)))
 
     config_path = Path(args.config)
     created = ensure_config(config_path, DEFAULT_EXAMPLE_PATH)
@@ -43,20 +59,130 @@ def main() -> None:
         print("Config validation errors detected:")
         for error in errors:
             print(f"- {error}")
+    startup.mark("config_loaded")
+    if config.stations:
+        serve_stations(config, config_path)
+    else:
+        serve(config, config_path)
+
+
+def check_config(config_path: Path) -> int:
+    try:
+        config = load_config(config_path, validate=False)
+    except (FileNotFoundError, ValueError, TypeError) as exc:
+        print(f"Config error: {exc}")
+        return 2
+    errors = validation_errors(config)
+    if errors:
+        print(f"{config_path}: {len(errors)} validation error(s)")
+        for error in errors:
+            print(f"- {error}")
+        return 1
+    print(f"{config_path}: OK")
+    return 0
+
+
+def serve(config: AppConfig, config_path: Path) -> None:
+    import uvicorn
+
+    from .api import ApiService
+    from .azuracast import AzuraCastClient
+    from .journal import EventJournal
+    from .streamer import create_streamer
+
+    startup.mark("web_imported")
+    configure_logging(config.general)
+    configure_tracing(config.trace)
+    if config.scheduling.mlockall:
+        lock_memory()
     state = StreamState()
+    journal = EventJournal(config.journal)
     azuracast = AzuraCastClient(config.azuracast)
-    streamer = Streamer(config, state, azuracast=azuracast)
-    audio_engine = AudioEngine(config.input, state)
+    # With DSP offload ffmpeg owns the capture device, so no audio engine is built.
+    offload = config.stream.dsp == "ffmpeg"
+    streamer = create_streamer(config, state, azuracast=azuracast, journal=journal)
     api = ApiService(
         config,
         state,
         streamer,
-        audio_engine=audio_engine,
         config_path=str(config_path),
+        journal=journal,
+        defer_audio=not offload,
     )
+    server = uvicorn.Server(uvicorn.Config(api.app, host=config.web.bind, port=config.web.port))
+    if not offload:
+        bootstrap = threading.Thread(
+            target=_bootstrap_audio,
+            args=(server, api, state, journal),
+            daemon=True,
+        )
+        bootstrap.start()
+    server.run()
+
 
+def serve_stations(config: AppConfig, config_path: Path) -> None:
+    """Multi-station mode: this process only runs the API and the worker supervisor."""
+    import uvicorn
+
+    from .api import ApiService
+    from .journal import EventJournal
+    from .stations import StationSupervisor
+    from .streamer import create_streamer
+
+    configure_logging(config.general)
+    configure_tracing(config.trace)
+    if config.scheduling.mlockall:
+        lock_memory()
+    state = StreamState()
+    journal = EventJournal(config.journal)
+    api = ApiService(
+        config,
+        state,
+        create_streamer(config, state, journal=journal),
+        config_path=str(config_path),
+        journal=journal,
+        stations=StationSupervisor(config, journal),
+    )
     uvicorn.run(api.app, host=config.web.bind, port=config.web.port)
 
 
+def _bootstrap_audio(
+    server: uvicorn.Server,
+    api: ApiService,
+    state: StreamState,
+    journal: EventJournal,
+) -> None:
+    """Build the NumPy/PortAudio stack only once the HTTP server accepts connections."""
+    while not server.started:
+        if server.should_exit:
+            return
+        time.sleep(0.01)
+    startup.mark("http_listening")
+
+    from .analysis import SpectrumAnalyzer
+    from .audio import AudioEngine
+    from .history import LevelHistory
+    from .monitor import MonitorStream
+    from .recorder import ArchiveRecorder
+
+    startup.mark("audio_imported")
+    config = api.config  # includes edits made while audio was loading
+    audio_engine = AudioEngine(
+        config.input,
+        state,
+        journal=journal,
+        scheduling=config.scheduling,
+        fallback=config.fallback,
+    )
+    api.attach_audio(
+        audio_engine,
+        recorder=ArchiveRecorder(config.recorder, config.input, audio_engine),
+        monitor=MonitorStream(config.monitor, config.input, audio_engine),
+        analyzer=SpectrumAnalyzer(config.analysis, config.input, audio_engine),
+        history=LevelHistory(config.history, config.input.channels, audio_engine),
+    )
+    startup.mark("audio_started")
+
+
 if __name__ == "__main__":
     main()
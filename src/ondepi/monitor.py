@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+import numpy as np
+
+from .audio import AudioEngine
+from .config import InputConfig, MonitorConfig
+
+
+@dataclass
+class MonitorChunk:
+    seq: int
+    created: float
+    data: bytes
+
+
+class _Listener:
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.event = asyncio.Event()
+
+    def wake(self) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            pass  # listener's loop already closed
+
+
+class MonitorStream:
+    """Local low-latency monitor fed from the audio engine.
+
+    One encode (ffmpeg mp3, or raw WAV) is shared by every listener through a
+    bounded ring of output chunks. The encoder runs only while someone listens.
+    """
+
+    def __init__(
+        self,
+        config: MonitorConfig,
+        input_cfg: InputConfig,
+        audio_engine: Optional[AudioEngine] = None,
+    ) -> None:
+        self._config = config
+        self._input_cfg = input_cfg
+        self._audio_engine = audio_engine
+        self._lock = threading.Lock()
+        self._ring: deque[MonitorChunk] = deque(maxlen=max(config.ring_chunks, 1))
+        self._next_seq = 0
+        self._listeners: list[_Listener] = []
+        self._pcm: queue.Queue = queue.Queue(maxsize=256)
+        self._process: Optional[subprocess.Popen] = None
+        self._running = threading.Event()
+        self._pcm_seconds = 0.0
+        self._encoded_bytes = 0
+        self._encoder_latency = 0.0
+        self._delivery_latency = 0.0
+        self._dropped_blocks = 0
+
+    @property
+    def media_type(self) -> str:
+        return "audio/wav" if self._config.format == "wav" else "audio/mpeg"
+
+    def update_config(self, config: MonitorConfig, input_cfg: InputConfig) -> None:
+        restart = self._running.is_set() and (config != self._config or input_cfg != self._input_cfg)
+        self._config = config
+        self._input_cfg = input_cfg
+        if restart:
+            # Ends current listener streams; players reconnect to the new encode.
+            self._stop_encoder()
+
+    def consume(self, chunk: np.ndarray) -> None:
+        try:
+            self._pcm.put_nowait(np.array(chunk, dtype=np.float32, copy=True))
+        except queue.Full:
+            self._dropped_blocks += 1
+
+    async def listen(self) -> AsyncIterator[bytes]:
+        listener = _Listener(asyncio.get_running_loop())
+        try:
+            with self._lock:
+                self._listeners.append(listener)
+                if len(self._listeners) == 1:
+                    self._start_encoder()
+                cursor = self._ring[-1].seq + 1 if self._ring else self._next_seq
+            if self._config.format == "wav":
+                yield _wav_stream_header(self._input_cfg.sample_rate, self._input_cfg.channels)
+            while self._running.is_set():
+                # Clear before looking, so a chunk published in between still wakes us.
+                listener.event.clear()
+                chunks = self._chunks_since(cursor)
+                if not chunks:
+                    try:
+                        await asyncio.wait_for(listener.event.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                cursor = chunks[-1].seq + 1
+                self._delivery_latency = time.monotonic() - chunks[0].created
+                yield b"".join(chunk.data for chunk in chunks)
+        finally:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+                idle = not self._listeners
+            if idle:
+                self._stop_encoder()
+
+    def status(self) -> dict:
+        return {
+            "enabled": self._config.enabled,
+            "running": self._running.is_set(),
+            "format": self._config.format,
+            "listeners": len(self._listeners),
+            "ring_chunks": len(self._ring),
+            "encoder_latency_ms": self._encoder_latency * 1000,
+            "delivery_latency_ms": self._delivery_latency * 1000,
+            "latency_ms": (self._encoder_latency + self._delivery_latency) * 1000,
+            "dropped_blocks": self._dropped_blocks,
+        }
+
+    def _chunks_since(self, cursor: int) -> list[MonitorChunk]:
+        with self._lock:
+            if not self._ring or self._ring[-1].seq < cursor:
+                return []
+            first = self._ring[0].seq
+            # A listener that fell behind the ring skips ahead to the oldest chunk.
+            start = max(cursor - first, 0)
+            return list(self._ring)[start:]
+
+    def _publish(self, data: bytes) -> None:
+        with self._lock:
+            self._ring.append(MonitorChunk(seq=self._next_seq, created=time.monotonic(), data=data))
+            self._next_seq += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener.wake()
+
+    def _start_encoder(self) -> None:
+        if self._running.is_set():
+            return
+        self._ring.clear()
+        self._pcm_seconds = 0.0
+        self._encoded_bytes = 0
+        while not self._pcm.empty():
+            self._pcm.get_nowait()
+        if self._config.format == "mp3":
+            # Raises if ffmpeg cannot start; nothing is marked running until it has.
+            self._process = subprocess.Popen(
+                build_monitor_command(self._config, self._input_cfg),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=0,
+            )
+            targets = [self._feed_encoder, self._read_encoder]
+        else:
+            targets = [self._feed_wav]
+        self._running.set()
+        for target in targets:
+            threading.Thread(target=target, args=(self._running, self._process), daemon=True).start()
+        if self._audio_engine:
+            self._audio_engine.add_consumer(self.consume)
+
+    def _stop_encoder(self) -> None:
+        if not self._running.is_set():
+            return
+        if self._audio_engine:
+            self._audio_engine.remove_consumer(self.consume)
+        # Workers hold their own session event, so a quick restart never
+        # shares a running flag with threads still winding down.
+        self._running.clear()
+        self._running = threading.Event()
+        process = self._process
+        self._process = None
+        if process:
+            try:
+                process.kill()
+                process.wait(timeout=5)
+            except Exception:
+                pass
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener.wake()
+
+    def _next_block(self) -> Optional[np.ndarray]:
+        try:
+            block = self._pcm.get(timeout=0.5)
+        except queue.Empty:
+            return None
+        self._pcm_seconds += len(block) / float(self._input_cfg.sample_rate)
+        return block
+
+    def _feed_encoder(self, running: threading.Event, process: Optional[subprocess.Popen]) -> None:
+        if not process or not process.stdin:
+            return
+        while running.is_set():
+            block = self._next_block()
+            if block is None:
+                continue
+            try:
+                process.stdin.write(block.astype("<f4").tobytes())
+            except (BrokenPipeError, OSError, ValueError):
+                break
+
+    def _read_encoder(self, running: threading.Event, process: Optional[subprocess.Popen]) -> None:
+        if not process or not process.stdout:
+            return
+        fd = process.stdout.fileno()
+        bytes_per_second = self._config.bitrate_kbps * 1000 / 8
+        while running.is_set():
+            try:
+                data = os.read(fd, 4096)
+            except OSError:
+                break
+            if not data:
+                break
+            self._encoded_bytes += len(data)
+            # CBR output: what is still inside the encoder is input time minus output time.
+            encoded_seconds = self._encoded_bytes / bytes_per_second
+            self._encoder_latency = max(self._pcm_seconds - encoded_seconds, 0.0)
+            self._publish(data)
+
+    def _feed_wav(self, running: threading.Event, process: Optional[subprocess.Popen]) -> None:
+        while running.is_set():
+            block = self._next_block()
+            if block is None:
+                continue
+            pcm = (np.clip(block, -1.0, 1.0) * 32767.0).astype("<i2")
+            self._encoder_latency = 0.0
+            self._publish(pcm.tobytes())
+
+
+def build_monitor_command(config: MonitorConfig, input_cfg: InputConfig) -> list[str]:
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-fflags",
+        "nobuffer",
+        "-f",
+        "f32le",
+        "-ac",
+        str(input_cfg.channels),
+        "-ar",
+        str(input_cfg.sample_rate),
+        "-i",
+        "pipe:0",
+        "-vn",
+        "-acodec",
+        "libmp3lame",
+        "-b:a",
+        f"{config.bitrate_kbps}k",
+        "-flush_packets",
+        "1",
+        "-f",
+        "mp3",
+        "pipe:1",
+    ]
+
+
+def _wav_stream_header(sample_rate: int, channels: int) -> bytes:
+    block_align = channels * 2
+    data_size = 0xFFFFFFFF - 36
+    return (
+        b"RIFF"
+        + (0xFFFFFFFF).to_bytes(4, "little")
+        + b"WAVEfmt "
+        + (16).to_bytes(4, "little")
+        + (1).to_bytes(2, "little")
+        + channels.to_bytes(2, "little")
+        + sample_rate.to_bytes(4, "little")
+        + (sample_rate * block_align).to_bytes(4, "little")
+        + block_align.to_bytes(2, "little")
+        + (16).to_bytes(2, "little")
+        + b"data"
+        + data_size.to_bytes(4, "little")
+    )
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from .azuracast import AzuraCastClient
+from .config import AppConfig
+from .encoder import Encoder, create_encoder
+from .icecast import IcecastError, IcecastSource
+from .journal import EventJournal
+from .reconnect import CODEC
+from .scheduling import apply_encoder_policy
+from .state import StreamState
+from .streamer import PCM_QUEUE_BLOCKS, SPAN_RETRY_SLEEP, Streamer, _spawn
+from .trace import TRACER, now_ns
+
+if TYPE_CHECKING:
+    from .audio import AudioEngine
+
+SPAN_CONNECT = TRACER.name_id("stream.connect")
+SPAN_ENCODE = TRACER.name_id("stream.encode")
+SPAN_SEND = TRACER.name_id("stream.send")
+
+
+class EncoderError(RuntimeError):
+    """The in-process encoder failed; reconnecting the socket will not help."""
+
+
+class NativeStreamer(Streamer):
+    """Encodes AudioEngine blocks in-process and sends them to Icecast itself.
+
+    The encoder lives as long as the stream: a dropped connection only reopens
+    the socket, with no fork, no PCM pipe and no encoder restart. A send that
+    blocks for `stall_timeout_seconds` counts as a stall and reconnects.
+    """
+
+    def __init__(
+        self,
+        config: AppConfig,
+        state: StreamState,
+        azuracast: Optional[AzuraCastClient] = None,
+        audio_engine: Optional[AudioEngine] = None,
+        journal: Optional[EventJournal] = None,
+        encoder: Optional[Encoder] = None,
+    ) -> None:
+        super().__init__(config, state, azuracast=azuracast, audio_engine=audio_engine, journal=journal)
+        self._encoder_override = encoder
+        self._encoder: Optional[Encoder] = None
+        self._source: Optional[IcecastSource] = None
+        self._blocks: queue.Queue = queue.Queue(maxsize=PCM_QUEUE_BLOCKS)
+        self._sender: Optional[threading.Thread] = None
+        self._bytes_sent = 0
+        self._dropped_blocks = 0
+        self._last_send_at = 0.0
+
+    def start(self) -> None:
+        if self._running():
+            return
+        if not self._audio_engine:
+            raise RuntimeError("stream.encoder = 'native' needs the audio engine")
+        config = self._config
+        self._encoder = self._encoder_override or create_encoder(config.stream, config.input)
+        stall_timeout = config.general.stall_timeout_seconds
+        self._source = IcecastSource(
+            config.stream,
+            config.metadata,
+            config.input,
+            self._encoder.content_type,
+            timeout=max(config.general.preflight_timeout_seconds, 1.0),
+            send_timeout=stall_timeout if stall_timeout > 0 else None,
+        )
+        self._stop_requested = False
+        self._retry_stop.clear()
+        self._state.update(retry_count=0, last_retry_at=None, last_exit_code=None, last_exit_class=None)
+        self._blocks = queue.Queue(maxsize=PCM_QUEUE_BLOCKS)
+        self._bytes_sent = 0
+        self._dropped_blocks = 0
+        self._sender = _spawn(self._run)
+        self._audio_consumer = self._enqueue_block
+        self._audio_engine.add_consumer(self._audio_consumer)
+        self._metadata_stop.clear()
+        if self._azuracast:
+            self._azuracast.update_streamer_metadata(config.metadata)
+            self._start_metadata_loop()
+
+    def stop(self) -> None:
+        self._stop_requested = True
+        self._retry_stop.set()
+        if not self._running():
+            return
+        self._metadata_stop.set()
+        self._cleanup_audio()
+        _put_sentinel(self._blocks)
+        self._sender.join(timeout=5)
+        self._state.update(streaming=False)
+        self._record("stream.stop", "stream stopped by request")
+        if self._azuracast:
+            self._azuracast.update_streamer_metadata(self._config.metadata)
+
+    def status(self) -> dict:
+        source = self._source
+        running = self._running()
+        connected = bool(running and source and source.connected)
+        return {
+            "running": running,
+            "command": None,
+            "encoder": "native",
+            "input": "audio-engine",
+            "connected": connected,
+            "method": source.method if connected else None,
+            "retry_count": self._state.retry_count,
+            "retrying": self._retrying,
+            "low_latency": self._config.stream.low_latency,
+            "scheduling": self._scheduling_report,
+            "bytes_accepted": self._bytes_sent,
+            "dropped_blocks": self._dropped_blocks,
+            "progress_age_seconds": (
+                round(time.monotonic() - self._last_send_at, 2) if connected and self._last_send_at else None
+            ),
+            "stalls": self._stalls,
+            "last_stall": self._last_stall,
+        }
+
+    def _running(self) -> bool:
+        return self._sender is not None and self._sender.is_alive()
+
+    def _run(self) -> None:
+        self._scheduling_report = apply_encoder_policy(self._config.scheduling)
+        is_retry = False
+        try:
+            while not self._stop_requested:
+                try:
+                    error = self._connect(is_retry) or self._pump()
+                except EncoderError as exc:
+                    self._state.update(streaming=False)
+                    self._retry_after(CODEC, str(exc), error=exc.__cause__.__class__.__name__)
+                    return
+                if error is None:
+                    return  # stop requested
+                self._state.update(streaming=False)
+                if isinstance(error.__cause__, TimeoutError):
+                    self._on_send_stall()
+                plan = self._retry_after(error.exit_class, str(error), status=error.status)
+                if plan is None:
+                    return
+                self._retrying = True
+                try:
+                    started = now_ns()
+                    if self._retry_stop.wait(plan[1]):
+                        return
+                    if TRACER.enabled:
+                        TRACER.span(SPAN_RETRY_SLEEP, started)
+                finally:
+                    self._retrying = False
+                is_retry = True
+        finally:
+            self._cleanup_audio()
+            if self._source:
+                self._source.close()
+
+    def _connect(self, is_retry: bool) -> Optional[IcecastError]:
+        started = now_ns()
+        try:
+            self._source.connect()
+        except IcecastError as exc:
+            return exc
+        finally:
+            if TRACER.enabled:
+                TRACER.span(SPAN_CONNECT, started)
+        started = {"streaming": True, "started_at": datetime.utcnow()}
+        if not is_retry:
+            started["last_error"] = None
+        self._state.update(**started)
+        self._record(
+            "stream.start",
+            "source reconnected" if is_retry else "stream started",
+            retry=is_retry,
+            encoder="native",
+            method=self._source.method,
+        )
+        return None
+
+    def _pump(self) -> Optional[IcecastError]:
+        """Encode and send until stopped (None) or the connection fails."""
+        _drain(self._blocks)  # blocks queued while disconnected are stale
+        encoder = self._encoder
+        while True:
+            block = self._blocks.get()
+            started = now_ns()
+            try:
+                data = encoder.flush() if block is None else encoder.encode(block)
+            except Exception as exc:
+                raise EncoderError(f"encoder failed: {exc}") from exc
+            if TRACER.enabled:
+                started = TRACER.span(SPAN_ENCODE, started)
+            try:
+                if data:
+                    self._source.send(data)
+            except IcecastError as exc:
+                return None if block is None else exc
+            if TRACER.enabled:
+                TRACER.span(SPAN_SEND, started)
+            self._bytes_sent += len(data)
+            self._last_send_at = time.monotonic()
+            if block is None:
+                return None
+
+    def _on_send_stall(self) -> None:
+        timeout = self._config.general.stall_timeout_seconds
+        self._stalls += 1
+        self._last_stall = {
+            "at": datetime.utcnow().isoformat(),
+            "detection_latency_seconds": timeout,
+            "timeout_seconds": timeout,
+            "bytes_accepted": self._bytes_sent,
+            "queued_blocks": self._blocks.qsize(),
+        }
+        self._record("stream.stall", f"send blocked for {timeout:.1f}s, reconnecting", **self._last_stall)
+
+    def _enqueue_block(self, chunk) -> None:  # noqa: ANN001
+        # Audio callback: never block, and skip queueing while disconnected.
+        source = self._source
+        if source is None or not source.connected:
+            return
+        try:
+            self._blocks.put_nowait(chunk.copy())
+        except queue.Full:
+            self._dropped_blocks += 1
+
+    def _cleanup_audio(self) -> None:
+        if self._audio_engine and self._audio_consumer:
+            self._audio_engine.remove_consumer(self._audio_consumer)
+            self._audio_consumer = None
+
+
+def _drain(blocks: queue.Queue) -> None:
+    try:
+        while blocks.get_nowait() is not None:
+            pass
+    except queue.Empty:
+        return
+    blocks.put_nowait(None)  # keep a pending stop
+
+
+def _put_sentinel(blocks: queue.Queue) -> None:
+    while True:
+        try:
+            blocks.put_nowait(None)
+            return
+        except queue.Full:
+            _drain(blocks)
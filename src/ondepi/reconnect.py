@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import socket
+from dataclasses import dataclass
+from typing import Optional
+
+AUTH = "auth"
+MOUNT_IN_USE = "mount_in_use"
+NETWORK = "network"
+DEVICE = "device"
+CODEC = "codec"
+UNKNOWN = "unknown"
+
+PROBE_INTERVAL_SECONDS = 1.0
+
+# Checked in order: the first class whose pattern matches ffmpeg's stderr wins.
+_PATTERNS: list[tuple[str, re.Pattern[str]]] = [
+    (AUTH, re.compile(r"\b401\b|unauthori[sz]ed|authentication|authorization failed", re.I)),
+    (MOUNT_IN_USE, re.compile(r"\b403\b|forbidden|mount(point)? in use|too many sources", re.I)),
+    (
+        CODEC,
+        re.compile(
+            r"unknown encoder|encoder not found|error while opening encoder|"
+            r"unsupported codec|could not find (codec|tag)|invalid sample format|"
+            r"error initializing output stream|requested output format .* not",
+            re.I,
+        ),
+    ),
+    (
+        DEVICE,
+        re.compile(
+            r"\balsa\b|cannot open audio device|no such device|device or resource busy|"
+            r"audio pipeline broken",
+            re.I,
+        ),
+    ),
+    (
+        NETWORK,
+        re.compile(
+            r"connection (refused|reset|timed out)|timed out|no route to host|"
+            r"network is unreachable|name or service not known|failed to resolve|"
+            r"temporary failure in name resolution|broken pipe|end of file|i/o error",
+            re.I,
+        ),
+    ),
+]
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    retry: bool
+    min_delay_seconds: int = 0
+    probe: bool = False
+
+
+# auth and codec failures need a config change, so retrying only burns CPU.
+RETRY_POLICIES: dict[str, RetryPolicy] = {
+    AUTH: RetryPolicy(retry=False),
+    CODEC: RetryPolicy(retry=False),
+    MOUNT_IN_USE: RetryPolicy(retry=True, min_delay_seconds=10, probe=True),
+    NETWORK: RetryPolicy(retry=True, min_delay_seconds=1, probe=True),
+    DEVICE: RetryPolicy(retry=True),
+    UNKNOWN: RetryPolicy(retry=True, probe=True),
+}
+
+
+def classify_exit(exit_code: Optional[int], stderr: str) -> str:
+    """Map an ffmpeg exit to one of the retry classes using its stderr."""
+    for exit_class, pattern in _PATTERNS:
+        if pattern.search(stderr):
+            return exit_class
+    return UNKNOWN
+
+
+def probe_server(host: str, port: int, timeout: float = 2.0) -> Optional[str]:
+    """Cheap pre-flight check that an HTTP server answers on host:port.
+
+    Returns None when it does, otherwise a short description of the failure.
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(timeout)
+            sock.sendall(_probe_request(host))
+            reply = sock.recv(16)
+    except OSError as exc:
+        return str(exc) or exc.__class__.__name__
+    if not reply.startswith(b"HTTP/"):
+        return "no HTTP response"
+    return None
+
+
+async def probe_server_async(host: str, port: int, timeout: float = 2.0) -> Optional[str]:
+    """Event-loop variant of `probe_server`."""
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        writer.write(_probe_request(host))
+        reply = await asyncio.wait_for(reader.read(16), timeout)
+    except (OSError, asyncio.TimeoutError) as exc:
+        return str(exc) or exc.__class__.__name__
+    finally:
+        if writer is not None:
+            writer.close()
+    if not reply.startswith(b"HTTP/"):
+        return "no HTTP response"
+    return None
+
+
+def _probe_request(host: str) -> bytes:
+    return f"HEAD / HTTP/1.0\r\nHost: {host}\r\n\r\n".encode("ascii")
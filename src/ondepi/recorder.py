@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import os
+import queue
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .audio import AudioEngine
+from .config import InputConfig, RecorderConfig
+
+WRITE_ALIGN = 4096
+WAV_HEADER_SIZE = 44
+SEGMENT_PREFIX = "ondepi-"
+SEGMENT_SUFFIX = ".wav"
+
+
+@dataclass
+class RecorderStats:
+    bytes_written: int = 0
+    write_seconds: float = 0.0
+    blocks_received: int = 0
+    blocks_dropped: int = 0
+    backlog_peak: int = 0
+    segments_opened: int = 0
+    segments_deleted: int = 0
+    fsync_count: int = 0
+    last_fsync_seconds: float = 0.0
+    last_error: Optional[str] = None
+
+
+class _Segment:
+    """One WAV file being written with aligned, preallocated writes."""
+
+    def __init__(self, path: Path, sample_rate: int, channels: int, sample_format: str) -> None:
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.frames = 0
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._offset = 0
+        self._pending = bytearray(_wav_header(sample_rate, channels, sample_format, 0))
+
+    @property
+    def bytes_per_frame(self) -> int:
+        return self.channels * (2 if self.sample_format == "s16" else 4)
+
+    def preallocate(self, size: int) -> None:
+        if size <= 0 or not hasattr(os, "posix_fallocate"):
+            return
+        try:
+            os.posix_fallocate(self._fd, 0, size)
+        except OSError:
+            pass  # unsupported filesystem; fall back to growing the file
+
+    def append(self, payload: bytes, frames: int) -> None:
+        self._pending += payload
+        self.frames += frames
+
+    def pending_bytes(self) -> int:
+        return len(self._pending)
+
+    def flush(self, final: bool = False) -> int:
+        """Write buffered bytes, keeping file offsets aligned unless final."""
+        size = len(self._pending)
+        if not final:
+            size -= (self._offset + size) % WRITE_ALIGN
+        if size <= 0:
+            return 0
+        view = memoryview(self._pending)[:size]
+        written = 0
+        while written < size:
+            written += os.pwrite(self._fd, view[written:], self._offset + written)
+        view.release()
+        del self._pending[:size]
+        self._offset += size
+        return size
+
+    def sync(self) -> None:
+        if hasattr(os, "fdatasync"):
+            os.fdatasync(self._fd)
+        else:  # pragma: no cover - non-Linux
+            os.fsync(self._fd)
+
+    def close(self) -> int:
+        written = self.flush(final=True)
+        os.ftruncate(self._fd, self._offset)
+        header = _wav_header(self.sample_rate, self.channels, self.sample_format, self._offset - WAV_HEADER_SIZE)
+        os.pwrite(self._fd, header, 0)
+        self.sync()
+        os.close(self._fd)
+        return written
+
+
+class ArchiveRecorder:
+    """Compliance recorder writing the processed stream to rotating WAV segments.
+
+    The audio callback only copies the block into a bounded queue; conversion,
+    disk writes, fsync and retention all run on the writer thread.
+    """
+
+    def __init__(
+        self,
+        config: RecorderConfig,
+        input_cfg: InputConfig,
+        audio_engine: Optional[AudioEngine] = None,
+    ) -> None:
+        self._config = config
+        self._input_cfg = input_cfg
+        self._audio_engine = audio_engine
+        self._queue: queue.Queue = queue.Queue(maxsize=max(config.queue_blocks, 1))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._segment: Optional[_Segment] = None
+        self._stats = RecorderStats()
+        self._last_sync = time.monotonic()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        Path(self._config.directory).mkdir(parents=True, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        if self._audio_engine:
+            self._audio_engine.add_consumer(self.consume)
+
+    def stop(self) -> None:
+        if self._audio_engine:
+            self._audio_engine.remove_consumer(self.consume)
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def update_config(self, config: RecorderConfig, input_cfg: InputConfig) -> None:
+        self._config = config
+        self._input_cfg = input_cfg
+
+    def consume(self, chunk: np.ndarray) -> None:
+        self._stats.blocks_received += 1
+        try:
+            self._queue.put_nowait(np.array(chunk, dtype=np.float32, copy=True))
+        except queue.Full:
+            self._stats.blocks_dropped += 1
+
+    def status(self) -> dict:
+        stats = self._stats
+        throughput = stats.bytes_written / stats.write_seconds if stats.write_seconds > 0 else 0.0
+        return {
+            "enabled": self._config.enabled,
+            "running": bool(self._thread and self._thread.is_alive()),
+            "directory": self._config.directory,
+            "segment": str(self._segment.path) if self._segment else None,
+            "bytes_written": stats.bytes_written,
+            "write_mib_per_second": throughput / (1024 * 1024),
+            "backlog_blocks": self._queue.qsize(),
+            "backlog_peak": stats.backlog_peak,
+            "blocks_received": stats.blocks_received,
+            "blocks_dropped": stats.blocks_dropped,
+            "segments_opened": stats.segments_opened,
+            "segments_deleted": stats.segments_deleted,
+            "fsync_count": stats.fsync_count,
+            "last_fsync_ms": stats.last_fsync_seconds * 1000,
+            "last_error": stats.last_error,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.is_set() or not self._queue.empty():
+            try:
+                block = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                block = None
+            try:
+                if block is not None:
+                    self._stats.backlog_peak = max(self._stats.backlog_peak, self._queue.qsize() + 1)
+                    self._write_block(block)
+                self._maybe_sync()
+            except OSError as exc:
+                self._stats.last_error = f"recorder write failed: {exc}"
+                self._close_segment()
+                self._stop.wait(1)
+        self._close_segment()
+
+    def _write_block(self, block: np.ndarray) -> None:
+        if block.ndim == 1:
+            block = block.reshape(-1, 1)
+        offset = 0
+        while offset < len(block):
+            segment = self._segment
+            if segment is None or segment.channels != block.shape[1]:
+                self._close_segment()
+                segment = self._open_segment(block.shape[1])
+            limit = self._segment_frames() - segment.frames
+            part = block[offset : offset + max(limit, 0)]
+            if len(part):
+                segment.append(_encode(part, segment.sample_format), len(part))
+                offset += len(part)
+            if segment.frames >= self._segment_frames():
+                self._close_segment()
+            elif segment.pending_bytes() >= self._buffer_bytes():
+                self._timed_flush(segment)
+
+    def _timed_flush(self, segment: _Segment, final: bool = False) -> None:
+        started = time.perf_counter()
+        written = segment.close() if final else segment.flush()
+        self._stats.write_seconds += time.perf_counter() - started
+        self._stats.bytes_written += written
+
+    def _open_segment(self, channels: int) -> _Segment:
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        path = Path(self._config.directory) / f"{SEGMENT_PREFIX}{stamp}{SEGMENT_SUFFIX}"
+        suffix = 1
+        while path.exists():
+            path = Path(self._config.directory) / f"{SEGMENT_PREFIX}{stamp}-{suffix}{SEGMENT_SUFFIX}"
+            suffix += 1
+        segment = _Segment(path, self._input_cfg.sample_rate, channels, self._config.sample_format)
+        if self._config.preallocate:
+            segment.preallocate(WAV_HEADER_SIZE + self._segment_frames() * segment.bytes_per_frame)
+        self._segment = segment
+        self._stats.segments_opened += 1
+        self._last_sync = time.monotonic()
+        return segment
+
+    def _close_segment(self) -> None:
+        segment = self._segment
+        if segment is None:
+            return
+        self._segment = None
+        try:
+            self._timed_flush(segment, final=True)
+        except OSError as exc:
+            self._stats.last_error = f"recorder close failed: {exc}"
+        self._apply_retention()
+
+    def _maybe_sync(self) -> None:
+        interval = self._config.fsync_interval_seconds
+        if not self._segment or interval <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_sync < interval:
+            return
+        self._timed_flush(self._segment)
+        started = time.perf_counter()
+        self._segment.sync()
+        self._stats.last_fsync_seconds = time.perf_counter() - started
+        self._stats.fsync_count += 1
+        self._last_sync = now
+
+    def _apply_retention(self) -> None:
+        self._stats.segments_deleted += apply_retention(
+            Path(self._config.directory),
+            max_age_seconds=self._config.retention_max_age_hours * 3600,
+            max_bytes=int(self._config.retention_max_mib * 1024 * 1024),
+            keep=self._segment.path if self._segment else None,
+        )
+
+    def _segment_frames(self) -> int:
+        return max(int(self._config.segment_seconds * self._input_cfg.sample_rate), 1)
+
+    def _buffer_bytes(self) -> int:
+        return max(self._config.buffer_kib * 1024, WRITE_ALIGN)
+
+
+def apply_retention(
+    directory: Path,
+    max_age_seconds: float,
+    max_bytes: int,
+    keep: Optional[Path] = None,
+    now: Optional[float] = None,
+) -> int:
+    """Delete segments older than max_age_seconds, then oldest first above max_bytes."""
+    now = time.time() if now is None else now
+    segments = []
+    for path in directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+        if keep is not None and path == keep:
+            continue
+        try:
+            info = path.stat()
+        except FileNotFoundError:
+            continue
+        segments.append((info.st_mtime, info.st_size, path))
+    segments.sort()
+
+    deleted = 0
+    total = sum(size for _, size, _ in segments)
+    for mtime, size, path in segments:
+        expired = max_age_seconds > 0 and now - mtime > max_age_seconds
+        oversize = max_bytes > 0 and total > max_bytes
+        if not (expired or oversize):
+            continue
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def _encode(block: np.ndarray, sample_format: str) -> bytes:
+    if sample_format == "s16":
+        scaled = np.clip(block, -1.0, 1.0) * 32767.0
+        return scaled.astype("<i2").tobytes()
+    return block.astype("<f4").tobytes()
+
+
+def _wav_header(sample_rate: int, channels: int, sample_format: str, data_size: int) -> bytes:
+    if sample_format == "s16":
+        format_tag, bits = 1, 16
+    else:
+        format_tag, bits = 3, 32
+    block_align = channels * bits // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        36 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        format_tag,
+        channels,
+        sample_rate,
+        sample_rate * block_align,
+        block_align,
+        bits,
+        b"data",
+        data_size,
+    )
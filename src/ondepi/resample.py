@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from math import gcd
+
+import numpy as np
+
+# Taps per polyphase branch and passband edge (fraction of the output Nyquist).
+QUALITY_PRESETS: dict[str, tuple[int, float]] = {
+    "low": (8, 0.80),
+    "medium": (16, 0.90),
+    "high": (32, 0.95),
+}
+
+COMMON_RATES = (48000, 44100, 96000, 88200, 32000, 22050, 16000)
+
+
+class PolyphaseResampler:
+    """Streaming rational-ratio resampler for (frames, channels) float32 blocks.
+
+    The ratio out_rate/in_rate is reduced to up/down and a windowed-sinc
+    prototype is split into `up` branches. Each output frame is one dot
+    product of a branch with the most recent input frames, computed for the
+    whole block at once. Input history and the fractional phase carry over
+    between calls, so block boundaries are seamless.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, channels: int, quality: str = "medium") -> None:
+        if quality not in QUALITY_PRESETS:
+            raise ValueError(f"unknown resample quality '{quality}'")
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.channels = channels
+        taps, passband = QUALITY_PRESETS[quality]
+        self.taps = taps
+        self._branches = _design_branches(self.up, self.down, taps, passband)
+        self._offsets = np.arange(taps)  # frames back from the newest one
+        self._history = np.zeros((taps - 1, channels), dtype=np.float32)
+        self._phase = 0  # position of the next output, in 1/up input frames
+
+    @property
+    def delay_frames(self) -> float:
+        """Group delay in output frames."""
+        return (self.taps * self.up - 1) / 2 / self.down
+
+    def reset(self) -> None:
+        self._history[:] = 0.0
+        self._phase = 0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        frames = block.shape[0]
+        if frames == 0:
+            return np.zeros((0, self.channels), dtype=np.float32)
+        extended = np.concatenate((self._history, block.astype(np.float32, copy=False)))
+        span = frames * self.up
+        count = max(-(-(span - self._phase) // self.down), 0)
+        positions = self._phase + np.arange(count) * self.down
+        newest = positions // self.up + self.taps - 1  # index into `extended`
+        windows = extended[newest[:, None] - self._offsets[None, :]]
+        output = np.einsum("mk,mkc->mc", self._branches[positions % self.up], windows)
+        self._phase = self._phase + count * self.down - span
+        self._history = extended[-(self.taps - 1) :].copy()
+        return output.astype(np.float32, copy=False)
+
+
+def _design_branches(up: int, down: int, taps: int, passband: float) -> np.ndarray:
+    length = taps * up
+    # Cutoff relative to the upsampled rate, below both Nyquist frequencies.
+    cutoff = passband * 0.5 / max(up, down)
+    n = np.arange(length) - (length - 1) / 2
+    prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+    prototype *= up / prototype.sum()
+    # branches[p, k] multiplies the input k frames before the newest one.
+    return prototype.reshape(taps, up).T.astype(np.float32)
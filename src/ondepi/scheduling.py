@@ -0,0 +1,88 @@
+"""Best-effort CPU affinity, real-time priority and memory locking.
+
+Every helper degrades gracefully when unprivileged or off Linux and returns a
+report of what was actually applied, for the status output.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import threading
+from typing import Optional, Sequence
+
+from .config import SchedulingConfig
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+_memory_lock: dict = {"requested": False, "locked": False, "error": None}
+
+
+def apply_policy(
+    cpus: Sequence[int],
+    realtime_priority: int,
+    nice: int,
+    pid: Optional[int] = None,
+) -> dict:
+    """Apply affinity and priority to a process (pid) or to the calling thread (pid=None)."""
+    target = threading.get_native_id() if pid is None else pid
+    report: dict = {"cpus": None, "policy": "other", "priority": 0, "nice": None, "errors": []}
+
+    if cpus:
+        try:
+            os.sched_setaffinity(target, set(cpus))
+        except (AttributeError, OSError, ValueError) as exc:
+            report["errors"].append(f"affinity: {exc}")
+    try:
+        report["cpus"] = sorted(os.sched_getaffinity(target))
+    except (AttributeError, OSError):
+        pass
+
+    if realtime_priority > 0:
+        try:
+            os.sched_setscheduler(target, os.SCHED_FIFO, os.sched_param(realtime_priority))
+            report["policy"] = "fifo"
+            report["priority"] = realtime_priority
+        except (AttributeError, OSError) as exc:
+            report["errors"].append(f"SCHED_FIFO: {exc}")
+
+    if nice and report["policy"] == "other":
+        try:
+            # On Linux PRIO_PROCESS with a thread id only renices that thread.
+            os.setpriority(os.PRIO_PROCESS, target, nice)
+        except (AttributeError, OSError) as exc:
+            report["errors"].append(f"nice: {exc}")
+    try:
+        report["nice"] = os.getpriority(os.PRIO_PROCESS, target)
+    except (AttributeError, OSError):
+        pass
+    return report
+
+
+def apply_capture_policy(config: SchedulingConfig) -> dict:
+    return apply_policy(config.capture_cpus, config.capture_realtime_priority, config.capture_nice)
+
+
+def apply_encoder_policy(config: SchedulingConfig, pid: Optional[int] = None) -> dict:
+    return apply_policy(config.encoder_cpus, config.encoder_realtime_priority, config.encoder_nice, pid=pid)
+
+
+def lock_memory() -> dict:
+    """mlockall(MCL_CURRENT | MCL_FUTURE) so audio buffers are never paged out."""
+    _memory_lock["requested"] = True
+    path = ctypes.util.find_library("c")
+    if not path:
+        _memory_lock["error"] = "libc not found"
+        return memory_lock_status()
+    libc = ctypes.CDLL(path, use_errno=True)
+    if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        _memory_lock["error"] = os.strerror(ctypes.get_errno())
+    else:
+        _memory_lock["locked"] = True
+        _memory_lock["error"] = None
+    return memory_lock_status()
+
+
+def memory_lock_status() -> dict:
+    return dict(_memory_lock)
@@ -2,11 +2,14 @@ from __future__ import annotations
 
 import json
 import threading
+import time
 from dataclasses import dataclass
 from typing import Callable, Optional
 
 import serial
 
+from .state import StreamState, Subscription
+
 
 @dataclass
 class SerialConfig:
@@ -18,7 +21,7 @@ class SerialDevice:
     """Simple JSON-line serial protocol handler.
 
     Incoming messages: {"action": "start"|"stop"|"gain", "value": float}
-    Outgoing messages: {"status": "...", "levels": {"rms":..,"peak":..}}
+    Outgoing messages: {"status": "...", "error": .., "levels": {"rms":..,"peak":..}, "gain": float}
     """
 
     def __init__(self, config: SerialConfig, on_message: Callable[[dict], None]) -> None:
@@ -27,6 +30,7 @@ class SerialDevice:
         self._thread: Optional[threading.Thread] = None
         self._running = False
         self._serial: Optional[serial.Serial] = None
+        self._subscription: Optional[Subscription] = None
 
     def start(self) -> None:
         if not self._config.port:
@@ -36,8 +40,15 @@ class SerialDevice:
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._thread.start()
 
+    def follow(self, state: StreamState, interval: float = 0.1) -> None:
+        """Push state changes to the device, at most once per `interval`."""
+        self._subscription = state.subscribe()
+        threading.Thread(target=self._push_state, args=(self._subscription, interval), daemon=True).start()
+
     def stop(self) -> None:
         self._running = False
+        if self._subscription:
+            self._subscription.close()
         if self._serial:
             self._serial.close()
 
@@ -59,3 +70,21 @@ class SerialDevice:
             except json.JSONDecodeError:
                 continue
             self._on_message(message)
+
+    def _push_state(self, subscription: Subscription, interval: float) -> None:
+        while True:
+            snapshot = subscription.get()
+            if snapshot is None:
+                return
+            try:
+                self.send(
+                    {
+                        "status": "streaming" if snapshot.streaming else "stopped",
+                        "error": snapshot.last_error,
+                        "levels": {"rms": snapshot.levels.rms, "peak": snapshot.levels.peak},
+                        "gain": snapshot.gain_db,
+                    }
+                )
+            except serial.SerialException:
+                return
+            time.sleep(interval)
@@ -0,0 +1,18 @@
+"""Startup milestones in milliseconds since the ondepi entry point was imported."""
+from __future__ import annotations
+
+import time
+from typing import Dict
+
+_ORIGIN = time.perf_counter()
+_MARKS: Dict[str, float] = {}
+
+
+def mark(name: str) -> None:
+    """Record the first time a milestone is reached; later calls are ignored."""
+    if name not in _MARKS:
+        _MARKS[name] = round((time.perf_counter() - _ORIGIN) * 1000, 1)
+
+
+def marks() -> Dict[str, float]:
+    return dict(_MARKS)
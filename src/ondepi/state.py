@@ -1,18 +1,21 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+import asyncio
+import threading
+from dataclasses import dataclass, field, fields, replace
 from datetime import datetime
-from typing import Optional
+from typing import Any, Callable, Iterable, Optional
 
 
-@dataclass
+@dataclass(frozen=True)
 class LevelState:
     rms: float = 0.0
     peak: float = 0.0
 
 
-@dataclass
-class StreamState:
+@dataclass(frozen=True)
+class StateSnapshot:
+    version: int = 0
     streaming: bool = False
     last_error: Optional[str] = None
     started_at: Optional[datetime] = None
@@ -21,9 +24,11 @@ class StreamState:
     retry_count: int = 0
     last_retry_at: Optional[datetime] = None
     last_exit_code: Optional[int] = None
+    last_exit_class: Optional[str] = None
 
     def as_dict(self) -> dict:
         return {
+            "version": self.version,
             "streaming": self.streaming,
             "last_error": self.last_error,
             "started_at": self.started_at.isoformat() if self.started_at else None,
@@ -35,4 +40,146 @@ class StreamState:
             "retry_count": self.retry_count,
             "last_retry_at": self.last_retry_at.isoformat() if self.last_retry_at else None,
             "last_exit_code": self.last_exit_code,
+            "last_exit_class": self.last_exit_class,
         }
+
+
+SNAPSHOT_FIELDS = frozenset(item.name for item in fields(StateSnapshot)) - {"version"}
+
+
+class StreamState:
+    """Shared stream state published as immutable snapshots.
+
+    Writers call `update(...)`/`modify(...)`, which build a new `StateSnapshot`
+    with a bumped version and swap the reference in. Readers take `snapshot`
+    (or read an attribute, which delegates to the current snapshot) without
+    locking and always see a consistent combination of fields. Two separate
+    attribute reads may span two versions; take `snapshot` once when fields
+    must agree.
+    """
+
+    __slots__ = ("_snapshot", "_write_lock", "_subscriptions")
+
+    def __init__(self, **initial: Any) -> None:
+        self._snapshot = StateSnapshot(**initial)
+        self._write_lock = threading.Lock()
+        self._subscriptions: tuple[Subscription, ...] = ()
+
+    @property
+    def snapshot(self) -> StateSnapshot:
+        return self._snapshot
+
+    def __getattr__(self, name: str) -> Any:
+        if name in SNAPSHOT_FIELDS or name == "version":
+            return getattr(self._snapshot, name)
+        raise AttributeError(name)
+
+    def update(self, **changes: Any) -> StateSnapshot:
+        return self.modify(lambda _current: changes)
+
+    def modify(self, compute: Callable[[StateSnapshot], dict]) -> StateSnapshot:
+        """Apply changes derived from the current snapshot, e.g. counter increments."""
+        with self._write_lock:
+            previous = self._snapshot
+            changes = compute(previous)
+            unknown = set(changes) - SNAPSHOT_FIELDS
+            if unknown:
+                raise AttributeError(f"unknown state fields: {', '.join(sorted(unknown))}")
+            current = replace(previous, version=previous.version + 1, **changes)
+            self._snapshot = current
+            subscriptions = self._subscriptions
+        for subscription in subscriptions:
+            subscription._publish(changes.keys(), current)
+        return current
+
+    def as_dict(self) -> dict:
+        return self._snapshot.as_dict()
+
+    def subscribe(self, fields: Optional[Iterable[str]] = None) -> Subscription:
+        """Latest-value subscription, optionally limited to changes of `fields`."""
+        subscription = Subscription(self, frozenset(fields) if fields else None)
+        with self._write_lock:
+            self._subscriptions = self._subscriptions + (subscription,)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._write_lock:
+            self._subscriptions = tuple(item for item in self._subscriptions if item is not subscription)
+
+
+class Subscription:
+    """Delivers the newest snapshot after the one last seen.
+
+    Intermediate versions are skipped for slow readers, so a subscriber can
+    never hold up writers (levels are published many times a second).
+    Usable from threads (`get`) and from asyncio (`next`).
+    """
+
+    def __init__(self, state: StreamState, fields: Optional[frozenset[str]]) -> None:
+        self._state = state
+        self._fields = fields
+        self._latest = state.snapshot  # delivered first
+        self._seen = -1
+        self._event = threading.Event()
+        self._event.set()
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+        self.closed = False
+
+    def get(self, timeout: Optional[float] = None) -> Optional[StateSnapshot]:
+        """Block until a newer snapshot is published; None on timeout or close."""
+        while not self.closed:
+            if not self._event.wait(timeout):
+                return None
+            self._event.clear()
+            snapshot = self._take()
+            if snapshot is not None:
+                return snapshot
+        return None
+
+    async def next(self) -> Optional[StateSnapshot]:
+        """Await a newer snapshot; None once closed."""
+        while not self.closed:
+            snapshot = self._take()
+            if snapshot is not None:
+                return snapshot
+            waiter = asyncio.Event()
+            entry = (asyncio.get_running_loop(), waiter)
+            self._waiters.append(entry)
+            try:
+                if self._latest.version <= self._seen and not self.closed:
+                    await waiter.wait()
+            finally:
+                self._waiters.remove(entry)
+        return None
+
+    def close(self) -> None:
+        self.closed = True
+        self._state._unsubscribe(self)
+        self._wake()
+
+    def __enter__(self) -> Subscription:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _take(self) -> Optional[StateSnapshot]:
+        snapshot = self._latest
+        if snapshot.version <= self._seen:
+            return None
+        self._seen = snapshot.version
+        return snapshot
+
+    def _publish(self, changed: Iterable[str], snapshot: StateSnapshot) -> None:
+        if self._fields is not None and self._fields.isdisjoint(changed):
+            return
+        self._latest = snapshot
+        self._wake()
+
+    def _wake(self) -> None:
+        self._event.set()
+        for loop, waiter in list(self._waiters):
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                pass  # subscriber's loop already closed
@@ -0,0 +1,380 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Optional
+
+from .config import AppConfig
+from .journal import EventJournal
+from .log import configure_logging, log_event, set_log_level
+from .scheduling import lock_memory
+from .streamer import _retry_delay
+
+logger = logging.getLogger(__name__)
+
+COMMAND_TIMEOUT_SECONDS = 5.0
+HEALTHY_RUN_SECONDS = 60.0
+
+
+class StationError(RuntimeError):
+    pass
+
+
+@dataclass
+class _StationWorker:
+    station_id: str
+    cpu_affinity: list[int]
+    process: Optional[multiprocessing.process.BaseProcess] = None
+    conn: Optional[Connection] = None
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    started_at: float = 0.0
+    restarts: int = 0
+    consecutive_failures: int = 0
+    last_exit_code: Optional[int] = None
+    next_start_at: float = 0.0
+    next_request_id: int = 0
+    retired: bool = False  # removed from the config; never respawned
+
+
+class StationSupervisor:
+    """Runs one pipeline per `[[stations]]` entry, each in its own process.
+
+    Workers are pinned to their configured CPUs and restarted with exponential
+    backoff when they crash. Commands travel over a per-worker pipe, tagged
+    with an id so a late reply to a timed-out command is never taken for the
+    answer to the next one. Config edits reach running workers through
+    `update_config`.
+    """
+
+    def __init__(self, config: AppConfig, journal: Optional[EventJournal] = None) -> None:
+        self._config = config
+        self._journal = journal
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[str, _StationWorker] = {
+            station.id: _StationWorker(station.id, list(station.cpu_affinity))
+            for station in config.stations
+        }
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lifecycle_lock = threading.Lock()  # one of supervise pass / config update at a time
+
+    def station_ids(self) -> list[str]:
+        return list(self._workers)
+
+    def update_config(self, config: AppConfig) -> dict:
+        """Apply an edited config: add, remove, restart or live-update workers.
+
+        Workers take most edits in place. A change to `cpu_affinity` or to the
+        pipeline shape (DSP offload, encoder, streamer backend) restarts the
+        worker, which resumes streaming if it was streaming.
+        """
+        with self._lifecycle_lock:
+            return self._update_config(config)
+
+    def _update_config(self, config: AppConfig) -> dict:
+        previous = self._config
+        self._config = config
+        current = {station.id: station for station in config.stations}
+        changes: dict = {"added": [], "removed": [], "restarted": [], "updated": []}
+        workers = dict(self._workers)
+        for station_id in [station_id for station_id in workers if station_id not in current]:
+            worker = workers.pop(station_id)
+            worker.retired = True
+            self._shutdown(worker)
+            changes["removed"].append(station_id)
+        running = self._thread is not None
+        for station_id, station in current.items():
+            worker = workers.get(station_id)
+            if worker is None:
+                worker = workers[station_id] = _StationWorker(station_id, list(station.cpu_affinity))
+                if running:
+                    self._spawn(worker)
+                changes["added"].append(station_id)
+                continue
+            before = previous.for_station(station_id)
+            after = config.for_station(station_id)
+            if before.to_dict() == after.to_dict() and worker.cpu_affinity == list(station.cpu_affinity):
+                continue
+            if not running or not worker.process:
+                worker.cpu_affinity = list(station.cpu_affinity)  # picked up on the next spawn
+            elif worker.cpu_affinity != list(station.cpu_affinity) or _pipeline(before) != _pipeline(after):
+                self._restart(worker, list(station.cpu_affinity))
+                changes["restarted"].append(station_id)
+                continue
+            else:
+                try:
+                    self.request(station_id, "config", config=after.to_dict())
+                except StationError:
+                    pass  # not answering: the supervisor respawns it with the new config
+            changes["updated"].append(station_id)
+        self._workers = workers
+        if any(changes.values()):
+            self._record("station.config", "station config updated", **changes)
+        return changes
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        for worker in self._workers.values():
+            self._spawn(worker)
+        self._thread = threading.Thread(target=self._supervise, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        for worker in self._workers.values():
+            self._shutdown(worker)
+
+    def request(self, station_id: str, command: str, **args: Any) -> dict:
+        worker = self._workers.get(station_id)
+        if worker is None:
+            raise KeyError(station_id)
+        with worker.lock:
+            if not worker.conn or not worker.process or not worker.process.is_alive():
+                raise StationError(f"station '{station_id}' is not running")
+            worker.next_request_id += 1
+            request_id = worker.next_request_id
+            deadline = time.monotonic() + COMMAND_TIMEOUT_SECONDS
+            try:
+                worker.conn.send({"id": request_id, "command": command, **args})
+                while True:
+                    if not worker.conn.poll(max(deadline - time.monotonic(), 0)):
+                        raise StationError(f"station '{station_id}' did not answer '{command}'")
+                    reply = worker.conn.recv()
+                    if reply.get("id") == request_id:
+                        break  # anything else answers an earlier, timed-out command
+            except (EOFError, OSError) as exc:
+                raise StationError(f"station '{station_id}' connection lost: {exc}") from exc
+        if "error" in reply:
+            raise StationError(reply["error"])
+        reply.pop("id", None)
+        return reply
+
+    def status(self, station_id: str) -> dict:
+        worker = self._workers.get(station_id)
+        if worker is None:
+            raise KeyError(station_id)
+        alive = bool(worker.process and worker.process.is_alive())
+        payload: dict = {
+            "id": station_id,
+            "alive": alive,
+            "pid": worker.process.pid if worker.process else None,
+            "cpu_affinity": worker.cpu_affinity,
+            "restarts": worker.restarts,
+            "last_exit_code": worker.last_exit_code,
+        }
+        if alive:
+            try:
+                payload.update(self.request(station_id, "status"))
+            except StationError as exc:
+                payload["error"] = str(exc)
+        return payload
+
+    def _restart(self, worker: _StationWorker, cpu_affinity: list[int]) -> None:
+        try:
+            streaming = bool(self.request(worker.station_id, "status")["state"]["streaming"])
+        except StationError:
+            streaming = False
+        self._shutdown(worker)
+        worker.cpu_affinity = cpu_affinity
+        self._spawn(worker, autostart=streaming)
+
+    def _spawn(self, worker: _StationWorker, autostart: bool = False) -> None:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=station_worker_main,
+            args=(worker.station_id, self._config.to_dict(), worker.cpu_affinity, child_conn, autostart),
+            name=f"ondepi-{worker.station_id}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        with worker.lock:
+            worker.process = process
+            worker.conn = parent_conn
+            worker.started_at = time.monotonic()
+
+    def _shutdown(self, worker: _StationWorker) -> None:
+        process = worker.process
+        if not process:
+            return
+        if process.is_alive() and worker.conn:
+            try:
+                worker.conn.send({"command": "shutdown"})
+            except (OSError, ValueError):
+                pass
+            process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout=5)
+        with worker.lock:
+            if worker.conn:
+                worker.conn.close()
+            worker.process = None
+            worker.conn = None
+
+    def _supervise(self) -> None:
+        while not self._stop.wait(0.5):
+            with self._lifecycle_lock:
+                self._supervise_pass()
+
+    def _supervise_pass(self) -> None:
+        general = self._config.general
+        now = time.monotonic()
+        for worker in list(self._workers.values()):
+            if worker.retired:
+                continue
+            process = worker.process
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                worker.last_exit_code = process.exitcode
+                if now - worker.started_at >= HEALTHY_RUN_SECONDS:
+                    worker.consecutive_failures = 0
+                worker.consecutive_failures += 1
+                delay = _retry_delay(
+                    worker.consecutive_failures,
+                    max(general.retry_initial_delay_seconds, 1),
+                    general.retry_max_delay_seconds,
+                )
+                worker.next_start_at = now + delay
+                self._record(
+                    "station.crash",
+                    f"station {worker.station_id} exited with code {process.exitcode}, "
+                    f"restart in {delay}s",
+                    station=worker.station_id,
+                    exit_code=process.exitcode,
+                )
+                with worker.lock:
+                    if worker.conn:
+                        worker.conn.close()
+                    worker.process = None
+                    worker.conn = None
+            if now >= worker.next_start_at:
+                worker.restarts += 1
+                self._spawn(worker)
+                self._record(
+                    "station.restart",
+                    f"station {worker.station_id} restarted",
+                    station=worker.station_id,
+                )
+
+    def _record(self, kind: str, message: str, **data: Any) -> None:
+        log_event(logger, kind, message, **data)
+        if self._journal:
+            self._journal.record(kind, message, **data)
+
+
+def station_worker_main(
+    station_id: str,
+    config_data: dict,
+    cpu_affinity: list[int],
+    conn: Connection,
+    autostart: bool = False,
+) -> None:
+    """Entry point of a station process: one AudioEngine + Streamer pipeline."""
+    if cpu_affinity and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, set(cpu_affinity))
+        except OSError:
+            pass
+
+    from .audio import AudioEngine
+    from .azuracast import AzuraCastClient
+    from .state import StreamState
+    from .streamer import create_streamer
+
+    config = AppConfig.from_dict(config_data).for_station(station_id)
+    configure_logging(config.general, suffix=station_id)
+    if config.scheduling.mlockall:
+        lock_memory()
+    state = StreamState()
+    audio_engine = None
+    if config.stream.dsp != "ffmpeg":  # with DSP offload ffmpeg captures the device itself
+        audio_engine = AudioEngine(
+            config.input,
+            state,
+            scheduling=config.scheduling,
+            fallback=config.fallback,
+        )
+    streamer = create_streamer(
+        config,
+        state,
+        azuracast=AzuraCastClient(config.azuracast),
+        audio_engine=audio_engine,
+    )
+    if audio_engine:
+        audio_engine.start()
+    if autostart:
+        streamer.start()
+    try:
+        while True:
+            try:
+                if not conn.poll(1.0):
+                    continue
+                message = conn.recv()
+            except (EOFError, OSError):
+                break  # supervisor went away
+            command = message.get("command")
+            if command == "shutdown":
+                break
+            try:
+                if command == "config":
+                    config, reply = _apply_station_config(config, message["config"], streamer, audio_engine)
+                else:
+                    reply = _handle_command(command, message, state, streamer, audio_engine)
+            except Exception as exc:  # pragma: no cover - reported to the supervisor
+                reply = {"error": str(exc)}
+            conn.send({"id": message.get("id"), **reply})
+    finally:
+        streamer.stop()
+        if audio_engine:
+            audio_engine.stop()
+
+
+def _pipeline(config: AppConfig) -> tuple:
+    """Settings a worker builds its pipeline from; changing one needs a new process."""
+    return (config.stream.dsp, config.stream.encoder, config.general.streamer_backend)
+
+
+def _apply_station_config(  # noqa: ANN001
+    current: AppConfig, data: dict, streamer, audio_engine
+) -> tuple[AppConfig, dict]:
+    config = AppConfig.from_dict(data)
+    set_log_level(config.general.log_level)
+    streamer.update_config(config)
+    if audio_engine:
+        if config.input != current.input:
+            audio_engine.update_input(config.input)
+        audio_engine.update_fallback(config.fallback)
+    return config, {"ok": True}
+
+
+def _handle_command(command, message: dict, state, streamer, audio_engine) -> dict:  # noqa: ANN001
+    if command == "status":
+        affinity = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else None
+        return {
+            "state": state.as_dict(),
+            "stream": streamer.status(),
+            "device": audio_engine.device_status() if audio_engine else None,
+            "applied_affinity": affinity,
+        }
+    if command == "start":
+        streamer.start()
+        return {"ok": True}
+    if command == "stop":
+        streamer.stop()
+        return {"ok": True}
+    if command == "gain":
+        snapshot = state.update(gain_db=float(message["gain_db"]))
+        return {"ok": True, "gain_db": snapshot.gain_db}
+    return {"error": f"unknown command '{command}'"}
@@ -1,23 +1,104 @@
 from __future__ import annotations
 
+import logging
+import math
+import os
+import queue
 import subprocess
 import threading
 import time
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
-from typing import Callable, List, Optional
+from typing import TYPE_CHECKING, Callable, List, Optional, Union
 from urllib.parse import quote
 
-from .audio import AudioEngine
+from .adaptive import BitrateLadder, BitrateStep
 from .azuracast import AzuraCastClient
-from .config import AppConfig
-from .state import StreamState
+from .config import AppConfig, InputConfig
+from .journal import EventJournal
+from .log import log_event
+from .reconnect import (
+    NETWORK,
+    PROBE_INTERVAL_SECONDS,
+    RETRY_POLICIES,
+    RetryPolicy,
+    classify_exit,
+    probe_server,
+)
+from .scheduling import apply_encoder_policy
+from .state import LevelState, StreamState, Subscription
+from .trace import TRACER, now_ns
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from .audio import AudioEngine
+
+# Raw PCM input needs no probing; disable the demuxer's read-ahead buffer.
+LOW_LATENCY_INPUT_ARGS = ["-fflags", "nobuffer", "-probesize", "32", "-analyzeduration", "0"]
+# Write every packet as soon as it is muxed instead of batching for max_delay.
+LOW_LATENCY_OUTPUT_ARGS = ["-flush_packets", "1", "-max_delay", "0", "-muxpreload", "0"]
+
+
+logger = logging.getLogger(__name__)
+
+PCM_QUEUE_BLOCKS = 256
+STDERR_TAIL_LINES = 20
+
+# DSP offload: ffmpeg applies gain and limiting and reports levels for windows this long.
+METER_INTERVAL_SECONDS = 0.1
+LIMITER_CEILING = 0.98
+METER_KEYS = {"lavfi.astats.Overall.RMS_level": "rms", "lavfi.astats.Overall.Peak_level": "peak"}
+
+# Adaptive bitrate: how often speed/backlog are sampled, and how long the old
+# encoder may flush at EOF before it is terminated to free the mount.
+ADAPTIVE_INTERVAL_SECONDS = 1.0
+# Encode speed is averaged over this much progress output; ffmpeg reports
+# every 0.5 s, and a report older than PROGRESS_STALE_SECONDS means it stopped.
+SPEED_WINDOW_SECONDS = 5.0
+PROGRESS_STALE_SECONDS = 1.0
+SWITCH_DRAIN_SECONDS = 1.0
+BITRATE_STEPS_KEPT = 20
+
+SPAN_SPAWN = TRACER.name_id("stream.spawn")
+SPAN_RETRY_SLEEP = TRACER.name_id("stream.retry_sleep")
+SPAN_PROBE_WAIT = TRACER.name_id("stream.probe_wait")
 
 
 @dataclass
 class StreamProcess:
+    """One encoder run, with the throughput counters the stall watchdog reads."""
+
     command: List[str]
     process: subprocess.Popen
+    started_at: float = field(default_factory=time.monotonic)
+    pcm: queue.Queue = field(default_factory=lambda: queue.Queue(maxsize=PCM_QUEUE_BLOCKS))
+    bytes_accepted: int = 0
+    last_accept_at: float = 0.0
+    write_started_at: Optional[float] = None
+    dropped_blocks: int = 0
+    last_progress_at: float = 0.0
+    progress: dict = field(default_factory=dict)
+    out_time: Optional[tuple[float, float]] = None  # (monotonic arrival, encoded seconds)
+    stderr_tail: deque = field(default_factory=lambda: deque(maxlen=STDERR_TAIL_LINES))
+    stderr_reader: Optional[threading.Thread] = None
+    stalled: bool = False
+    exited: threading.Event = field(default_factory=threading.Event)
+    offload: bool = False  # ffmpeg captures and runs the DSP itself
+    meter: dict = field(default_factory=dict)
+    preroll: list = field(default_factory=list)  # blocks written before the queue, carried over a rebuild
+    switching: bool = False  # exiting for a planned bitrate change, not a failure
+
+
+@dataclass
+class PcmCarry:
+    """PCM captured for the next encoder while the current one is rebuilt at a new bitrate."""
+
+    pcm: queue.Queue = field(default_factory=lambda: queue.Queue(maxsize=PCM_QUEUE_BLOCKS))
+    preroll: list = field(default_factory=list)
+    dropped_blocks: int = 0
+    consumer: Optional[Callable] = None
 
 
 class Streamer:
@@ -27,19 +108,34 @@ class Streamer:
         state: StreamState,
         azuracast: Optional[AzuraCastClient] = None,
         audio_engine: Optional[AudioEngine] = None,
+        journal: Optional[EventJournal] = None,
     ) -> None:
         self._config = config
         self._state = state
         self._azuracast = azuracast
         self._audio_engine = audio_engine
+        self._journal = journal
         self._process: Optional[StreamProcess] = None
         self._audio_consumer = None
         self._monitor_thread: Optional[threading.Thread] = None
         self._stop_requested = False
+        self._retry_stop = threading.Event()
+        self._retrying = False
         self._metadata_thread: Optional[threading.Thread] = None
         self._metadata_stop = threading.Event()
-
-    def build_ffmpeg_command(self) -> List[str]:
+        self._scheduling_report: Optional[dict] = None
+        self._stalls = 0
+        self._last_stall: Optional[dict] = None
+        self._ladder: Optional[BitrateLadder] = None
+        self._bitrate_steps: deque = deque(maxlen=BITRATE_STEPS_KEPT)
+        self._carry: Optional[PcmCarry] = None
+
+    def build_ffmpeg_command(self, meter_fd: Optional[int] = None) -> List[str]:
+        """ffmpeg invocation for the current config.
+
+        With DSP offload, `meter_fd` is the inherited pipe ffmpeg prints level
+        metadata to; None leaves the meter tap out.
+        """
         stream = self._config.stream
         metadata = self._config.metadata
         input_cfg = self._config.input
@@ -82,14 +178,20 @@ class Streamer:
             "-hide_banner",
             "-loglevel",
             "warning",
+            "-nostats",
+            "-progress",
+            "pipe:1",
+            *(LOW_LATENCY_INPUT_ARGS if stream.low_latency else []),
             *input_args,
             "-vn",
         ]
+        if self._offload_dsp():
+            cmd += _offload_filters(input_cfg, self._state.gain_db, meter_fd)
         cmd += [
             "-acodec",
             _codec_for_format(stream.format),
             "-b:a",
-            f"{stream.bitrate_kbps}k",
+            f"{self._bitrate_kbps()}k",
             "-f",
             stream.format,
             "-content_type",
@@ -98,67 +200,141 @@ class Streamer:
             f"title={metadata.track}",
             "-metadata",
             f"artist={metadata.artist}",
+            *(LOW_LATENCY_OUTPUT_ARGS if stream.low_latency else []),
             output_url,
         ]
         return cmd
 
     def start(self) -> None:
-        if self._process is not None:
+        if self._process is not None or self._retrying:
             return
         self._stop_requested = False
-        self._state.retry_count = 0
-        self._state.last_retry_at = None
-        self._state.last_exit_code = None
+        self._retry_stop.clear()
+        self._state.update(retry_count=0, last_retry_at=None, last_exit_code=None, last_exit_class=None)
         self._metadata_stop.clear()
+        adaptive = self._config.adaptive_bitrate
+        self._ladder = BitrateLadder(adaptive, self._config.stream.bitrate_kbps) if adaptive.enabled else None
         self._start_process(is_retry=False)
 
     def stop(self) -> None:
+        self._stop_requested = True
+        self._retry_stop.set()  # also cancels a pending respawn
         if not self._process:
             return
-        self._stop_requested = True
         self._metadata_stop.set()
         self._cleanup_audio()
         self._process.process.terminate()
         self._process.process.wait(timeout=5)
         self._process = None
-        self._state.streaming = False
+        self._state.update(streaming=False)
+        self._record("stream.stop", "stream stopped by request")
         if self._azuracast:
             self._azuracast.update_streamer_metadata(self._config.metadata)
 
     def status(self) -> dict:
+        session = self._process
+        now = time.monotonic()
         return {
-            "running": self._process is not None,
-            "command": self._process.command if self._process else None,
+            "running": session is not None,
+            "command": session.command if session else None,
+            "encoder": "ffmpeg",
             "input": "audio-engine" if self._audio_engine else "alsa",
+            "dsp": "ffmpeg" if session and session.offload else "python",
             "retry_count": self._state.retry_count,
+            "retrying": self._retrying,
+            "low_latency": self._config.stream.low_latency,
+            "bitrate_kbps": self._bitrate_kbps(),
+            "adaptive_bitrate": (
+                {"ladder_kbps": self._ladder.rungs, "steps": list(self._bitrate_steps)} if self._ladder else None
+            ),
+            "scheduling": self._scheduling_report,
+            "bytes_accepted": session.bytes_accepted if session else 0,
+            "dropped_blocks": session.dropped_blocks if session else 0,
+            "progress_age_seconds": (
+                round(now - (session.last_progress_at or session.started_at), 2) if session else None
+            ),
+            "stalls": self._stalls,
+            "last_stall": self._last_stall,
         }
 
     def update_config(self, config: AppConfig) -> None:
         self._config = config
 
+    def attach_audio_engine(self, audio_engine: AudioEngine) -> None:
+        self._audio_engine = audio_engine
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Hook for event-loop based streamers; the threaded one has nothing to bind."""
+
     def _start_process(self, is_retry: bool) -> None:
-        command = self.build_ffmpeg_command()
-        process = subprocess.Popen(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            stdin=subprocess.PIPE if self._audio_engine else None,
-        )
-        self._process = StreamProcess(command=command, process=process)
-        self._state.streaming = True
-        self._state.started_at = datetime.utcnow()
-        if not is_retry:
-            self._state.last_error = None
-        if self._audio_engine and process.stdin:
-            self._audio_consumer = self._build_audio_consumer(process.stdin)
-            self._audio_engine.add_consumer(self._audio_consumer)
+        started = now_ns()
+        offload = self._offload_dsp()
+        gain_updates = self._subscribe_gain() if offload else None
+        meter_read, meter_write = os.pipe() if offload else (None, None)
+        try:
+            command = self.build_ffmpeg_command(meter_write)
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                stdin=subprocess.PIPE if self._audio_engine or offload else None,
+                pass_fds=(meter_write,) if offload else (),
+            )
+        except BaseException:
+            if offload:
+                gain_updates.close()
+                os.close(meter_read)
+            raise
+        finally:
+            if offload:
+                os.close(meter_write)
+        session = StreamProcess(command=command, process=process, offload=offload)
+        carry, self._carry = self._carry, None
+        if carry is not None:
+            session.pcm, session.preroll, session.dropped_blocks = carry.pcm, carry.preroll, carry.dropped_blocks
+        self._on_spawned(session, is_retry)
+        if offload:
+            _spawn(self._read_meter, session, meter_read)
+            _spawn(self._push_gain, session, gain_updates)
+        if TRACER.enabled:
+            TRACER.span(SPAN_SPAWN, started)
+        _spawn(self._read_progress, session)
+        session.stderr_reader = _spawn(self._read_stderr, session)
+        if self._audio_engine and process.stdin and not offload:
+            _spawn(self._write_pcm, session)
+            self._audio_consumer = self._build_audio_consumer(session)
+            if carry is not None and carry.consumer is not None:
+                self._audio_engine.replace_consumer(carry.consumer, self._audio_consumer)
+            else:
+                self._audio_engine.add_consumer(self._audio_consumer)
+        if self._config.general.stall_timeout_seconds > 0:
+            _spawn(self._watch_stall, session)
+        if self._ladder:
+            _spawn(self._watch_bitrate, session)
         if self._azuracast:
             self._azuracast.update_streamer_metadata(self._config.metadata)
             self._start_metadata_loop()
         self._start_monitor()
 
+    def _on_spawned(self, session: StreamProcess, is_retry: bool) -> None:
+        self._scheduling_report = apply_encoder_policy(self._config.scheduling, session.process.pid)
+        self._process = session
+        started = {"streaming": True, "started_at": datetime.utcnow()}
+        if not is_retry:
+            started["last_error"] = None
+        self._state.update(**started)
+        self._record(
+            "stream.start",
+            "encoder restarted" if is_retry else "stream started",
+            retry=is_retry,
+            pid=session.process.pid,
+            bitrate_kbps=self._bitrate_kbps(),
+        )
+
     def _start_monitor(self) -> None:
-        if self._monitor_thread and self._monitor_thread.is_alive():
+        current = self._monitor_thread
+        # A respawn is started from the monitor thread itself, which is about to return.
+        if current and current.is_alive() and current is not threading.current_thread():
             return
         self._monitor_thread = threading.Thread(target=self._monitor_process, daemon=True)
         self._monitor_thread.start()
@@ -177,7 +353,8 @@ class Streamer:
             if metadata_cfg.push_enabled and self._azuracast:
                 error = self._azuracast.update_streamer_metadata_safe(metadata_cfg)
                 if error:
-                    self._state.last_error = f"metadata update failed: {error}"
+                    self._state.update(last_error=f"metadata update failed: {error}")
+                    self._record("metadata.error", f"metadata update failed: {error}")
                 attempts = max(metadata_cfg.retry_attempts, 0)
                 delay = max(metadata_cfg.retry_delay_seconds, 0)
                 retry_index = 0
@@ -186,74 +363,425 @@ class Streamer:
                         break
                     error = self._azuracast.update_streamer_metadata_safe(metadata_cfg)
                     if error:
-                        self._state.last_error = f"metadata update failed: {error}"
+                        self._state.update(last_error=f"metadata update failed: {error}")
+                        self._record(
+                            "metadata.error",
+                            f"metadata update failed: {error}",
+                            retry=retry_index + 1,
+                        )
                     retry_index += 1
             self._metadata_stop.wait(metadata_cfg.push_interval_seconds)
 
     def _monitor_process(self) -> None:
-        if not self._process:
+        session = self._process
+        if not session:
             return
-        process = self._process.process
+        process = session.process
         process.wait()
+        session.exited.set()
         exit_code = process.returncode
-        stderr = ""
-        if process.stderr:
-            try:
-                stderr = process.stderr.read().decode("utf-8", errors="ignore").strip()
-            except Exception:
-                stderr = ""
+        if session.switching and not self._stop_requested:
+            # Planned rebuild: the carry keeps capturing, so respawn right away.
+            self._process = None
+            self._start_process(is_retry=True)
+            return
         self._cleanup_audio()
         self._metadata_stop.set()
         self._process = None
-        self._state.streaming = False
-        self._state.last_exit_code = exit_code
+        self._state.update(streaming=False, last_exit_code=exit_code)
 
         if self._stop_requested:
             return
 
-        message = f"ffmpeg exited with code {exit_code}"
-        if stderr:
-            message = f"{message}: {stderr.splitlines()[-1]}"
-        self._state.last_error = message
+        if session.stderr_reader:
+            session.stderr_reader.join(timeout=1)
+        plan = self._plan_retry(session, exit_code)
+        if plan is None:
+            return
+        policy, delay = plan
+        self._retrying = True
+        try:
+            started = now_ns()
+            if self._retry_stop.wait(delay):
+                return
+            if TRACER.enabled:
+                started = TRACER.span(SPAN_RETRY_SLEEP, started)
+            probe = policy.probe and self._config.general.preflight_probe
+            if probe and not self._wait_for_server():
+                return
+            if TRACER.enabled and probe:
+                TRACER.span(SPAN_PROBE_WAIT, started)
+            if self._stop_requested:
+                return
+        finally:
+            self._retrying = False
+        self._start_process(is_retry=True)
+
+    def _plan_retry(
+        self,
+        session: StreamProcess,
+        exit_code: Optional[int],
+    ) -> Optional[tuple[RetryPolicy, int]]:
+        """Classify an unrequested exit and journal it; returns (policy, delay) when a retry is due."""
+        stderr = "\n".join(session.stderr_tail)
+        if session.stalled:
+            # Killed by the watchdog, typically stuck writing to a half-open connection.
+            exit_class = NETWORK
+            message = "ffmpeg stalled and was restarted"
+        else:
+            exit_class = classify_exit(exit_code, stderr)
+            message = f"ffmpeg exited with code {exit_code}"
+            if stderr:
+                message = f"{message}: {stderr.splitlines()[-1]}"
+        return self._retry_after(exit_class, message, exit_code=exit_code, stderr=stderr.splitlines()[-5:])
+
+    def _retry_after(self, exit_class: str, message: str, **data) -> Optional[tuple[RetryPolicy, int]]:  # noqa: ANN003
+        """Journal a classified stream failure and apply its retry policy."""
+        self._state.update(last_exit_class=exit_class, last_error=message)
+        self._record("stream.exit", message, exit_class=exit_class, **data)
 
         if not self._config.general.reconnect:
-            return
+            return None
+
+        policy = RETRY_POLICIES[exit_class]
+        if not policy.retry:
+            self._state.update(last_error=f"{message} ({exit_class} error, not retrying)")
+            self._record(
+                "stream.giveup",
+                f"{exit_class} error will not recover by retrying",
+                exit_class=exit_class,
+            )
+            return None
 
         if self._config.general.retry_max_attempts and (
             self._state.retry_count >= self._config.general.retry_max_attempts
         ):
-            return
+            return None
 
-        self._state.retry_count += 1
-        self._state.last_retry_at = datetime.utcnow()
+        retry_count = self._state.modify(
+            lambda current: {"retry_count": current.retry_count + 1, "last_retry_at": datetime.utcnow()}
+        ).retry_count
         delay = _retry_delay(
-            self._state.retry_count,
-            self._config.general.retry_initial_delay_seconds,
+            retry_count,
+            max(self._config.general.retry_initial_delay_seconds, policy.min_delay_seconds),
             self._config.general.retry_max_delay_seconds,
         )
-        time.sleep(delay)
-        if self._stop_requested:
-            return
-        self._start_process(is_retry=True)
-
-    def _build_audio_consumer(self, stdin) -> Callable:
+        self._record(
+            "stream.retry",
+            f"retry {retry_count} in {delay}s ({exit_class})",
+            attempt=retry_count,
+            delay=delay,
+            exit_class=exit_class,
+        )
+        return policy, delay
+
+    def _wait_for_server(self) -> bool:
+        """Poll the server cheaply instead of spawning ffmpeg until it answers."""
+        reported = False
+        while True:
+            stream = self._config.stream
+            timeout = self._config.general.preflight_timeout_seconds
+            error = probe_server(stream.server, stream.port, timeout)
+            if error is None:
+                return True
+            message = f"{stream.server}:{stream.port} unreachable: {error}"
+            self._state.update(last_error=message)
+            if not reported:
+                self._record("stream.probe", message, error=error)
+                reported = True
+            if self._retry_stop.wait(PROBE_INTERVAL_SECONDS):
+                return False
+
+    def _record(self, kind: str, message: str, **data) -> None:
+        log_event(logger, kind, message, **data)
+        TRACER.mark(kind)
+        if self._journal:
+            self._journal.record(kind, message, **data)
+
+    def _build_audio_consumer(self, session: Union[StreamProcess, PcmCarry]) -> Callable:
         def _consumer(chunk):
+            # Never block the audio callback: a stuck encoder only drops blocks here.
             try:
-                stdin.write(chunk.astype("float32").tobytes())
-            except Exception:
-                self._state.last_error = "Audio pipeline broken"
+                session.pcm.put_nowait(chunk.astype("float32").tobytes())
+            except queue.Full:
+                session.dropped_blocks += 1
 
         return _consumer
 
+    def _write_pcm(self, session: StreamProcess) -> None:
+        stdin = session.process.stdin
+        assert stdin is not None
+        fd = stdin.fileno()
+        try:
+            while not session.exited.is_set():
+                if session.preroll:
+                    data = session.preroll.pop(0)
+                else:
+                    try:
+                        data = session.pcm.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+                if data is None:
+                    break
+                view = memoryview(data)
+                session.write_started_at = time.monotonic()
+                while view:
+                    written = os.write(fd, view)
+                    session.bytes_accepted += written
+                    session.last_accept_at = time.monotonic()
+                    view = view[written:]
+                session.write_started_at = None
+        except OSError:
+            if not self._stop_requested:
+                self._state.update(last_error="Audio pipeline broken")
+        finally:
+            session.write_started_at = None
+            try:
+                stdin.close()
+            except OSError:
+                pass
+
+    def _read_progress(self, session: StreamProcess) -> None:
+        """Parse `-progress pipe:1` blocks; any change in output size/time counts as progress."""
+        stdout = session.process.stdout
+        if stdout is None:
+            return
+        for raw in iter(stdout.readline, b""):
+            _note_progress(session, raw)
+
+    def _read_stderr(self, session: StreamProcess) -> None:
+        stderr = session.process.stderr
+        if stderr is None:
+            return
+        for raw in iter(stderr.readline, b""):
+            _note_stderr(session, raw)
+
+    def _read_meter(self, session: StreamProcess, fd: int) -> None:
+        with open(fd, "rb") as pipe:
+            for raw in pipe:
+                self._note_meter(session, raw)
+
+    def _note_meter(self, session: StreamProcess, raw: bytes) -> None:
+        levels = _parse_meter(session.meter, raw)
+        if levels is not None:
+            self._state.update(levels=levels)
+
+    def _push_gain(self, session: StreamProcess, updates: Subscription) -> None:
+        """Forward gain changes to ffmpeg's volume filter as interactive commands."""
+        stdin = session.process.stdin
+        assert stdin is not None
+        with updates:
+            while not session.exited.is_set():
+                snapshot = updates.get(timeout=0.5)
+                if snapshot is None:
+                    continue
+                try:
+                    stdin.write(_gain_command(snapshot.gain_db))
+                    stdin.flush()
+                except (OSError, ValueError):
+                    return  # ffmpeg exited
+
+    def _subscribe_gain(self) -> Subscription:
+        """Gain changes from now on; the command built next carries the current value."""
+        updates = self._state.subscribe(("gain_db",))
+        updates.get(timeout=0)
+        return updates
+
+    def _offload_dsp(self) -> bool:
+        return self._audio_engine is None and self._config.stream.dsp == "ffmpeg"
+
+    def _watch_stall(self, session: StreamProcess) -> None:
+        timeout = self._config.general.stall_timeout_seconds
+        interval = min(0.5, timeout / 4)
+        while not session.exited.wait(interval):
+            idle = _stall_idle(session, timeout)
+            if idle is not None:
+                self._on_stall(session, idle, timeout)
+                return
+
+    def _on_stall(self, session: StreamProcess, idle: float, timeout: float) -> None:
+        session.stalled = True
+        self._stalls += 1
+        self._last_stall = {
+            "at": datetime.utcnow().isoformat(),
+            "detection_latency_seconds": round(idle, 2),
+            "timeout_seconds": timeout,
+            "bytes_accepted": session.bytes_accepted,
+            "queued_blocks": session.pcm.qsize(),
+        }
+        self._record(
+            "stream.stall",
+            f"no encoder progress for {idle:.1f}s, killing ffmpeg",
+            **self._last_stall,
+        )
+        try:
+            session.process.kill()
+        except OSError:
+            pass
+
+    def _watch_bitrate(self, session: StreamProcess) -> None:
+        """Sample encode speed and PCM backlog; rebuild the encoder when the ladder steps."""
+        ladder = self._ladder
+        assert ladder is not None
+        ladder.hold()
+        samples: deque = deque()
+        while not session.exited.wait(ADAPTIVE_INTERVAL_SECONDS):
+            now = time.monotonic()
+            out_time = session.out_time
+            if out_time is not None and (not samples or samples[-1] != out_time):
+                samples.append(out_time)
+            speed = _window_speed(samples, now)
+            backlog = len(session.preroll) + session.pcm.qsize()
+            step = ladder.observe(now, speed, backlog)
+            if step is not None:
+                self._switch_bitrate(session, step)
+                return
+
+    def _switch_bitrate(self, session: StreamProcess, step: BitrateStep) -> None:
+        """End `session` at a block boundary; the monitor respawns it at the new bitrate."""
+        entry = {"at": datetime.utcnow().isoformat(), **asdict(step)}
+        self._bitrate_steps.append(entry)
+        self._record(
+            "stream.bitrate",
+            f"bitrate {step.from_kbps} -> {step.to_kbps} kbps ({step.reason})",
+            **entry,
+        )
+        if self._audio_engine and self._audio_consumer and not session.offload:
+            # From the next block on, capture goes to the carry; what the old encoder
+            # has not been sent yet moves over too, so no audio is lost in between.
+            carry = PcmCarry()
+            carry.consumer = self._build_audio_consumer(carry)
+            self._audio_engine.replace_consumer(self._audio_consumer, carry.consumer)
+            self._audio_consumer = carry.consumer
+            carry.preroll = session.preroll
+            session.preroll = []
+            while True:
+                try:
+                    data = session.pcm.get_nowait()
+                except queue.Empty:
+                    break
+                if data is not None:
+                    carry.preroll.append(data)
+            self._carry = carry
+            session.switching = True
+            session.pcm.put_nowait(None)  # writer closes stdin so ffmpeg flushes and exits
+            try:
+                session.process.wait(timeout=SWITCH_DRAIN_SECONDS)
+                return
+            except subprocess.TimeoutExpired:
+                pass  # stuck sending on the congested link
+        session.switching = True
+        try:
+            session.process.terminate()
+        except OSError:
+            pass
+
+    def _bitrate_kbps(self) -> int:
+        return self._ladder.bitrate_kbps if self._ladder else self._config.stream.bitrate_kbps
+
     def _cleanup_audio(self) -> None:
         if self._audio_engine and self._audio_consumer:
             self._audio_engine.remove_consumer(self._audio_consumer)
             self._audio_consumer = None
-        if self._process and self._process.process.stdin:
+        self._carry = None
+        session = self._process
+        if session and session.process.stdin and not session.offload:
             try:
-                self._process.process.stdin.close()
-            except Exception:
-                pass
+                session.pcm.put_nowait(None)  # writer closes stdin so ffmpeg sees EOF
+            except queue.Full:
+                session.exited.set()
+
+
+def _note_progress(session: StreamProcess, raw: bytes) -> None:
+    key, _, value = raw.decode("utf-8", errors="ignore").strip().partition("=")
+    if key in ("out_time_us", "total_size") and session.progress.get(key) != value:
+        session.last_progress_at = time.monotonic()
+    if key == "out_time_us":
+        try:
+            session.out_time = (time.monotonic(), int(value) / 1_000_000)
+        except ValueError:
+            pass  # "N/A" before the first packet
+    if key:
+        session.progress[key] = value
+
+
+def _note_stderr(session: StreamProcess, raw: bytes) -> None:
+    line = raw.decode("utf-8", errors="ignore").strip()
+    if line:
+        session.stderr_tail.append(line)
+
+
+def _window_speed(samples: deque, now: float) -> Optional[float]:
+    """Encoded seconds per wall second over the last SPEED_WINDOW_SECONDS of reports.
+
+    Uses the times the reports arrived, not when they were sampled, and trims
+    `samples` in place. Once reports stop, the window is stretched to `now`.
+    """
+    while len(samples) > 2 and samples[-1][0] - samples[1][0] >= SPEED_WINDOW_SECONDS:
+        samples.popleft()
+    if len(samples) < 2:
+        return None
+    (first_at, first_out), (last_at, last_out) = samples[0], samples[-1]
+    end = now if now - last_at > PROGRESS_STALE_SECONDS else last_at
+    if end <= first_at:
+        return None
+    return round((last_out - first_out) / (end - first_at), 3)
+
+
+def _stall_idle(session: StreamProcess, timeout: float) -> Optional[float]:
+    """Seconds without encoder progress once that counts as a stall, else None."""
+    idle = time.monotonic() - (session.last_progress_at or session.started_at)
+    if idle < timeout:
+        return None
+    if session.process.stdin is not None and not session.offload:
+        # Without pending PCM the encoder is simply starved (e.g. device gone).
+        writing = session.write_started_at is not None
+        if not writing and session.pcm.empty():
+            return None
+    return idle
+
+
+def _offload_filters(input_cfg: InputConfig, gain_db: float, meter_fd: Optional[int]) -> List[str]:
+    """Gain and limiter as an ffmpeg filter graph, plus a decimated astats tap on `meter_fd`."""
+    chain = f"[0:a]volume@gain=volume={gain_db:.2f}dB:precision=float"
+    if input_cfg.limiter_enabled:
+        chain += f",alimiter@limiter=level_in={input_cfg.limiter_drive:g}:limit={LIMITER_CEILING:g}:level=0"
+    if meter_fd is None:
+        return ["-filter_complex", f"{chain}[out]", "-map", "[out]"]
+    window = max(int(input_cfg.sample_rate * METER_INTERVAL_SECONDS), 1)
+    tap = (
+        f"[tap]asetnsamples=n={window}:p=0,"
+        "astats=metadata=1:reset=1:measure_perchannel=none:measure_overall=Peak_level+RMS_level,"
+        f"ametadata=mode=print:file=pipe\\:{meter_fd}:direct=1,anullsink"
+    )
+    return ["-filter_complex", f"{chain},asplit=2[out][tap];{tap}", "-map", "[out]"]
+
+
+def _parse_meter(pending: dict, raw: bytes) -> Optional[LevelState]:
+    """Collect one window's `ametadata` print lines; returns its levels once complete."""
+    line = raw.decode("utf-8", errors="ignore").strip()
+    if line.startswith("frame:"):
+        pending.clear()
+        return None
+    key, _, value = line.partition("=")
+    field_name = METER_KEYS.get(key)
+    if field_name is None:
+        return None
+    try:
+        db = float(value)
+    except ValueError:
+        return None
+    pending[field_name] = 10 ** (db / 20) if db > -math.inf else 0.0
+    if len(pending) < len(METER_KEYS):
+        return None
+    levels = LevelState(**pending)
+    pending.clear()
+    return levels
+
+
+def _gain_command(gain_db: float) -> bytes:
+    # ffmpeg's stdin 'c' command: <target> <time, -1 = now> <command> <argument>
+    return f"cvolume@gain -1 volume {gain_db:.2f}dB\n".encode("ascii")
 
 
 def _codec_for_format(fmt: str) -> str:
@@ -278,8 +806,27 @@ def _content_type_for_format(fmt: str) -> str:
     return "application/octet-stream"
 
 
+def create_streamer(config: AppConfig, state: StreamState, **kwargs) -> Streamer:  # noqa: ANN003
+    """Build the streamer selected by `stream.encoder` and `general.streamer_backend`."""
+    if config.stream.encoder == "native":
+        from .nativestreamer import NativeStreamer
+
+        return NativeStreamer(config, state, **kwargs)
+    if config.general.streamer_backend == "asyncio":
+        from .aiostreamer import AsyncStreamer
+
+        return AsyncStreamer(config, state, **kwargs)
+    return Streamer(config, state, **kwargs)
+
+
 def _retry_delay(attempt: int, initial: int, maximum: int) -> int:
     delay = initial * (2 ** max(attempt - 1, 0))
     if maximum > 0:
         return min(delay, maximum)
     return delay
+
+
+def _spawn(target: Callable, *args) -> threading.Thread:  # noqa: ANN002
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,268 @@
+"""`ondepi-cli top`: live terminal view of one OndePi instance.
+
+Every request (status, new journal errors, hotkey commands) goes over one
+keep-alive HTTP connection, reopened only when it breaks. Frames are diffed
+line by line so a steady display costs a few bytes per refresh, which keeps it
+usable over slow SSH links.
+"""
+from __future__ import annotations
+
+import http.client
+import json
+import math
+import os
+import select
+import shutil
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import IO, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+ERROR_KINDS = (
+    "stream.exit,stream.giveup,stream.stall,stream.probe,"
+    "device.error,device.disconnected,metadata.error,fallback.engaged"
+)
+RECENT_ERRORS = 5
+GAIN_STEP_DB = 1.0
+METER_FLOOR_DB = -60.0
+HELP = "[+/-] gain  [s] start  [x] stop  [q] quit"
+
+
+class ApiError(Exception):
+    pass
+
+
+class ApiConnection:
+    """One keep-alive connection reused for every request."""
+
+    def __init__(self, base_url: str, timeout: float = 5.0) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("", "http"):
+            raise ValueError("only http:// hosts are supported")
+        self._host = parts.hostname or "127.0.0.1"
+        self._port = parts.port or 80
+        self._prefix = parts.path.rstrip("/")
+        self._timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self.connections = 0
+
+    def request(self, method: str, path: str, payload: Optional[dict] = None) -> dict:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        try:
+            status, data = self._exchange(method, path, body, headers)
+        except (OSError, http.client.HTTPException):
+            # The server may have closed the idle keep-alive socket: retry once on a fresh one.
+            self.close()
+            status, data = self._exchange(method, path, body, headers)
+        if status >= 400:
+            raise ApiError(f"{method} {path}: HTTP {status}")
+        return json.loads(data or b"{}")
+
+    def _exchange(self, method: str, path: str, body: Optional[bytes], headers: dict) -> tuple[int, bytes]:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+            self.connections += 1
+        try:
+            self._conn.request(method, self._prefix + path, body=body, headers=headers)
+            response = self._conn.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class Screen:
+    """Redraws only the lines that changed since the previous frame."""
+
+    def __init__(self, out: IO[str]) -> None:
+        self._out = out
+        self._previous: list[str] = []
+
+    def __enter__(self) -> Screen:
+        self._out.write("\x1b[?1049h\x1b[?25l\x1b[2J")  # alternate screen, hide cursor
+        self._out.flush()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._out.write("\x1b[?25h\x1b[?1049l")
+        self._out.flush()
+
+    def draw(self, lines: list[str], width: int) -> int:
+        """Write the frame; returns the number of characters sent."""
+        lines = [line[:width] for line in lines]
+        parts = [
+            f"\x1b[{row + 1};1H{line}\x1b[K"
+            for row, line in enumerate(lines)
+            if row >= len(self._previous) or self._previous[row] != line
+        ]
+        if len(self._previous) > len(lines):
+            parts.append(f"\x1b[{len(lines) + 1};1H\x1b[J")
+        self._previous = lines
+        frame = "".join(parts)
+        if frame:
+            self._out.write(frame)
+            self._out.flush()
+        return len(frame)
+
+
+def render(
+    host: str,
+    status: Optional[dict],
+    errors: Iterable[dict],
+    width: int,
+    notice: str = "",
+) -> list[str]:
+    now = datetime.now().strftime("%H:%M:%S")
+    if status is None:
+        return [f"OndePi top  {host}  {now}", "", "Connecting…", "", HELP, notice]
+    state = status.get("state") or {}
+    stream = status.get("stream") or {}
+    device = status.get("device") or {}
+    levels = state.get("levels") or {}
+    meter_width = max(width - 22, 10)
+    on_air = "ON AIR" if state.get("streaming") else ("retrying" if stream.get("retrying") else "stopped")
+    retry = f"retries {state.get('retry_count', 0)}"
+    if state.get("last_exit_class"):
+        retry += f" (last: {state['last_exit_class']})"
+    lines = [
+        f"OndePi top  {host}  {now}  [{on_air}]",
+        "",
+        f"Gain {state.get('gain_db', 0.0):+.1f} dB   {retry}",
+        _meter("RMS ", levels.get("rms", 0.0), meter_width),
+        _meter("Peak", levels.get("peak", 0.0), meter_width),
+        "",
+        _encoder_line(stream),
+        _device_line(device),
+        f"Error   {state.get('last_error') or '—'}",
+        "",
+        "Recent errors:",
+    ]
+    recent = list(errors)[-RECENT_ERRORS:]
+    for event in recent:
+        stamp = datetime.fromtimestamp(event["ts"]).strftime("%H:%M:%S")
+        lines.append(f"  {stamp} {event['kind']:<18} {event['message']}")
+    lines += ["  —"] * (RECENT_ERRORS - len(recent))
+    lines += ["", f"{HELP}   {notice}".rstrip()]
+    return lines
+
+
+def _meter(label: str, value: float, width: int) -> str:
+    db = 20 * math.log10(value) if value > 0 else -math.inf
+    filled = int(round(width * min(max((db - METER_FLOOR_DB) / -METER_FLOOR_DB, 0.0), 1.0)))
+    reading = f"{db:6.1f} dBFS" if db > -math.inf else "  -inf dBFS"
+    return f"{label} {'█' * filled}{'·' * (width - filled)} {reading}"
+
+
+def _encoder_line(stream: dict) -> str:
+    if not stream.get("running"):
+        return f"Encoder {stream.get('encoder', 'ffmpeg')}  not running"
+    sent = stream.get("bytes_accepted", 0) / (1024 * 1024)
+    progress = stream.get("progress_age_seconds")
+    progress_text = f"{progress:.1f}s ago" if progress is not None else "—"
+    return (
+        f"Encoder {stream.get('encoder', 'ffmpeg')}  sent {sent:.1f} MiB  "
+        f"dropped {stream.get('dropped_blocks', 0)}  progress {progress_text}  stalls {stream.get('stalls', 0)}"
+    )
+
+
+def _device_line(device: dict) -> str:
+    if not device:
+        return "Device  —"
+    rate = f"{device.get('capture_rate') or device.get('sample_rate')} Hz"
+    if device.get("capture_rate") and device.get("capture_rate") != device.get("sample_rate"):
+        rate += f" -> {device.get('sample_rate')} Hz"
+    return f"Device  {device.get('status', '—')}  {device.get('device', '')}  {rate}"
+
+
+@contextmanager
+def _cbreak(stream: IO[str]) -> Iterator[Optional[int]]:
+    """Single-key input without echo; yields None when stdin is not a terminal."""
+    if not stream.isatty():
+        yield None
+        return
+    import termios
+    import tty
+
+    fd = stream.fileno()
+    saved = termios.tcgetattr(fd)
+    tty.setcbreak(fd)
+    try:
+        yield fd
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+
+
+def _wait_key(fd: Optional[int], timeout: float) -> Optional[str]:
+    if fd is None:
+        time.sleep(max(timeout, 0.0))
+        return None
+    ready, _, _ = select.select([fd], [], [], max(timeout, 0.0))
+    if not ready:
+        return None
+    return os.read(fd, 1).decode("utf-8", errors="ignore")
+
+
+def _handle_key(api: ApiConnection, key: str, status: Optional[dict]) -> str:
+    if key in "+=-_":
+        gain = ((status or {}).get("state") or {}).get("gain_db", 0.0)
+        gain += GAIN_STEP_DB if key in "+=" else -GAIN_STEP_DB
+        result = api.request("POST", "/api/gain", {"gain_db": gain})
+        return f"gain set to {result.get('gain_db', gain):+.1f} dB"
+    if key == "s":
+        api.request("POST", "/api/stream/start")
+        return "start requested"
+    if key == "x":
+        api.request("POST", "/api/stream/stop")
+        return "stop requested"
+    return ""
+
+
+def run_top(base_url: str, interval: float = 0.5, out: IO[str] = sys.stdout, keys: IO[str] = sys.stdin) -> None:
+    api = ApiConnection(base_url)
+    screen = Screen(out)
+    errors: deque = deque(maxlen=RECENT_ERRORS)
+    since = 0
+    status: Optional[dict] = None
+    notice = ""
+    try:
+        with _cbreak(keys) as fd, screen:
+            while True:
+                try:
+                    status = api.request("GET", "/api/status")
+                    if notice.startswith("connection lost"):
+                        notice = ""
+                    try:
+                        journal = api.request("GET", f"/api/events?since={since}&kind={ERROR_KINDS}&limit=20")
+                        since = journal.get("latest", since)
+                        errors.extend(journal.get("events", []))
+                    except ApiError:
+                        pass  # journal disabled
+                except (OSError, http.client.HTTPException, ApiError) as exc:
+                    notice = f"connection lost: {exc}; retrying"
+                width = shutil.get_terminal_size().columns
+                screen.draw(render(base_url, status, errors, width, notice), width)
+                deadline = time.monotonic() + interval
+                while (remaining := deadline - time.monotonic()) > 0:
+                    key = _wait_key(fd, remaining)
+                    if not key:
+                        continue
+                    if key == "q":
+                        return
+                    try:
+                        notice = _handle_key(api, key, status)
+                    except (OSError, http.client.HTTPException, ApiError) as exc:
+                        notice = f"command failed: {exc}"
+                    break  # show the effect right away
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
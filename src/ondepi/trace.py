@@ -0,0 +1,139 @@
+"""Opt-in span recorder for the audio path and stream lifecycle.
+
+Spans go into a fixed-size ring of preallocated integer arrays, so recording
+one from the audio callback is a few stores with no allocation and no lock.
+Names are interned once at import time. `chrome_trace` renders the ring as
+Chrome trace-event JSON, loadable in Perfetto or chrome://tracing.
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+from array import array
+from typing import Any, Dict, List
+
+from .config import TraceConfig
+
+now_ns = time.perf_counter_ns
+
+_INSTANT = -1  # duration marker for point events
+
+
+class _Ring:
+    __slots__ = ("capacity", "start", "duration", "name", "thread")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.start = array("q", bytes(8 * capacity))
+        self.duration = array("q", bytes(8 * capacity))
+        self.name = array("l", bytes(array("l").itemsize * capacity))
+        self.thread = array("Q", bytes(8 * capacity))
+
+
+class Tracer:
+    """Ring of (start, duration, name, thread) spans in perf_counter nanoseconds.
+
+    Writers never block; an export racing a writer may see one torn span.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._intern_lock = threading.Lock()
+        self._ring = _Ring(0)
+        self._cursor = itertools.count()
+        self._written = 0
+
+    def configure(self, enabled: bool, capacity: int) -> None:
+        """Resize (and clear) the ring when the capacity changes."""
+        capacity = max(capacity, 0)
+        if capacity != self._ring.capacity:
+            self.enabled = False
+            self._ring = _Ring(capacity)
+            self._cursor = itertools.count()
+            self._written = 0
+        self.enabled = enabled and capacity > 0
+
+    def name_id(self, name: str) -> int:
+        ident = self._ids.get(name)
+        if ident is None:
+            with self._intern_lock:
+                ident = self._ids.setdefault(name, len(self._names))
+                if ident == len(self._names):
+                    self._names.append(name)
+        return ident
+
+    def span(self, name_id: int, start: int) -> int:
+        """Record `name_id` from `start` until now; returns now, to chain stages."""
+        end = now_ns()
+        self._store(name_id, start, end - start)
+        return end
+
+    def instant(self, name_id: int) -> None:
+        self._store(name_id, now_ns(), _INSTANT)
+
+    def mark(self, name: str) -> None:
+        """Instant event by name, for call sites outside the audio path."""
+        if self.enabled:
+            self.instant(self.name_id(name))
+
+    def _store(self, name_id: int, start: int, duration: int) -> None:
+        ring = self._ring  # one read: configure() may swap it concurrently
+        if not ring.capacity:
+            return
+        index = next(self._cursor)
+        slot = index % ring.capacity
+        ring.start[slot] = start
+        ring.duration[slot] = duration
+        ring.name[slot] = name_id
+        ring.thread[slot] = threading.get_ident()
+        self._written = index + 1
+
+    def chrome_trace(self, seconds: float) -> Dict[str, Any]:
+        """Spans that ended within the last `seconds`, as a Chrome trace document."""
+        ring = self._ring
+        cutoff = now_ns() - int(seconds * 1e9)
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        threads = set()
+        for slot in range(min(self._written, ring.capacity)):
+            start, duration = ring.start[slot], ring.duration[slot]
+            if start + max(duration, 0) < cutoff:
+                continue
+            name = self._names[ring.name[slot]]
+            thread = ring.thread[slot]
+            threads.add(thread)
+            event: Dict[str, Any] = {
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ts": start / 1000,
+                "pid": pid,
+                "tid": thread,
+            }
+            if duration == _INSTANT:
+                event.update(ph="i", s="t")
+            else:
+                event.update(ph="X", dur=duration / 1000)
+            events.append(event)
+        events.sort(key=lambda item: item["ts"])
+        names = {item.ident: item.name for item in threading.enumerate()}
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread, "args": {"name": names[thread]}}
+            for thread in sorted(threads)
+            if thread in names
+        ]
+        return {
+            "traceEvents": metadata + events,
+            "displayTimeUnit": "ms",
+            "otherData": {"capacity": ring.capacity, "recorded": self._written},
+        }
+
+
+TRACER = Tracer()
+
+
+def configure_tracing(trace: TraceConfig) -> None:
+    TRACER.configure(trace.enabled, trace.capacity)
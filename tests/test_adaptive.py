@@ -0,0 +1,57 @@
+from ondepi.adaptive import BitrateLadder
+from ondepi.config import AdaptiveBitrateConfig
+
+
+def _ladder(**overrides):
+    config = AdaptiveBitrateConfig(
+        enabled=True,
+        ladder_kbps=[320, 192, 128, 64],
+        max_backlog_blocks=40,
+        down_after_seconds=5.0,
+        up_after_seconds=30.0,
+        **overrides,
+    )
+    return BitrateLadder(config, ceiling_kbps=256)
+
+
+def test_rungs_start_at_the_stream_bitrate():
+    ladder = _ladder()
+    assert ladder.rungs == [256, 192, 128, 64]
+    assert ladder.bitrate_kbps == 256
+
+
+def test_sustained_congestion_steps_down_one_rung_at_a_time():
+    ladder = _ladder()
+    assert ladder.observe(0.0, 0.9, 0) is None
+    assert ladder.observe(4.0, 0.9, 0) is None
+    step = ladder.observe(5.0, 0.9, 3)
+    assert (step.from_kbps, step.to_kbps, step.reason) == (256, 192, "congested")
+    assert step.speed == 0.9 and step.sustained_seconds == 5.0
+    # The evidence window restarts after each step.
+    assert ladder.observe(6.0, 1.0, 50) is None
+    assert ladder.observe(11.0, 1.0, 50).to_kbps == 128
+    for now in range(12, 40):
+        ladder.observe(float(now), 0.5, 50)
+    assert ladder.bitrate_kbps == 64
+
+
+def test_short_dips_and_borderline_readings_do_not_step():
+    ladder = _ladder()
+    ladder.observe(0.0, 0.9, 0)
+    assert ladder.observe(4.0, 1.0, 0) is None  # recovered before down_after_seconds
+    assert ladder.observe(8.0, 0.9, 0) is None
+    assert ladder.bitrate_kbps == 256
+
+
+def test_stepping_up_needs_a_longer_clearly_healthy_window():
+    ladder = _ladder()
+    ladder.observe(0.0, 0.5, 0)
+    assert ladder.observe(5.0, 0.5, 0).to_kbps == 192
+    ladder.observe(6.0, 1.0, 0)
+    assert ladder.observe(20.0, 1.0, 0) is None
+    ladder.observe(25.0, 0.98, 0)  # above min_speed but not clearly healthy: restarts the window
+    assert ladder.observe(50.0, 1.0, 20) is None  # backlog still draining
+    assert ladder.observe(51.0, 1.0, 2) is None
+    step = ladder.observe(81.0, 1.0, 2)
+    assert (step.from_kbps, step.to_kbps, step.reason) == (192, 256, "recovered")
+    assert ladder.observe(200.0, 1.0, 0) is None  # never above the stream bitrate
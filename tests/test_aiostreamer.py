@@ -0,0 +1,149 @@
+import asyncio
+import sys
+import threading
+
+import numpy as np
+
+from ondepi.aiostreamer import AsyncStreamer, PcmRing
+from ondepi.config import AppConfig, JournalConfig
+from ondepi.journal import EventJournal
+from ondepi.state import StreamState
+from ondepi.streamer import create_streamer
+
+
+def _encoder(script):
+    return [sys.executable, "-c", script]
+
+
+def _streamer(general, script):
+    config = AppConfig.from_dict(
+        {
+            "general": {"preflight_probe": False, "stall_timeout_seconds": 0, **general},
+            "stream": {"server": "icecast", "mount": "live"},
+        }
+    )
+    state = StreamState()
+    journal = EventJournal(JournalConfig())
+    streamer = AsyncStreamer(config, state, journal=journal)
+    streamer.build_ffmpeg_command = lambda meter_fd=None: _encoder(script)
+    return streamer, state, journal
+
+
+def test_backend_selected_from_config():
+    config = AppConfig.from_dict({"general": {"streamer_backend": "asyncio"}})
+    assert isinstance(create_streamer(config, StreamState()), AsyncStreamer)
+
+
+def test_auth_failure_is_not_retried():
+    streamer, state, journal = _streamer(
+        {}, "import sys; sys.stderr.write('HTTP error 401 Unauthorized\\n'); sys.exit(1)"
+    )
+
+    async def run():
+        await streamer.start_async()
+        await asyncio.wait_for(streamer._supervisor, timeout=5)
+
+    asyncio.run(run())
+    assert state.last_exit_class == "auth"
+    assert [event.kind for event in journal.query()] == ["stream.start", "stream.exit", "stream.giveup"]
+
+
+def test_stop_cancels_pending_retry():
+    streamer, state, journal = _streamer(
+        {"retry_initial_delay_seconds": 30},
+        "import sys; sys.stderr.write('Connection refused\\n'); sys.exit(1)",
+    )
+
+    async def run():
+        await streamer.start_async()
+        while not streamer.status()["retrying"]:
+            await asyncio.sleep(0.01)
+        await asyncio.wait_for(streamer.stop_async(), timeout=1)
+
+    asyncio.run(run())
+    assert not streamer.status()["retrying"]
+    assert state.retry_count == 1
+    assert [event.kind for event in journal.query()][-1] == "stream.retry"
+
+
+def test_many_streams_share_one_loop():
+    streams = [_streamer({}, "import time; time.sleep(30)") for _ in range(8)]
+
+    async def run():
+        for streamer, _, _ in streams:
+            await streamer.start_async()
+        assert all(streamer.status()["running"] for streamer, _, _ in streams)
+        await asyncio.gather(*(streamer.stop_async() for streamer, _, _ in streams))
+
+    asyncio.run(run())
+    for streamer, state, journal in streams:
+        assert not state.streaming
+        assert [event.kind for event in journal.query()] == ["stream.start", "stream.stop"]
+
+
+def test_sync_calls_run_on_control_loop():
+    streamer, state, _ = _streamer({}, "import time; time.sleep(30)")
+    streamer.start()
+    assert state.streaming
+    streamer.stop()
+    assert not state.streaming
+    assert not streamer.status()["running"]
+
+
+def test_pcm_ring_wraps_and_drops_when_full():
+    ring = PcmRing(capacity=10 * 8)  # ten stereo float32 frames
+    block = np.arange(8, dtype=np.float32).reshape(4, 2)
+    assert ring.put_nowait(block) and ring.put_nowait(block)
+    assert not ring.put_nowait(block)  # 12 frames would not fit
+    assert ring.qsize() == 2
+    assert ring.take() == block.tobytes() * 2
+    assert ring.empty() and ring.qsize() == 0
+    assert ring.put_nowait(block.astype(np.float64)) and ring.put_nowait(block)  # second one wraps
+    assert ring.take() == block.tobytes() * 2
+
+
+class _FakeEngine:
+    def __init__(self):
+        self.consumers = []
+
+    def add_consumer(self, consumer):
+        self.consumers.append(consumer)
+
+    def remove_consumer(self, consumer):
+        self.consumers.remove(consumer)
+
+
+def test_audio_thread_feeds_encoder_without_touching_the_loop(tmp_path, monkeypatch):
+    output = tmp_path / "pcm.raw"
+    script = (
+        "import sys\n"
+        f"with open({str(output)!r}, 'wb', 0) as out:\n"
+        "    while data := sys.stdin.buffer.read1():\n"
+        "        out.write(data)\n"
+    )
+    streamer, _, _ = _streamer({}, script)
+    engine = _FakeEngine()
+    streamer._audio_engine = engine
+    block = np.linspace(-1, 1, 2048, dtype=np.float32).reshape(1024, 2)
+    woken_from = []
+
+    async def run():
+        await streamer.start_async()
+        loop = asyncio.get_running_loop()
+        wake = loop.call_soon_threadsafe
+
+        def tracked(*args, **kwargs):
+            woken_from.append(threading.current_thread().name)
+            return wake(*args, **kwargs)
+
+        monkeypatch.setattr(loop, "call_soon_threadsafe", tracked)
+        feeder = threading.Thread(target=lambda: [engine.consumers[0](block) for _ in range(20)], name="audio")
+        feeder.start()
+        feeder.join()
+        while not output.exists() or output.stat().st_size < 20 * block.nbytes:
+            await asyncio.sleep(0.01)
+        await streamer.stop_async()
+
+    asyncio.run(run())
+    assert output.read_bytes() == block.tobytes() * 20
+    assert "audio" not in woken_from
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from ondepi.analysis import SpectrumAnalyzer, band_layout
+from ondepi.config import AnalysisConfig, InputConfig
+
+
+def test_band_layout_is_strictly_increasing():
+    edges, band_hz = band_layout(2048, 22050, 48)
+    assert np.all(np.diff(edges) > 0)
+    assert edges[-1] == 2048 // 2 + 1
+    assert len(band_hz) == len(edges)
+
+
+def test_spectrum_peaks_at_tone_band():
+    config = AnalysisConfig(fft_size=1024, decimation=1, bands=24)
+    analyzer = SpectrumAnalyzer(config, InputConfig(sample_rate=8000, channels=2))
+    t = np.arange(4096) / 8000
+    tone = (0.5 * np.sin(2 * np.pi * 1000 * t)).astype(np.float32)
+    for start in range(0, len(tone), 256):
+        block = tone[start : start + 256]
+        analyzer.consume(np.stack([block, block], axis=1))
+    analyzer._compute()
+
+    bands = np.frombuffer(analyzer.spectrum(), dtype=np.uint8)
+    edges_hz = analyzer.layout()["band_edges_hz"]
+    loudest = int(np.argmax(bands))
+    assert edges_hz[loudest] <= 1000 <= edges_hz[loudest + 1]
+    assert len(analyzer.waveform()) == config.waveform_points * 2
+
+
+def _loudest_band(analyzer, hz, rate):
+    t = np.arange(rate // 2) / rate
+    tone = (0.5 * np.sin(2 * np.pi * hz * t)).astype(np.float32)
+    for start in range(0, len(tone), 441):  # blocks not a multiple of the decimation
+        block = tone[start : start + 441]
+        analyzer.consume(np.stack([block, block], axis=1))
+    analyzer._compute()
+    return int(np.frombuffer(analyzer.spectrum(), dtype=np.uint8).max())
+
+
+@pytest.mark.parametrize("decimation", [2, 4])
+def test_decimation_filters_tones_just_above_the_new_nyquist(decimation):
+    rate = 44100
+    config = AnalysisConfig(decimation=decimation)
+    in_band = _loudest_band(SpectrumAnalyzer(config, InputConfig(sample_rate=rate)), 1000, rate)
+    # 5% above the decimated Nyquist; unfiltered it folds back just below it at full level.
+    folded = _loudest_band(SpectrumAnalyzer(config, InputConfig(sample_rate=rate)), rate / decimation / 2 * 1.05, rate)
+    assert in_band > 180
+    assert folded < in_band - 150  # > ~50 dB down with the default min_db
+
+
+def test_update_config_rebuilds_the_band_layout():
+    analyzer = SpectrumAnalyzer(AnalysisConfig(bands=24), InputConfig(sample_rate=44100))
+    updated = AnalysisConfig(fft_size=1024, decimation=4, bands=12, waveform_points=64)
+    analyzer.update_config(updated, InputConfig(sample_rate=44100))
+    layout = analyzer.layout()
+    assert layout["bands"] <= 12
+    assert layout["band_edges_hz"][-1] == pytest.approx(44100 / 4 / 2, rel=0.01)
+    assert layout["waveform_points"] == 64
+    analyzer.consume(np.zeros((441, 2), dtype=np.float32))
+    analyzer._compute()
+    assert len(analyzer.spectrum()) == layout["bands"]
+    assert len(analyzer.waveform()) == 128
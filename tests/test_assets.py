@@ -0,0 +1,72 @@
+import gzip
+import re
+
+import pytest
+
+from ondepi.assets import IMMUTABLE, REVALIDATE, StaticAssets
+
+
+@pytest.fixture
+def assets(tmp_path):
+    (tmp_path / "index.html").write_text(
+        '<link rel="stylesheet" href="/style.css" />\n<script src="/app.js"></script>\n' + "<p>OndePi</p>\n" * 50
+    )
+    (tmp_path / "app.js").write_text("console.log('ondepi');\n" * 100)
+    (tmp_path / "style.css").write_text("body { color: #eee; }\n" * 100)
+    return StaticAssets(tmp_path)
+
+
+def _hashed(index_body, name):
+    stem, suffix = name.split(".")
+    (match,) = re.findall(rf"/({stem}\.[0-9a-f]{{12}}\.{suffix})", index_body)
+    return match
+
+
+def test_index_references_hashed_immutable_assets(assets):
+    index = assets.response("/", {})
+    assert index.headers["cache-control"] == REVALIDATE
+    body = index.body.decode()
+    script = assets.response(_hashed(body, "app.js"), {})
+    assert script.headers["cache-control"] == IMMUTABLE
+    assert script.media_type in ("text/javascript", "application/javascript")
+    assert script.body == b"console.log('ondepi');\n" * 100
+    assert assets.response(_hashed(body, "style.css"), {}).headers["cache-control"] == IMMUTABLE
+    assert assets.response("app.js", {}).headers["cache-control"] == REVALIDATE
+    assert assets.response("missing.js", {}) is None
+
+
+def test_gzip_negotiation_and_etags(assets):
+    plain = assets.response("index.html", {})
+    packed = assets.response("index.html", {"accept-encoding": "gzip, deflate"})
+    assert packed.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(packed.body) == plain.body
+    assert int(packed.headers["content-length"]) == len(packed.body) < len(plain.body)
+    assert packed.headers["etag"] != plain.headers["etag"]
+    assert packed.headers["vary"] == "Accept-Encoding"
+    refused = assets.response("index.html", {"accept-encoding": "gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+
+
+def test_matching_etag_is_not_modified(assets):
+    first = assets.response("style.css", {"accept-encoding": "gzip"})
+    again = assets.response("style.css", {"accept-encoding": "gzip", "if-none-match": first.headers["etag"]})
+    assert again.status_code == 304 and not again.body
+    head = assets.response("style.css", {"accept-encoding": "gzip"}, head=True)
+    assert head.body == b"" and head.headers["content-length"] == first.headers["content-length"]
+
+
+def test_bundled_web_ui_is_rewritten():
+    assets = StaticAssets("web")
+    body = assets.response("/", {}).body.decode()
+    assert 'src="/app.js"' not in body and 'href="/style.css"' not in body
+    assert _hashed(body, "app.js") in assets.names
+
+
+def test_brotli_is_preferred_when_available(assets):
+    brotli = pytest.importorskip("brotli")
+    plain = assets.response("app.js", {})
+    packed = assets.response(_hashed(assets.response("/", {}).body.decode(), "app.js"), {"accept-encoding": "gzip, br"})
+    assert packed.headers["content-encoding"] == "br"
+    assert brotli.decompress(packed.body) == plain.body
+    assert packed.headers["etag"].endswith('-br"')
+    assert assets.response("app.js", {"accept-encoding": "gzip"}).headers["content-encoding"] == "gzip"
@@ -1,6 +1,8 @@
 import numpy as np
 
-from ondepi.audio import AudioMeter, GainController, SoftClipper
+from ondepi.audio import AudioEngine, AudioMeter, ChannelRouter, GainController, SoftClipper, mix_matrix
+from ondepi.config import InputConfig
+from ondepi.state import StreamState
 
 
 def test_audio_meter_levels():
@@ -25,3 +27,76 @@ def test_soft_clipper():
     out = clipper.apply(data)
     assert out.max() <= 1.0
     assert out.min() >= -1.0
+
+
+class _FakeDevice:
+    """sounddevice stand-in for a USB interface that only opens at 48/96 kHz."""
+
+    def query_devices(self, device, kind):
+        return {"default_samplerate": 48000.0}
+
+    def check_input_settings(self, device, channels, dtype, samplerate):
+        if samplerate not in (48000, 96000):
+            raise ValueError("Invalid sample rate")
+
+
+def test_engine_negotiates_native_rate():
+    engine = AudioEngine(InputConfig(sample_rate=44100), StreamState())
+    assert engine._negotiate_rate(_FakeDevice()) == 48000
+    assert engine._native_rates == [48000, 96000]
+
+
+def test_router_picks_and_sums_inputs():
+    config = InputConfig(
+        channels=2,
+        capture_channels=8,
+        # left = mic on input 1 + line input 5, right = mic + line input 6
+        mix_matrix=[[0.5, 0, 0, 0, 0.5, 0, 0, 0], [0.5, 0, 0, 0, 0, 0.5, 0, 0]],
+    )
+    router = ChannelRouter(mix_matrix(config), max_frames=4)
+    block = np.zeros((8, 8), dtype=np.float32)
+    block[:, 0] = 0.2
+    block[:, 4] = 0.4
+    block[:, 5] = -0.4
+    out = router.route(block)
+    assert out.shape == (8, 2)
+    np.testing.assert_allclose(out[0], [0.3, -0.1], atol=1e-6)
+
+
+def test_default_matrix():
+    assert mix_matrix(InputConfig(channels=2)) is None
+    np.testing.assert_array_equal(mix_matrix(InputConfig(channels=2, capture_channels=1)), [[1], [1]])
+    np.testing.assert_array_equal(
+        mix_matrix(InputConfig(channels=1, capture_channels=4)), [[1, 0, 0, 0]]
+    )
+
+
+def test_levels_are_published_off_the_audio_path():
+    state = StreamState()
+    engine = AudioEngine(InputConfig(channels=2), state)
+    seen = []
+    engine.add_consumer(lambda block: seen.append(block.shape))
+    block = np.full((256, 2), 0.5, dtype=np.float32)
+    for _ in range(4):
+        engine._process_block(block, None)
+    assert len(seen) == 4
+    assert state.version == 0  # the audio path never publishes a snapshot
+
+    engine._publish_levels()
+    assert state.version == 1 and state.levels.peak > 0.4
+    engine._publish_levels()
+    assert state.version == 1  # nothing new since
+
+
+def test_callback_status_is_logged_off_the_audio_thread(caplog):
+    engine = AudioEngine(InputConfig(channels=2), StreamState())
+    block = np.zeros((256, 2), dtype=np.float32)
+    with caplog.at_level("WARNING", logger="ondepi.audio"):
+        engine._deliver(block, None, "input overflow", False)
+        engine._deliver(block, None, "input overflow", False)
+        assert not caplog.records
+        engine._report_callback_status()
+        engine._report_callback_status()
+    (record,) = caplog.records
+    assert record.getMessage() == "PortAudio callback status: input overflow (2 callbacks)"
+    assert engine.device_status()["callback_status_count"] == 2
@@ -128,3 +128,72 @@ def test_ensure_config(tmp_path):
     created = ensure_config(target, example)
     assert created is True
     assert target.exists()
+
+
+def test_station_overrides_and_validation(tmp_path):
+    from ondepi.config import save_config, validation_errors
+
+    path = tmp_path / "config.toml"
+    path.write_text(
+        """
+[stream]
+server = "example.com"
+mount = ""
+
+[[stations]]
+id = "a"
+cpu_affinity = [1]
+[stations.stream]
+mount = "studio-a"
+
+[[stations]]
+id = "b"
+[stations.input]
+channels = 3
+"""
+    )
+    config = load_config(path, validate=False)
+    resolved = config.for_station("a")
+    assert resolved.stream.mount == "studio-a"
+    assert resolved.stream.server == "example.com"
+    assert resolved.stations == []
+
+    errors = validation_errors(config)
+    assert "stations[b].input.channels must be 1 or 2" in errors
+    assert "stations[b].stream.mount is required" in errors
+    assert not any(error.startswith("stream.") for error in errors)
+
+    save_config(config, path)
+    assert load_config(path, validate=False).stations[0].stream == {"mount": "studio-a"}
+
+
+def test_mix_matrix_validation():
+    from ondepi.config import AppConfig, validation_issues
+
+    def routing_fields(input_section):
+        config = AppConfig.from_dict({"input": input_section})
+        return {issue["field"] for issue in validation_issues(config) if issue["field"].startswith("input.")}
+
+    assert routing_fields({"channels": 1, "capture_channels": 8, "mix_matrix": [[0, 0, 0, 0, 1, 1, 0, 0]]}) == set()
+    assert routing_fields({"channels": 2, "capture_channels": 8, "mix_matrix": [[1, 0]]}) == {"input.mix_matrix"}
+    assert routing_fields({"capture_channels": 99}) == {"input.capture_channels"}
+
+
+def test_adaptive_bitrate_validation():
+    from ondepi.config import AppConfig, validation_issues
+
+    def adaptive_fields(data):
+        config = AppConfig.from_dict(data)
+        return {issue["field"] for issue in validation_issues(config) if issue["field"].startswith("adaptive")}
+
+    assert adaptive_fields({"adaptive_bitrate": {"enabled": True}}) == set()
+    assert adaptive_fields({"stream": {"bitrate_kbps": 64}, "adaptive_bitrate": {"enabled": True}}) == {
+        "adaptive_bitrate.ladder_kbps"
+    }
+    assert adaptive_fields({"adaptive_bitrate": {"min_speed": 1.5, "up_after_seconds": 1}}) == {
+        "adaptive_bitrate.min_speed",
+        "adaptive_bitrate.up_after_seconds",
+    }
+    assert adaptive_fields({"stream": {"encoder": "native"}, "adaptive_bitrate": {"enabled": True}}) == {
+        "adaptive_bitrate.enabled"
+    }
@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+
+from ondepi.audio import AudioEngine
+from ondepi.config import FallbackConfig, InputConfig
+from ondepi.fallback import Crossfade, FallbackSource, SilenceDetector
+from ondepi.state import StreamState
+
+
+def test_crossfade_ramps_per_frame():
+    filler = FallbackSource(FallbackConfig(source="silence"), 1000, 1)
+    fade = Crossfade(100)
+    live = np.ones((60, 1), dtype=np.float32)
+    first = fade.mix(live, filler, 60, 1.0)
+    second = fade.mix(live, filler, 60, 1.0)
+    assert first[0, 0] > first[-1, 0] > second[-1, 0]
+    assert second[-1, 0] == 0.0
+    assert fade.share == 1.0
+
+
+def test_silence_detector():
+    detector = SilenceDetector(-60.0, 1.0)
+    assert not detector.update(0.0, 0.6)
+    assert detector.update(0.0, 0.6)
+    assert not detector.update(0.5, 0.1)
+
+
+def test_fallback_fills_gap_and_hands_back():
+    rate = 8000
+    config = FallbackConfig(enabled=True, gap_ms=50, block_frames=160, crossfade_ms=10)
+    engine = AudioEngine(InputConfig(sample_rate=rate, channels=1), StreamState(), fallback=config)
+    received = []
+    engine.add_consumer(lambda chunk: received.append(chunk.copy()))
+    started = time.monotonic()
+    engine._timeline = started  # the device delivered its last block now
+    engine._start_fallback()
+    time.sleep(0.5)
+    elapsed = time.monotonic() - started
+    filled = sum(len(chunk) for chunk in received)
+    assert abs(filled - elapsed * rate) < 2 * config.block_frames
+    assert engine.device_status()["fallback"]["reason"] == "device"
+
+    # The device comes back: live blocks take over and the filler fades out.
+    live = np.zeros((160, 1), dtype=np.float32)
+    for _ in range(5):
+        engine._callback(live, 160, None, None)
+    status = engine.device_status()["fallback"]
+    assert status["reason"] is None
+    assert not status["active"]
+    assert status["switches"] == 1
+    engine._stopping.set()
+    engine._fallback_thread.join(timeout=2)
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ondepi.fleet import FleetClient, Node, format_table, load_inventory, run_fleet
+
+
+class _NodeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # noqa: N802
+        server = self.server
+        time.sleep(server.delay)
+        state = {"streaming": server.streaming, "gain_db": 1.5, "retry_count": 0, "last_error": None}
+        self._reply(200, {"state": state, "stream": {"running": server.streaming, "encoder": "ffmpeg"}})
+
+    def do_POST(self):  # noqa: N802
+        server = self.server
+        server.streaming = self.path.endswith("/start")
+        self._reply(200, {"ok": True})
+
+    def _reply(self, code, payload):
+        self.server.requests.append((self.command, self.path, self.client_address[1]))
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(delay=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _NodeHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.streaming = False
+    server.requests = []
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def make(delay=0.0):
+        server = _serve(delay)
+        started.append(server)
+        return server
+
+    yield make
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+
+def _node(name, server, timeout=2.0):
+    return Node(name, f"http://127.0.0.1:{server.server_address[1]}", timeout)
+
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_nodes_are_queried_concurrently(servers):
+    nodes = [_node(f"venue-{index}", servers(delay=0.3)) for index in range(4)]
+    started = time.monotonic()
+    results = asyncio.run(FleetClient(nodes).run("status"))
+    assert time.monotonic() - started < 0.9
+    assert [result.node.name for result in results] == [node.name for node in nodes]
+    assert all(result.ok and result.status["state"]["gain_db"] == 1.5 for result in results)
+
+
+def test_start_reuses_one_connection_per_node(servers):
+    server = servers()
+    node = _node("venue-a", server)
+
+    async def _run():
+        client = FleetClient([node])
+        try:
+            result = (await client.run("start"))[0]
+            return result, client.connection(node).connections
+        finally:
+            client.close()
+
+    result, connections = asyncio.run(_run())
+    assert result.ok and result.status["state"]["streaming"]
+    assert connections == 1
+    assert [(method, path) for method, path, _ in server.requests] == [
+        ("POST", "/api/stream/start"),
+        ("GET", "/api/status"),
+    ]
+    assert len({port for _, _, port in server.requests}) == 1
+
+
+def test_failures_are_reported_per_node(servers):
+    healthy = _node("healthy", servers())
+    slow = _node("slow", servers(delay=1.0), timeout=0.2)
+    down = Node("down", f"http://127.0.0.1:{_closed_port()}", 1.0)
+    secure = Node("secure", "https://venue.example:8090", 1.0)
+    results = asyncio.run(FleetClient([healthy, slow, down, secure]).run("status"))
+    assert [result.ok for result in results] == [True, False, False, False]
+    assert results[1].error == "timed out after 0.2s"
+    assert results[1].seconds < 0.5
+    assert results[3].error == "secure: only http:// nodes are supported"
+    table = format_table(results)
+    assert table.splitlines()[0].split() == ["NODE", "STATE", "GAIN", "RETRIES", "ENCODER", "TIME", "ERROR"]
+    assert "stopped" in table and table.count("unreachable") == 3
+
+
+def test_inventory_and_json_output(servers, tmp_path, capsys):
+    server = servers()
+    inventory = tmp_path / "nodes.toml"
+    inventory.write_text(
+        f'timeout = 3.0\n\n[[nodes]]\nname = "venue-a"\nurl = "http://127.0.0.1:{server.server_address[1]}"\n'
+    )
+    (node,) = load_inventory(inventory)
+    assert node.timeout == 3.0
+    assert run_fleet(inventory, "stop", as_json=True) == 0
+    (entry,) = json.loads(capsys.readouterr().out)
+    assert entry["name"] == "venue-a" and entry["ok"] and entry["status"]["state"]["streaming"] is False
+    inventory.write_text('[[nodes]]\nname = "x"\n')
+    with pytest.raises(ValueError):
+        load_inventory(inventory)
@@ -0,0 +1,100 @@
+import threading
+
+import numpy as np
+
+from ondepi.config import HistoryConfig
+from ondepi.history import LevelHistory
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _feed(history, clock, seconds, level):
+    block = np.full((100, 2), level, dtype=np.float32)
+    for _ in range(seconds):
+        history.consume(block)
+        clock.now += 1
+
+
+def test_history_rollups_and_gaps():
+    clock = FakeClock(1_000_000)
+    history = LevelHistory(HistoryConfig(), channels=2, clock=clock)
+    _feed(history, clock, 30, 0.5)
+    _feed(history, clock, 31, 0.25)
+
+    result = history.query(1_000_000, 1_000_059, resolution=1)
+    assert result["resolution"] == 1
+    assert len(result["t"]) == 60
+    assert result["peak"][0] == [0.5, 0.5]
+    assert result["peak"][45] == [0.25, 0.25]
+
+    coarse = history.query(1_000_000, 1_000_050, resolution=10)
+    assert coarse["resolution"] == 10
+    assert coarse["max"][2] == [0.5, 0.5]
+    assert coarse["max"][3] == [0.25, 0.25]
+
+    gap = history.query(999_000, 999_010, resolution=1)
+    assert all(row is None for row in gap["rms"])
+
+
+def test_history_persists_to_memmap(tmp_path):
+    clock = FakeClock(2_000_000)
+    config = HistoryConfig(path=str(tmp_path))
+    history = LevelHistory(config, channels=2, clock=clock)
+    _feed(history, clock, 5, 0.5)
+    history.stop()
+
+    reopened = LevelHistory(config, channels=2, clock=clock)
+    result = reopened.query(2_000_000, 2_000_003, resolution=1)
+    assert result["peak"][0] == [0.5, 0.5]
+
+
+def test_query_reaches_end_off_the_grid():
+    clock = FakeClock(1_000_000)
+    history = LevelHistory(HistoryConfig(), channels=2, clock=clock)
+    _feed(history, clock, 200, 0.5)
+
+    result = history.query(1_000_000, 1_000_150, resolution=15)
+    assert result["resolution"] == 10
+    assert result["t"][0] == 1_000_000 and result["t"][-1] == 1_000_150
+
+    week = history.query(1_000_003, 1_000_003 + 7 * 86400)
+    assert week["resolution"] == 600
+    assert week["t"][0] <= 1_000_003 and week["t"][-1] > 1_000_003 + 7 * 86400 - 600
+
+
+def test_channel_change_rebuilds_rings():
+    clock = FakeClock(1_000_000)
+    config = HistoryConfig()
+    history = LevelHistory(config, channels=2, clock=clock)
+    _feed(history, clock, 3, 0.5)
+    history.update_config(config, channels=1)
+    for _ in range(3):
+        history.consume(np.full((100, 1), 0.25, dtype=np.float32))
+        clock.now += 1
+
+    result = history.query(1_000_000, 1_000_005, resolution=1)
+    assert result["channels"] == 1
+    assert result["peak"][:3] == [None, None, None]
+    assert result["peak"][3] == [0.25]
+
+
+def test_consume_never_waits_on_the_ring_lock(tmp_path):
+    clock = FakeClock(1_000_000)
+    history = LevelHistory(HistoryConfig(path=str(tmp_path)), channels=2, clock=clock)
+    history.start()
+    try:
+        with history._lock:  # stands in for a query or an msync holding the rings
+            done = threading.Event()
+            worker = threading.Thread(target=lambda: (_feed(history, clock, 3, 0.5), done.set()))
+            worker.start()
+            assert done.wait(1.0)
+        result = history.query(1_000_000, 1_000_001, resolution=1)
+        assert result["peak"] == [[0.5, 0.5]] * 2  # the third second is still open
+    finally:
+        history.stop()
@@ -0,0 +1,194 @@
+import base64
+import socketserver
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from ondepi.config import AppConfig, JournalConfig
+from ondepi.encoder import Encoder
+from ondepi.icecast import IcecastError, IcecastSource
+from ondepi.journal import EventJournal
+from ondepi.nativestreamer import NativeStreamer
+from ondepi.state import StreamState
+
+
+class _IcecastHandler(socketserver.BaseRequestHandler):
+    """Stand-in Icecast: checks the source credentials and collects the body."""
+
+    def handle(self):
+        server = self.server
+        head = b""
+        while b"\r\n\r\n" not in head:
+            chunk = self.request.recv(1024)
+            if not chunk:
+                return
+            head += chunk
+        head, _, body = head.partition(b"\r\n\r\n")
+        lines = head.decode("utf-8").split("\r\n")
+        method = lines[0].split(" ")[0]
+        headers = dict(line.split(": ", 1) for line in lines[1:])
+        server.requests.append((lines[0], headers))
+        if method not in server.methods:
+            self.request.sendall(b"HTTP/1.1 405 Method Not Allowed\r\n\r\n")
+            return
+        expected = "Basic " + base64.b64encode(b"source:hackme").decode("ascii")
+        if headers.get("Authorization") != expected:
+            self.request.sendall(b"HTTP/1.1 401 Authentication Required\r\n\r\n")
+            return
+        self.request.sendall(b"HTTP/1.1 100 Continue\r\n\r\n" if method == "PUT" else b"HTTP/1.0 200 OK\r\n\r\n")
+        received = bytearray(body)
+        server.bodies.append(received)
+        while len(received) < server.drop_after:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return
+            received += chunk
+        server.drop_after = float("inf")  # drop only the first connection
+
+
+class _IcecastServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, methods=("PUT", "SOURCE"), drop_after=float("inf")):
+        super().__init__(("127.0.0.1", 0), _IcecastHandler)
+        self.methods = methods
+        self.drop_after = drop_after
+        self.requests = []
+        self.bodies = []
+
+
+@pytest.fixture
+def icecast(request):
+    server = _IcecastServer(**getattr(request, "param", {}))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _config(server, password="hackme", **general):
+    return AppConfig.from_dict(
+        {
+            "general": {"retry_initial_delay_seconds": 0, **general},
+            "stream": {
+                "server": "127.0.0.1",
+                "port": server.server_address[1],
+                "mount": "/live",
+                "password": password,
+                "encoder": "native",
+            },
+            "metadata": {"name": "OndePi Test"},
+        }
+    )
+
+
+def _source(config):
+    return IcecastSource(config.stream, config.metadata, config.input, "audio/mpeg", timeout=2)
+
+
+def test_put_handshake(icecast):
+    source = _source(_config(icecast))
+    source.connect()
+    source.send(b"frame")
+    source.close()
+    request_line, headers = icecast.requests[0]
+    assert request_line == "PUT /live HTTP/1.1"
+    assert headers["Content-Type"] == "audio/mpeg"
+    assert headers["Ice-Name"] == "OndePi Test"
+    assert headers["Expect"] == "100-continue"
+
+
+@pytest.mark.parametrize("icecast", [{"methods": ("SOURCE",)}], indirect=True)
+def test_falls_back_to_source_method(icecast):
+    source = _source(_config(icecast))
+    source.connect()
+    assert source.method == "SOURCE"
+    assert [line for line, _ in icecast.requests] == ["PUT /live HTTP/1.1", "SOURCE /live HTTP/1.0"]
+    source.close()
+
+
+def test_rejected_credentials_are_auth_errors(icecast):
+    source = _source(_config(icecast, password="wrong"))
+    with pytest.raises(IcecastError) as excinfo:
+        source.connect()
+    assert excinfo.value.exit_class == "auth"
+    assert excinfo.value.status == 401
+
+
+class _CountingEncoder(Encoder):
+    content_type = "audio/mpeg"
+
+    def __init__(self):
+        self.blocks = 0
+
+    def encode(self, block):
+        self.blocks += 1
+        return block.astype("<i2").tobytes()
+
+
+class _FakeEngine:
+    def __init__(self):
+        self.consumers = []
+
+    def add_consumer(self, consumer):
+        self.consumers.append(consumer)
+
+    def remove_consumer(self, consumer):
+        self.consumers.remove(consumer)
+
+
+@pytest.mark.parametrize("icecast", [{"drop_after": 64 * 1024}], indirect=True)
+def test_native_streamer_reconnects_without_restarting_encoder(icecast):
+    state = StreamState()
+    journal = EventJournal(JournalConfig())
+    engine = _FakeEngine()
+    encoder = _CountingEncoder()
+    streamer = NativeStreamer(_config(icecast), state, audio_engine=engine, journal=journal, encoder=encoder)
+    streamer.start()
+    block = np.ones((1024, 2), dtype=np.float32)
+    deadline = time.monotonic() + 10
+    while (len(icecast.bodies) < 2 or len(icecast.bodies[1]) < 16 * 1024) and time.monotonic() < deadline:
+        for consumer in list(engine.consumers):
+            consumer(block)
+        time.sleep(0.005)
+    status = streamer.status()
+    streamer.stop()
+
+    assert len(icecast.bodies) == 2
+    assert len(icecast.bodies[1]) >= 16 * 1024
+    assert status["connected"] and status["encoder"] == "native"
+    assert state.retry_count == 1
+    assert encoder.blocks * block.size * 2 >= sum(len(body) for body in icecast.bodies)
+    kinds = [event.kind for event in journal.query()]
+    assert kinds[0] == "stream.start" and "stream.exit" in kinds and kinds[-1] == "stream.stop"
+    assert not engine.consumers
+
+
+class _FailingEncoder(_CountingEncoder):
+    def encode(self, block):
+        raise ValueError("bad sample format")
+
+
+def test_native_streamer_reports_encoder_failure(icecast):
+    state = StreamState()
+    journal = EventJournal(JournalConfig())
+    engine = _FakeEngine()
+    streamer = NativeStreamer(_config(icecast), state, audio_engine=engine, journal=journal, encoder=_FailingEncoder())
+    streamer.start()
+    block = np.ones((1024, 2), dtype=np.float32)
+    deadline = time.monotonic() + 5
+    while streamer.status()["running"] and time.monotonic() < deadline:
+        for consumer in list(engine.consumers):
+            consumer(block)
+        time.sleep(0.01)
+
+    assert not streamer.status()["running"]
+    assert state.streaming is False
+    assert state.last_exit_class == "codec"
+    assert state.last_error.startswith("encoder failed: bad sample format")
+    kinds = [event.kind for event in journal.query()]
+    assert kinds == ["stream.start", "stream.exit", "stream.giveup"]
+    assert not engine.consumers
@@ -0,0 +1,40 @@
+from ondepi.config import JournalConfig
+from ondepi.journal import EventJournal
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+def test_journal_query_filters():
+    journal = EventJournal(JournalConfig(capacity=5), clock=FakeClock())
+    for index in range(7):
+        kind = "stream.exit" if index % 2 else "device.error"
+        journal.record(kind, f"event {index}")
+
+    events = journal.query()
+    assert [event.seq for event in events] == [3, 4, 5, 6, 7]
+    assert [event.seq for event in journal.query(since=5)] == [6, 7]
+    assert [event.seq for event in journal.query(kinds=["stream.exit"])] == [4, 6]
+    assert [event.seq for event in journal.query(start=104, end=106)] == [4, 5, 6]
+
+
+def test_journal_persists_segments(tmp_path):
+    config = JournalConfig(path=str(tmp_path), segment_max_kib=1, segments_kept=2)
+    journal = EventJournal(config)
+    journal.start()
+    for index in range(40):
+        journal.record("stream.retry", "retry " + "x" * 40, attempt=index)
+        journal._flush()
+    journal.stop()
+    assert len(list(tmp_path.glob("events-*.jsonl"))) == 2
+
+    reloaded = EventJournal(config)
+    assert reloaded.latest_seq() == 40
+    assert reloaded.query(limit=1)[0].data == {"attempt": 39}
+    assert reloaded.record("stream.start", "again").seq == 41
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from ondepi.audio import AudioEngine
+from ondepi.config import InputConfig
+from ondepi.latency import RECEIVER_RATE, WINDOW_FRAMES, find_marker, marker_tone
+from ondepi.state import StreamState
+
+
+def test_find_marker_in_noise():
+    rng = np.random.default_rng(1)
+    signal = rng.normal(0, 0.02, RECEIVER_RATE).astype(np.float32)
+    marker = marker_tone(RECEIVER_RATE, 1)[:, 0]
+    offset = 20 * WINDOW_FRAMES
+    signal[offset : offset + marker.shape[0]] += marker
+    assert find_marker(signal) == offset
+    assert find_marker(signal[:offset]) is None
+
+
+def test_injection_mixes_once_and_stamps_adc_time():
+    engine = AudioEngine(InputConfig(channels=2), StreamState())
+    marker = np.full((300, 2), 0.5, dtype=np.float32)
+    received = []
+    engine.add_consumer(received.append)
+    injection = engine.inject(marker)
+    timing = SimpleNamespace(currentTime=10.0, inputBufferAdcTime=9.99)
+    indata = np.zeros((256, 2), dtype=np.float32)
+    for _ in range(3):
+        engine._callback(indata, 256, timing, None)
+
+    assert injection.done.is_set()
+    assert abs(injection.capture_delay - 0.01) < 1e-9
+    assert not indata.any()
+    mixed = np.concatenate(received)
+    assert np.count_nonzero(mixed[:, 0]) == 300
@@ -0,0 +1,69 @@
+import json
+import logging
+import threading
+import time
+
+from ondepi.config import GeneralConfig
+from ondepi.log import configure_logging, log_event, shutdown_logging
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_json_lines_honour_level(tmp_path):
+    path = tmp_path / "ondepi.log"
+    configure_logging(GeneralConfig(log_level="warning", log_file=str(path)))
+    logger = logging.getLogger("ondepi.test")
+    logger.info("hidden")
+    log_event(logger, "stream.exit", "ffmpeg exited with code 1", exit_class="network")
+    shutdown_logging()
+
+    (record,) = _lines(path)
+    assert record["level"] == "warning"
+    assert record["event"] == "stream.exit"
+    assert record["data"] == {"exit_class": "network"}
+
+
+def test_formatting_happens_on_writer_thread(tmp_path):
+    path = tmp_path / "ondepi.log"
+    configure_logging(GeneralConfig(log_file=str(path)))
+    formatted_on = []
+
+    class Flags:
+        def __str__(self):
+            formatted_on.append(threading.current_thread())
+            return "input overflow"
+
+    logging.getLogger("ondepi.audio").warning("PortAudio callback status: %s", Flags())
+    shutdown_logging()
+
+    assert formatted_on and threading.current_thread() not in formatted_on
+    assert _lines(path)[0]["message"] == "PortAudio callback status: input overflow"
+
+
+def test_repeated_messages_are_rate_limited(tmp_path):
+    path = tmp_path / "ondepi.log"
+    configure_logging(GeneralConfig(log_file=str(path), log_rate_limit_seconds=0.2))
+    logger = logging.getLogger("ondepi.audio")
+    for _ in range(100):
+        logger.warning("PortAudio callback status: %s", "input overflow")
+    time.sleep(0.25)
+    logger.warning("PortAudio callback status: %s", "input overflow")
+    shutdown_logging()
+
+    records = _lines(path)
+    assert len(records) == 2
+    assert records[1]["suppressed"] == 99
+
+
+def test_rotates_by_size(tmp_path):
+    path = tmp_path / "ondepi.log"
+    configure_logging(GeneralConfig(log_file=str(path), log_max_kib=1, log_backups=2, log_rate_limit_seconds=0))
+    logger = logging.getLogger("ondepi.test")
+    for index in range(100):
+        logger.info("message %d", index)
+    shutdown_logging()
+
+    assert sorted(item.name for item in tmp_path.iterdir()) == ["ondepi.log", "ondepi.log.1", "ondepi.log.2"]
+    assert path.stat().st_size <= 1024
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ("numpy", "sounddevice", "fastapi", "uvicorn")
+
+
+def test_check_config_never_imports_audio_stack(tmp_path):
+    config = tmp_path / "config.toml"
+    config.write_text('[stream]\nserver = "example.com"\nmount = "live"\n')
+    code = (
+        "import sys\n"
+        "from ondepi.main import main\n"
+        "try:\n"
+        f"    main(['--config', {str(config)!r}, '--check-config'])\n"
+        "except SystemExit as exc:\n"
+        "    code = exc.code\n"
+        f"print(code, [name for name in {HEAVY_MODULES!r} if name in sys.modules])\n"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    assert result.stdout.strip().splitlines()[-1] == "0 []"
+
+
+def test_check_config_reports_errors(tmp_path, capsys):
+    from ondepi.main import check_config
+
+    config = tmp_path / "config.toml"
+    config.write_text('[stream]\nformat = "flac"\n')
+    assert check_config(config) == 1
+    assert "stream.format" in capsys.readouterr().out
@@ -0,0 +1,63 @@
+import asyncio
+
+import numpy as np
+
+from ondepi.config import InputConfig, MonitorConfig
+from ondepi.monitor import MonitorStream
+
+
+def test_monitor_wav_listeners_share_one_feed():
+    monitor = MonitorStream(MonitorConfig(format="wav"), InputConfig(sample_rate=8000, channels=2))
+    block = np.full((80, 2), 0.5, dtype=np.float32)
+
+    async def scenario():
+        first = monitor.listen()
+        second = monitor.listen()
+        header = await first.__anext__()
+        await second.__anext__()
+        assert header[:4] == b"RIFF"
+        assert monitor.status()["listeners"] == 2
+        monitor.consume(block)
+        chunk_a = await asyncio.wait_for(first.__anext__(), timeout=2)
+        chunk_b = await asyncio.wait_for(second.__anext__(), timeout=2)
+        assert chunk_a == chunk_b
+        assert len(chunk_a) == 80 * 2 * 2
+        await first.aclose()
+        await second.aclose()
+
+    asyncio.run(scenario())
+    status = monitor.status()
+    assert status["listeners"] == 0
+    assert status["running"] is False
+
+
+def test_failed_encoder_start_does_not_wedge_later_listeners(monkeypatch):
+    import sys
+
+    import pytest
+
+    monitor = MonitorStream(MonitorConfig(format="mp3"), InputConfig(sample_rate=8000, channels=2))
+    monkeypatch.setattr("ondepi.monitor.build_monitor_command", lambda *_: ["/nonexistent/ffmpeg"])
+
+    async def first_listener():
+        with pytest.raises(OSError):
+            await monitor.listen().__anext__()
+
+    asyncio.run(first_listener())
+    assert monitor.status()["listeners"] == 0 and monitor.status()["running"] is False
+
+    # Stand-in encoder that echoes its input.
+    echo = [sys.executable, "-c", "import os\nwhile data := os.read(0, 65536):\n    os.write(1, data)"]
+    monkeypatch.setattr("ondepi.monitor.build_monitor_command", lambda *_: echo)
+
+    async def second_listener():
+        stream = monitor.listen()
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.2)
+        monitor.consume(np.full((80, 2), 0.5, dtype=np.float32))
+        data = await asyncio.wait_for(pending, timeout=5)
+        await stream.aclose()
+        return data
+
+    assert len(asyncio.run(second_listener())) > 0
+    assert monitor.status()["running"] is False
@@ -0,0 +1,49 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from ondepi.reconnect import (
+    AUTH,
+    CODEC,
+    MOUNT_IN_USE,
+    NETWORK,
+    RETRY_POLICIES,
+    UNKNOWN,
+    classify_exit,
+    probe_server,
+)
+
+
+def test_classify_exit():
+    assert classify_exit(1, "icecast://...: HTTP error 401 Unauthorized") == AUTH
+    assert classify_exit(1, "Server returned 403 Forbidden (access denied)") == MOUNT_IN_USE
+    assert classify_exit(1, "Connection to tcp://radio:8000 failed: Connection refused") == NETWORK
+    assert classify_exit(1, "Unknown encoder 'libfdk_aac'") == CODEC
+    assert classify_exit(-9, "") == UNKNOWN
+    assert not RETRY_POLICIES[AUTH].retry
+    assert RETRY_POLICIES[NETWORK].probe
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_HEAD(self):  # noqa: N802
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_probe_server():
+    server = HTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert probe_server("127.0.0.1", server.server_port) is None
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        free_port = sock.getsockname()[1]
+    assert probe_server("127.0.0.1", free_port, timeout=0.5) is not None
@@ -0,0 +1,43 @@
+import os
+import time
+import wave
+
+import numpy as np
+
+from ondepi.config import InputConfig, RecorderConfig
+from ondepi.recorder import ArchiveRecorder, apply_retention
+
+
+def test_recorder_rotates_segments(tmp_path):
+    config = RecorderConfig(enabled=True, directory=str(tmp_path), segment_seconds=1, buffer_kib=4)
+    input_cfg = InputConfig(sample_rate=8000, channels=2)
+    recorder = ArchiveRecorder(config, input_cfg)
+    recorder.start()
+    block = np.full((1000, 2), 0.25, dtype=np.float32)
+    for _ in range(20):
+        recorder.consume(block)
+    recorder.stop()
+
+    segments = sorted(tmp_path.glob("ondepi-*.wav"))
+    assert len(segments) == 3
+    frames = []
+    for path in segments:
+        with wave.open(str(path)) as handle:
+            assert handle.getnchannels() == 2
+            assert handle.getframerate() == 8000
+            frames.append(handle.getnframes())
+    assert sorted(frames) == [4000, 8000, 8000]
+    assert recorder.status()["blocks_dropped"] == 0
+
+
+def test_apply_retention(tmp_path):
+    now = time.time()
+    for index in range(4):
+        path = tmp_path / f"ondepi-{index}.wav"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (now - (4 - index) * 3600, now - (4 - index) * 3600))
+
+    assert apply_retention(tmp_path, max_age_seconds=3.5 * 3600, max_bytes=0, now=now) == 1
+    assert apply_retention(tmp_path, max_age_seconds=0, max_bytes=200, now=now) == 1
+    remaining = sorted(path.name for path in tmp_path.glob("ondepi-*.wav"))
+    assert remaining == ["ondepi-2.wav", "ondepi-3.wav"]
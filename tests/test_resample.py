@@ -0,0 +1,31 @@
+import numpy as np
+
+from ondepi.resample import PolyphaseResampler
+
+
+def _sine(rate, seconds, frequency=1000.0):
+    t = np.arange(int(rate * seconds)) / rate
+    return (0.5 * np.sin(2 * np.pi * frequency * t)).astype(np.float32)[:, None].repeat(2, axis=1)
+
+
+def test_streaming_matches_one_shot():
+    signal = _sine(48000, 1.0)
+    whole = PolyphaseResampler(48000, 44100, 2).process(signal)
+
+    streaming = PolyphaseResampler(48000, 44100, 2)
+    rng = np.random.default_rng(3)
+    parts, index = [], 0
+    while index < signal.shape[0]:
+        size = int(rng.integers(1, 1500))
+        parts.append(streaming.process(signal[index : index + size]))
+        index += size
+    assert len(whole) == 44100
+    np.testing.assert_allclose(np.concatenate(parts), whole, atol=1e-6)
+
+
+def test_resampled_sine_is_accurate():
+    resampler = PolyphaseResampler(48000, 44100, 2, quality="high")
+    output = resampler.process(_sine(48000, 0.5))
+    t = (np.arange(output.shape[0]) - resampler.delay_frames) / 44100
+    expected = 0.5 * np.sin(2 * np.pi * 1000.0 * t)
+    assert np.max(np.abs(output[1000:, 0] - expected[1000:])) < 1e-3
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+from ondepi.config import AppConfig, SchedulingConfig, validation_issues
+from ondepi.scheduling import apply_capture_policy, apply_policy
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="Linux only")
+def test_apply_policy_reports_current_thread():
+    cpus = sorted(os.sched_getaffinity(0))
+    report = apply_policy(cpus[:1], 0, 0)
+    assert report["cpus"] == cpus[:1]
+    assert report["policy"] == "other"
+    assert report["errors"] == []
+    # Only the calling thread was pinned, not the whole process.
+    apply_policy(cpus, 0, 0)
+
+
+def test_apply_policy_degrades_without_privileges():
+    if os.geteuid() == 0:
+        pytest.skip("root may be allowed SCHED_FIFO")
+    report = apply_capture_policy(SchedulingConfig(capture_realtime_priority=50))
+    assert report["policy"] == "other"
+    assert any("SCHED_FIFO" in error for error in report["errors"])
+
+
+def test_scheduling_validation():
+    config = AppConfig.from_dict(
+        {"scheduling": {"capture_realtime_priority": 120, "encoder_cpus": [-1]}}
+    )
+    fields = {issue["field"] for issue in validation_issues(config)}
+    assert "scheduling.capture_realtime_priority" in fields
+    assert "scheduling.encoder_cpus" in fields
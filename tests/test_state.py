@@ -0,0 +1,73 @@
+import asyncio
+import dataclasses
+import threading
+
+import pytest
+
+from ondepi.state import LevelState, StreamState
+
+
+def test_update_swaps_in_a_new_versioned_snapshot():
+    state = StreamState()
+    before = state.snapshot
+    after = state.update(streaming=True, last_exit_code=None)
+    assert after.version == before.version + 1
+    assert state.snapshot is after
+    assert before.streaming is False
+    assert state.streaming is True
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        after.streaming = False
+
+
+def test_rejects_direct_assignment_and_unknown_fields():
+    state = StreamState()
+    with pytest.raises(AttributeError):
+        state.streaming = True
+    with pytest.raises(AttributeError):
+        state.update(bogus=1)
+    assert state.version == 0
+
+
+def test_modify_is_atomic_across_threads():
+    state = StreamState()
+
+    def bump() -> None:
+        for _ in range(500):
+            state.modify(lambda current: {"retry_count": current.retry_count + 1})
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert state.retry_count == 2000
+    assert state.version == 2000
+
+
+def test_subscription_delivers_latest_and_filters_fields():
+    state = StreamState()
+    with state.subscribe(fields=["streaming"]) as subscription:
+        assert subscription.get(timeout=0.1).version == 0
+        state.update(levels=LevelState(rms=0.1, peak=0.2))
+        assert subscription.get(timeout=0.05) is None
+        state.update(streaming=True)
+        state.update(streaming=False, last_error="boom")
+        latest = subscription.get(timeout=0.1)
+        assert latest.version == 3
+        assert latest.last_error == "boom"
+    assert subscription.get(timeout=0.05) is None
+
+
+def test_subscription_next_wakes_event_loop_from_other_thread():
+    state = StreamState()
+
+    async def consume() -> int:
+        subscription = state.subscribe()
+        await subscription.next()
+        timer = threading.Timer(0.05, lambda: state.update(gain_db=3.0))
+        timer.start()
+        snapshot = await asyncio.wait_for(subscription.next(), timeout=2)
+        subscription.close()
+        return snapshot.gain_db
+
+    assert asyncio.run(consume()) == 3.0
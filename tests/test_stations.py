@@ -0,0 +1,84 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from ondepi.config import AppConfig, StationConfig
+from ondepi.stations import StationError, StationSupervisor
+
+
+def test_supervisor_round_trip():
+    config = AppConfig.from_dict({"stream": {"server": "example.com", "mount": "live"}})
+    config.stations = [StationConfig(id="a", input={"alsa_device": "hw:99,0"})]
+    supervisor = StationSupervisor(config)
+    supervisor.start()
+    try:
+        assert supervisor.request("a", "gain", gain_db=3.0)["gain_db"] == 3.0
+        status = supervisor.status("a")
+        assert status["alive"] is True
+        assert status["state"]["gain_db"] == 3.0
+        assert status["device"]["device"] == "hw:99,0"
+    finally:
+        supervisor.stop()
+    assert supervisor.status("a")["alive"] is False
+
+
+class _AliveProcess:
+    pid = 0
+
+    def is_alive(self):
+        return True
+
+
+def test_late_reply_is_not_taken_for_the_next_answer(monkeypatch):
+    monkeypatch.setattr("ondepi.stations.COMMAND_TIMEOUT_SECONDS", 0.2)
+    config = AppConfig.from_dict({})
+    config.stations = [StationConfig(id="a")]
+    supervisor = StationSupervisor(config)
+    worker = supervisor._workers["a"]
+    worker.conn, child = multiprocessing.Pipe()
+    worker.process = _AliveProcess()
+
+    def respond():
+        while True:
+            try:
+                message = child.recv()
+            except (EOFError, OSError):
+                return
+            if message["command"] == "stop":
+                time.sleep(0.4)  # e.g. ffmpeg taking its time to exit
+            child.send({"id": message["id"], "answer": message["command"]})
+
+    threading.Thread(target=respond, daemon=True).start()
+    with pytest.raises(StationError):
+        supervisor.request("a", "stop")
+    time.sleep(0.3)  # the late "stop" reply is now waiting in the pipe
+    assert supervisor.request("a", "status") == {"answer": "status"}
+
+
+def test_config_edits_reach_running_workers():
+    config = AppConfig.from_dict({"stream": {"server": "example.com", "mount": "live"}})
+    config.stations = [StationConfig(id="a", input={"alsa_device": "hw:99,0"})]
+    supervisor = StationSupervisor(config)
+    supervisor.start()
+    try:
+        pid = supervisor.status("a")["pid"]
+        edited = AppConfig.from_dict(config.to_dict())
+        edited.stations[0].stream = {"bitrate_kbps": 96}
+        edited.stations.append(StationConfig(id="b", input={"alsa_device": "hw:98,0"}))
+        assert supervisor.update_config(edited) == {"added": ["b"], "removed": [], "restarted": [], "updated": ["a"]}
+        status = supervisor.status("a")
+        assert status["pid"] == pid
+        assert status["stream"]["bitrate_kbps"] == 96
+        assert supervisor.status("b")["alive"] is True
+
+        moved = AppConfig.from_dict(edited.to_dict())
+        moved.stations = [moved.stations[1]]
+        moved.stations[0].cpu_affinity = [0]
+        changes = supervisor.update_config(moved)
+        assert changes == {"added": [], "removed": ["a"], "restarted": ["b"], "updated": []}
+        assert supervisor.station_ids() == ["b"]
+        assert supervisor.status("b")["applied_affinity"] in ([0], None)
+    finally:
+        supervisor.stop()
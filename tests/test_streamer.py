@@ -1,7 +1,281 @@
-from ondepi.streamer import _retry_delay
+from ondepi.config import AppConfig
+from ondepi.state import StreamState
+from ondepi.streamer import Streamer, _retry_delay
 
 
 def test_retry_delay_caps():
     assert _retry_delay(1, 3, 30) == 3
     assert _retry_delay(2, 3, 30) == 6
     assert _retry_delay(5, 3, 10) == 10
+
+
+def test_low_latency_flags():
+    config = AppConfig.from_dict({"stream": {"server": "icecast", "mount": "live", "low_latency": True}})
+    command = Streamer(config, StreamState()).build_ffmpeg_command()
+    assert command.index("nobuffer") < command.index("-i")
+    assert command[command.index("-flush_packets") + 1] == "1"
+    assert command[-1].startswith("icecast://")
+
+
+class _ExitedProcess:
+    def __init__(self, stderr):
+        import io
+        import os
+
+        self.stderr = io.BytesIO(stderr)
+        self.stdout = None
+        self.stdin = None
+        self.pid = os.getpid()
+        self.returncode = 1
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def terminate(self):
+        pass
+
+
+def test_auth_failure_is_not_retried(monkeypatch):
+    from ondepi.config import JournalConfig
+    from ondepi.journal import EventJournal
+
+    spawned = []
+
+    def fake_popen(command, **kwargs):
+        spawned.append(command)
+        return _ExitedProcess(b"HTTP error 401 Unauthorized")
+
+    monkeypatch.setattr("ondepi.streamer.subprocess.Popen", fake_popen)
+    config = AppConfig.from_dict({"stream": {"server": "icecast", "mount": "live"}})
+    state = StreamState()
+    journal = EventJournal(JournalConfig())
+    streamer = Streamer(config, state, journal=journal)
+    streamer.start()
+    streamer._monitor_thread.join(timeout=5)
+
+    assert len(spawned) == 1
+    assert state.last_exit_class == "auth"
+    assert [event.kind for event in journal.query()] == ["stream.start", "stream.exit", "stream.giveup"]
+
+
+class _FakeEngine:
+    def __init__(self):
+        self.consumers = []
+
+    def add_consumer(self, consumer):
+        self.consumers.append(consumer)
+
+    def remove_consumer(self, consumer):
+        self.consumers.remove(consumer)
+
+    def replace_consumer(self, old, new):
+        self.consumers[self.consumers.index(old)] = new
+
+
+def test_watchdog_kills_stalled_encoder(monkeypatch):
+    import sys
+    import time
+
+    import numpy as np
+
+    config = AppConfig.from_dict(
+        {
+            "general": {"reconnect": False, "stall_timeout_seconds": 0.5},
+            "stream": {"server": "icecast", "mount": "live"},
+        }
+    )
+    state = StreamState()
+    engine = _FakeEngine()
+    streamer = Streamer(config, state, audio_engine=engine)
+    # An "encoder" that never reads its input nor reports progress.
+    stuck = [sys.executable, "-c", "import time; time.sleep(30)"]
+    monkeypatch.setattr(streamer, "build_ffmpeg_command", lambda meter_fd=None: stuck)
+    streamer.start()
+    block = np.zeros((4096, 2), dtype=np.float32)
+    deadline = time.monotonic() + 10
+    while streamer.status()["stalls"] == 0 and time.monotonic() < deadline:
+        for consumer in list(engine.consumers):
+            consumer(block)
+        time.sleep(0.02)
+    streamer._monitor_thread.join(timeout=5)
+
+    status = streamer.status()
+    assert status["stalls"] == 1
+    assert status["last_stall"]["detection_latency_seconds"] >= 0.5
+    assert state.last_exit_class == "network"
+    assert not engine.consumers
+
+
+def test_dsp_offload_filter_graph():
+    config = AppConfig.from_dict(
+        {"input": {"limiter_drive": 2.0}, "stream": {"server": "icecast", "mount": "live", "dsp": "ffmpeg"}}
+    )
+    state = StreamState()
+    state.update(gain_db=-3.0)
+    command = Streamer(config, state).build_ffmpeg_command(meter_fd=7)
+    graph = command[command.index("-filter_complex") + 1]
+    assert command[command.index("-f") + 1] == "alsa"
+    assert command[command.index("-map") + 1] == "[out]"
+    assert graph.startswith("[0:a]volume@gain=volume=-3.00dB")
+    assert "alimiter@limiter=level_in=2:" in graph
+    assert "asetnsamples=n=4410" in graph and r"file=pipe\:7:direct=1," in graph
+
+
+def test_meter_lines_become_levels():
+    from ondepi.streamer import _parse_meter
+
+    pending = {}
+    lines = [
+        b"frame:3    pts:13230   pts_time:0.3\n",
+        b"lavfi.astats.Overall.Peak_level=-6.020600\n",
+        b"lavfi.astats.Overall.RMS_level=-20.000000\n",
+        b"frame:4    pts:17640   pts_time:0.4\n",
+        b"lavfi.astats.Overall.Peak_level=-inf\n",
+    ]
+    parsed = [_parse_meter(pending, line) for line in lines]
+    levels = parsed[2]
+    assert abs(levels.rms - 0.1) < 1e-6 and abs(levels.peak - 0.5) < 1e-4
+    assert parsed[:2] == [None, None] and parsed[3:] == [None, None]
+
+
+# Stand-in ffmpeg: reports one meter window on the inherited fd, then logs stdin commands.
+OFFLOAD_ENCODER = """
+import os, sys
+fd, log = int(sys.argv[1]), sys.argv[2]
+os.write(fd, b"frame:0 pts:0 pts_time:0\\nlavfi.astats.Overall.Peak_level=-6.0206\\n"
+             b"lavfi.astats.Overall.RMS_level=-20\\n")
+os.close(fd)
+with open(log, "w") as out:
+    for line in sys.stdin:
+        out.write(line)
+        out.flush()
+"""
+
+
+def test_dsp_offload_meters_and_live_gain(tmp_path):
+    import sys
+    import time
+
+    config = AppConfig.from_dict(
+        {
+            "general": {"reconnect": False, "stall_timeout_seconds": 0},
+            "stream": {"server": "icecast", "mount": "live", "dsp": "ffmpeg"},
+        }
+    )
+    state = StreamState()
+    streamer = Streamer(config, state)
+    log = tmp_path / "commands"
+    streamer.build_ffmpeg_command = lambda meter_fd=None: [sys.executable, "-c", OFFLOAD_ENCODER, str(meter_fd), str(log)]
+    streamer.start()
+    try:
+        deadline = time.monotonic() + 5
+        while state.levels.rms == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        state.update(gain_db=4.5)
+        while not (log.exists() and log.read_text()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        status = streamer.status()
+    finally:
+        streamer.stop()
+
+    assert abs(state.levels.rms - 0.1) < 1e-6
+    assert log.read_text() == "cvolume@gain -1 volume 4.50dB\n"
+    assert status["dsp"] == "ffmpeg" and status["input"] == "alsa"
+
+
+# Stand-in ffmpeg: copies stdin to <dir>/<kbps>.pcm; the 256k one reads like a congested uplink.
+LADDER_ENCODER = """
+import sys, time
+kbps, directory = sys.argv[1], sys.argv[2]
+with open(f"{directory}/{kbps}.pcm", "ab") as out:
+    while data := sys.stdin.buffer.read(65536):
+        out.write(data)
+        out.flush()
+        if kbps == "256":
+            time.sleep(0.1)
+"""
+
+
+def test_adaptive_bitrate_rebuilds_encoder_without_losing_blocks(monkeypatch, tmp_path):
+    import sys
+    import time
+
+    import numpy as np
+
+    from ondepi.config import JournalConfig
+    from ondepi.journal import EventJournal
+
+    monkeypatch.setattr("ondepi.streamer.ADAPTIVE_INTERVAL_SECONDS", 0.05)
+    config = AppConfig.from_dict(
+        {
+            "general": {"reconnect": False, "stall_timeout_seconds": 0},
+            "stream": {"server": "icecast", "mount": "live", "bitrate_kbps": 256},
+            "adaptive_bitrate": {
+                "enabled": True,
+                "ladder_kbps": [128, 64],
+                "max_backlog_blocks": 8,
+                "down_after_seconds": 0.1,
+            },
+        }
+    )
+    state = StreamState()
+    journal = EventJournal(JournalConfig())
+    engine = _FakeEngine()
+    streamer = Streamer(config, state, audio_engine=engine, journal=journal)
+    streamer.build_ffmpeg_command = lambda meter_fd=None: [
+        sys.executable,
+        "-c",
+        LADDER_ENCODER,
+        str(streamer._bitrate_kbps()),
+        str(tmp_path),
+    ]
+    blocks = 60
+    block_bytes = 8192 * 2 * 4  # one pipe buffer, so a slow reader backs up the queue
+    streamer.start()
+    try:
+        for index in range(blocks):
+            for consumer in list(engine.consumers):
+                consumer(np.full((8192, 2), index, dtype=np.float32))
+            time.sleep(0.01)
+        deadline = time.monotonic() + 10
+        files = [tmp_path / "256.pcm", tmp_path / "128.pcm"]
+        while sum(f.stat().st_size for f in files if f.exists()) < blocks * block_bytes:
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+        status = streamer.status()
+    finally:
+        streamer.stop()
+
+    received = np.concatenate([np.fromfile(f, dtype=np.float32) for f in files]).reshape(blocks, -1)
+    assert received[:, 0].tolist() == list(range(blocks))
+    assert (tmp_path / "256.pcm").stat().st_size > 0
+    assert status["bitrate_kbps"] == 128 and status["running"]
+    (step,) = status["adaptive_bitrate"]["steps"]
+    assert step["reason"] == "congested" and step["backlog_blocks"] >= 8
+    kinds = [event.kind for event in journal.query()]
+    assert kinds[:3] == ["stream.start", "stream.bitrate", "stream.start"]
+    assert "stream.exit" not in kinds
+
+
+def test_encode_speed_uses_report_arrival_times():
+    from collections import deque
+
+    from ondepi.streamer import _window_speed
+
+    # ffmpeg reports every 0.5 s at real time; the watcher samples once a second, off phase.
+    reports = [(0.5 * index + 0.013 * (index % 3), 0.5 * index) for index in range(40)]
+    samples = deque()
+    speeds = []
+    for tick in range(1, 19):
+        now = tick + 0.37
+        latest = [report for report in reports if report[0] <= now][-1]
+        if not samples or samples[-1] != latest:
+            samples.append(latest)
+        speed = _window_speed(samples, now)
+        if speed is not None:
+            speeds.append(speed)
+    assert speeds and all(0.99 <= speed <= 1.02 for speed in speeds)  # never below RECOVER_SPEED
+    assert samples[-1][0] - samples[0][0] <= 6.0
+
+    # Reports stop while the watcher keeps sampling: speed falls instead of freezing.
+    assert _window_speed(samples, samples[-1][0] + 5.0) < 0.6
@@ -0,0 +1,79 @@
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ondepi.top import ApiConnection, Screen, render
+
+STATUS = {
+    "state": {
+        "streaming": True,
+        "gain_db": 3.0,
+        "retry_count": 2,
+        "last_exit_class": "network",
+        "last_error": None,
+        "levels": {"rms": 0.1, "peak": 0.5},
+    },
+    "stream": {"running": True, "encoder": "ffmpeg", "bytes_accepted": 3 * 1024 * 1024, "stalls": 1},
+    "device": {"status": "connected", "device": "hw:1,0", "sample_rate": 44100, "capture_rate": 48000},
+}
+
+
+def test_render_shows_meters_encoder_and_errors():
+    errors = [{"ts": 0, "kind": "stream.exit", "message": "ffmpeg exited with code 1"}]
+    lines = render("http://pi:8090", STATUS, errors, 80)
+    text = "\n".join(lines)
+    assert "[ON AIR]" in lines[0]
+    assert "+3.0 dB" in text and "retries 2 (last: network)" in text
+    assert "-20.0 dBFS" in text and "-6.0 dBFS" in text
+    assert "sent 3.0 MiB" in text and "stalls 1" in text
+    assert "48000 Hz -> 44100 Hz" in text
+    assert "ffmpeg exited with code 1" in text
+
+
+def test_screen_rewrites_only_changed_lines():
+    out = io.StringIO()
+    screen = Screen(out)
+    first = screen.draw(["a", "b", "c"], 80)
+    assert screen.draw(["a", "b", "c"], 80) == 0
+    second = screen.draw(["a", "B", "c"], 80)
+    assert 0 < second < first
+    assert out.getvalue().endswith("\x1b[2;1HB\x1b[K")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # noqa: N802
+        self._reply(STATUS)
+
+    def do_POST(self):  # noqa: N802
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        self._reply({"ok": True, **payload})
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_requests_share_one_connection():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api = ApiConnection(f"http://127.0.0.1:{server.server_port}")
+    try:
+        for _ in range(5):
+            assert api.request("GET", "/api/status")["state"]["gain_db"] == 3.0
+        assert api.request("POST", "/api/gain", {"gain_db": 4.0})["gain_db"] == 4.0
+        assert api.connections == 1
+    finally:
+        api.close()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,73 @@
+import time
+
+import numpy as np
+import pytest
+
+from ondepi.audio import AudioEngine
+from ondepi.config import InputConfig
+from ondepi.state import StreamState
+from ondepi.trace import TRACER, Tracer, now_ns
+
+
+@pytest.fixture
+def tracer():
+    TRACER.configure(True, 1024)
+    yield TRACER
+    TRACER.configure(False, 0)
+
+
+def test_ring_keeps_the_latest_spans():
+    tracer = Tracer()
+    tracer.configure(True, 4)
+    names = [tracer.name_id(f"test.{index}") for index in range(6)]
+    for name in names:
+        tracer.span(name, now_ns())
+    events = tracer.chrome_trace(60)["traceEvents"]
+    spans = [event["name"] for event in events if event["ph"] == "X"]
+    assert spans == ["test.2", "test.3", "test.4", "test.5"]
+
+
+def test_export_window_and_event_format():
+    tracer = Tracer()
+    tracer.configure(True, 16)
+    tracer.mark("stream.spawn")
+    time.sleep(0.2)
+    started = now_ns() - 2_000_000
+    tracer.span(tracer.name_id("audio.gain"), started)
+    tracer.mark("stream.exit")
+
+    trace = tracer.chrome_trace(0.1)
+    events = [event for event in trace["traceEvents"] if event["ph"] != "M"]
+    assert [event["name"] for event in events] == ["audio.gain", "stream.exit"]
+    span, instant = events
+    assert span["cat"] == "audio" and span["dur"] >= 2000 and span["ts"] == started / 1000
+    assert instant["ph"] == "i" and instant["s"] == "t"
+    (thread,) = [event for event in trace["traceEvents"] if event["ph"] == "M"]
+    assert thread["args"]["name"] == "MainThread"
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    tracer.configure(False, 16)
+    tracer.mark("stream.start")
+    assert tracer.chrome_trace(60)["traceEvents"] == []
+
+
+def test_callback_stages_are_traced(tracer):
+    engine = AudioEngine(InputConfig(channels=2), StreamState())
+    received = []
+
+    def recorder(block):
+        time.sleep(0.001)
+        received.append(block)
+
+    engine.add_consumer(recorder)
+    engine._callback(np.zeros((256, 2), dtype=np.float32), 256, None, None)
+
+    events = {event["name"]: event for event in tracer.chrome_trace(5)["traceEvents"] if event["ph"] == "X"}
+    consumer = events["audio.consumer.test_callback_stages_are_traced.recorder"]
+    callback = events["audio.callback"]
+    assert consumer["dur"] >= 1000
+    for stage in ("audio.gain", "audio.clipper", "audio.meter"):
+        assert callback["ts"] <= events[stage]["ts"] <= consumer["ts"]
+    assert consumer["ts"] + consumer["dur"] <= callback["ts"] + callback["dur"]
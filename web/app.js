@@ -23,6 +23,8 @@ async function fetchDevices() {
   return payload;
 }
 
+const RESTART_NOTICE = 'Saved. Restart OndePi to switch between single- and multi-station mode.';
+
 async function updateConfig(method, payload) {
   const response = await fetch('/api/config', {
     method,
@@ -53,6 +55,15 @@ async function setGain(gainDb) {
   });
 }
 
+async function probeLatency() {
+  const response = await fetch('/api/latency-probe', { method: 'POST' });
+  const payload = await response.json().catch(() => ({}));
+  if (!response.ok) {
+    throw new Error(payload.detail || 'Latency probe failed');
+  }
+  return payload;
+}
+
 async function testInput() {
   const response = await fetch('/api/test-input', { method: 'POST' });
   if (!response.ok) {
@@ -62,16 +73,185 @@ async function testInput() {
   return response.json();
 }
 
+const MAX_EVENTS = 100;
+let lastEventSeq = 0;
+
+async function fetchEvents(since) {
+  const response = await fetch(`/api/events?since=${since}`);
+  if (!response.ok) {
+    return null;
+  }
+  return response.json();
+}
+
+async function pollEvents() {
+  const payload = await fetchEvents(lastEventSeq);
+  if (!payload) {
+    return;
+  }
+  const list = document.getElementById('events');
+  payload.events.forEach((event) => {
+    const item = document.createElement('li');
+    const time = document.createElement('span');
+    time.className = 'event-time';
+    time.textContent = new Date(event.ts * 1000).toLocaleString();
+    const kind = document.createElement('span');
+    kind.className = 'event-kind';
+    kind.textContent = event.kind;
+    item.append(time, kind, document.createTextNode(event.message));
+    list.prepend(item);
+    lastEventSeq = Math.max(lastEventSeq, event.seq);
+  });
+  while (list.children.length > MAX_EVENTS) {
+    list.removeChild(list.lastChild);
+  }
+}
+
+async function fetchStations() {
+  const response = await fetch('/api/stations');
+  if (!response.ok) {
+    return null;
+  }
+  return response.json();
+}
+
+async function stationAction(stationId, action) {
+  await fetch(`/api/stations/${encodeURIComponent(stationId)}/stream/${action}`, { method: 'POST' });
+  pollStations();
+}
+
+function stationButton(label, stationId, action, className) {
+  const button = document.createElement('button');
+  button.textContent = label;
+  if (className) {
+    button.className = className;
+  }
+  button.addEventListener('click', () => stationAction(stationId, action));
+  return button;
+}
+
+async function pollStations() {
+  const payload = await fetchStations();
+  const panel = document.getElementById('stations-panel');
+  if (!payload) {
+    panel.classList.add('hidden');
+    return false;
+  }
+  panel.classList.remove('hidden');
+  const body = document.getElementById('stations');
+  body.innerHTML = '';
+  payload.stations.forEach((station) => {
+    const state = station.state || {};
+    const row = document.createElement('tr');
+    const cells = [
+      station.id,
+      station.alive ? `pid ${station.pid}` : 'down',
+      state.streaming ? 'Yes' : 'No',
+      station.restarts,
+      state.last_error || station.error || '—',
+    ];
+    cells.forEach((value) => {
+      const cell = document.createElement('td');
+      cell.textContent = value;
+      row.appendChild(cell);
+    });
+    const actions = document.createElement('td');
+    actions.append(
+      stationButton('Start', station.id, 'start'),
+      stationButton('Stop', station.id, 'stop', 'secondary'),
+    );
+    row.appendChild(actions);
+    body.appendChild(row);
+  });
+  return true;
+}
+
 function updateMeter(element, value) {
   const percent = Math.max(0, Math.min(1, value)) * 100;
   element.style.width = `${percent}%`;
 }
 
+function renderSourceMeters(sources) {
+  const container = document.getElementById('source-meters');
+  if (container.childElementCount !== sources.length) {
+    container.innerHTML = '';
+    sources.forEach((source) => {
+      const label = document.createElement('label');
+      label.textContent = `Input ${source.channel}`;
+      const meter = document.createElement('div');
+      meter.className = 'meter';
+      const bar = document.createElement('div');
+      bar.className = 'bar';
+      meter.appendChild(bar);
+      const row = document.createElement('div');
+      row.append(label, meter);
+      container.appendChild(row);
+    });
+  }
+  sources.forEach((source, index) => {
+    updateMeter(container.children[index].querySelector('.bar'), source.peak);
+  });
+}
+
+async function fetchSpectrum() {
+  const response = await fetch('/api/spectrum', { cache: 'no-store' });
+  if (!response.ok) {
+    return { status: response.status, bands: null };
+  }
+  return { status: response.status, bands: new Uint8Array(await response.arrayBuffer()) };
+}
+
+function drawSpectrum(canvas, bands) {
+  const ctx = canvas.getContext('2d');
+  const { width, height } = canvas;
+  ctx.clearRect(0, 0, width, height);
+  const barWidth = width / bands.length;
+  ctx.fillStyle = getComputedStyle(document.documentElement).getPropertyValue('--accent');
+  bands.forEach((value, index) => {
+    const barHeight = (value / 255) * height;
+    ctx.fillRect(index * barWidth, height - barHeight, Math.max(barWidth - 1, 1), barHeight);
+  });
+}
+
+let spectrumTimer = null;
+
+function startSpectrum() {
+  if (spectrumTimer !== null) {
+    return;
+  }
+  const canvas = document.getElementById('spectrum');
+  let busy = false;
+  spectrumTimer = setInterval(async () => {
+    if (busy || document.hidden) {
+      return;
+    }
+    busy = true;
+    try {
+      const { status, bands } = await fetchSpectrum();
+      if (status === 404) {
+        // Analysis is disabled; polling resumes once a saved config enables it.
+        clearInterval(spectrumTimer);
+        spectrumTimer = null;
+      } else if (bands) {
+        drawSpectrum(canvas, bands);
+      }
+    } finally {
+      busy = false;
+    }
+  }, 40);
+}
+
+let loadedConfig = {};
+
 function renderConfigForm(config) {
   const container = document.getElementById('config-form');
   container.innerHTML = '';
+  loadedConfig = config;
 
   Object.entries(config).forEach(([sectionName, sectionValue]) => {
+    if (Array.isArray(sectionValue)) {
+      return; // [[stations]] tables are edited in config.toml
+    }
     const section = document.createElement('div');
     section.className = 'config-section';
 
@@ -103,6 +283,14 @@ function renderConfigForm(config) {
       } else if (typeof value === 'boolean') {
         input.type = 'checkbox';
         input.checked = value;
+      } else if (Array.isArray(value) && value.some(Array.isArray)) {
+        input.type = 'text';
+        input.value = JSON.stringify(value);
+        input.dataset.kind = 'json';
+      } else if (Array.isArray(value)) {
+        input.type = 'text';
+        input.value = value.join(', ');
+        input.dataset.kind = 'list';
       } else {
         input.type = 'text';
         input.value = value ?? '';
@@ -130,6 +318,11 @@ function getFieldTooltip(section, key) {
 function collectConfigFromForm() {
   const inputs = Array.from(document.querySelectorAll('#config-form input'));
   const result = {};
+  Object.entries(loadedConfig).forEach(([sectionName, sectionValue]) => {
+    if (Array.isArray(sectionValue)) {
+      result[sectionName] = sectionValue;
+    }
+  });
 
   inputs.forEach((input) => {
     const path = input.dataset.path.split('.');
@@ -140,8 +333,17 @@ function collectConfigFromForm() {
       current = current[key];
     }
     const key = path[path.length - 1];
+    const looksLikeJson = input.value.trim().startsWith('[');
     if (input.type === 'checkbox') {
       current[key] = input.checked;
+    } else if (input.dataset.kind === 'json' || (input.dataset.kind === 'list' && looksLikeJson)) {
+      current[key] = JSON.parse(input.value || '[]');
+    } else if (input.dataset.kind === 'list') {
+      current[key] = input.value
+        .split(',')
+        .map((item) => item.trim())
+        .filter((item) => item !== '')
+        .map(Number);
     } else if (input.type === 'number') {
       const parsed = input.value === '' ? 0 : Number(input.value);
       current[key] = Number.isNaN(parsed) ? 0 : parsed;
@@ -153,23 +355,53 @@ function collectConfigFromForm() {
   return result;
 }
 
-async function poll() {
-  const status = await fetchStatus();
-  if (!status) {
+let stateEvents = null;
+let renderedVersion = -1;
+
+function renderState(state) {
+  if (state.version <= renderedVersion) {
     return;
   }
-  const state = status.state;
-  const configValidation = document.getElementById('config-validation');
-  const setupPanel = document.getElementById('setup-panel');
-  const setupIssues = document.getElementById('setup-issues');
+  renderedVersion = state.version;
   document.getElementById('streaming').textContent = state.streaming ? 'Yes' : 'No';
   document.getElementById('started').textContent = state.started_at || '—';
   document.getElementById('retry-count').textContent = state.retry_count ?? 0;
-  document.getElementById('last-retry').textContent = state.last_retry_at || '—';
+  document.getElementById('last-retry').textContent = state.last_retry_at
+    ? `${state.last_retry_at}${state.last_exit_class ? ` (${state.last_exit_class})` : ''}`
+    : '—';
   document.getElementById('error').textContent = state.last_error || '—';
   document.getElementById('gain-value').textContent = `${state.gain_db.toFixed(1)} dB`;
   updateMeter(document.getElementById('rms'), state.levels.rms);
   updateMeter(document.getElementById('peak'), state.levels.peak);
+  updateMeter(document.getElementById('device-rms'), state.levels.rms);
+  updateMeter(document.getElementById('device-peak'), state.levels.peak);
+}
+
+function subscribeState() {
+  if (!window.EventSource) {
+    return;
+  }
+  stateEvents = new EventSource('/api/state/events');
+  stateEvents.onmessage = (event) => renderState(JSON.parse(event.data));
+  stateEvents.onerror = () => {
+    // Fall back to polling until the browser reconnects.
+    if (stateEvents.readyState === EventSource.CLOSED) {
+      stateEvents = null;
+    }
+  };
+}
+
+async function poll() {
+  const status = await fetchStatus();
+  if (!status) {
+    return;
+  }
+  if (!stateEvents) {
+    renderState(status.state);
+  }
+  const configValidation = document.getElementById('config-validation');
+  const setupPanel = document.getElementById('setup-panel');
+  const setupIssues = document.getElementById('setup-issues');
   const device = status.device;
   if (device) {
     document.getElementById('device-status').textContent = device.status || '—';
@@ -177,9 +409,21 @@ async function poll() {
     document.getElementById('device-name').textContent = device.device || '—';
     const limiter = device.limiter_enabled ? `On (${device.limiter_drive})` : 'Off';
     document.getElementById('device-limiter').textContent = limiter;
+    renderSourceMeters(device.sources || []);
+    const fallback = device.fallback || {};
+    document.getElementById('device-fallback').textContent = !fallback.enabled
+      ? 'Off'
+      : fallback.active
+        ? `On air: ${fallback.source} (${fallback.reason || 'fading out'})`
+        : `Standby (${fallback.source || '—'})`;
+  }
+  const monitor = status.monitor;
+  if (monitor) {
+    document.getElementById('monitor-listeners').textContent = monitor.listeners;
+    document.getElementById('monitor-latency').textContent = monitor.running
+      ? `${Math.round(monitor.latency_ms)} ms`
+      : '—';
   }
-  updateMeter(document.getElementById('device-rms'), state.levels.rms);
-  updateMeter(document.getElementById('device-peak'), state.levels.peak);
   if (status.config && !status.config.valid) {
     configValidation.textContent = status.config.errors.join('\n');
     setupPanel.classList.remove('hidden');
@@ -229,6 +473,22 @@ async function init() {
     setGain(value);
   });
 
+  const monitorAudio = document.getElementById('monitor-audio');
+  const monitorToggle = document.getElementById('monitor-toggle');
+  monitorToggle.addEventListener('click', () => {
+    if (monitorAudio.getAttribute('src')) {
+      monitorAudio.pause();
+      monitorAudio.removeAttribute('src');
+      monitorAudio.load();
+      monitorToggle.textContent = 'Listen';
+      return;
+    }
+    // A fresh URL always joins the live edge instead of a stale buffer.
+    monitorAudio.src = `/api/monitor?t=${Date.now()}`;
+    monitorAudio.play().catch(() => {});
+    monitorToggle.textContent = 'Stop listening';
+  });
+
   const configError = document.getElementById('config-error');
 
   const deviceSelect = document.getElementById('device-select');
@@ -277,7 +537,13 @@ async function init() {
     configError.textContent = '';
     try {
       const payload = collectConfigFromForm();
-      await updateConfig('PUT', payload);
+      const result = await updateConfig('PUT', payload);
+      if (payload.analysis?.enabled) {
+        startSpectrum();
+      }
+      if (result.restart_required) {
+        configError.textContent = RESTART_NOTICE;
+      }
     } catch (error) {
       configError.textContent = error.message;
     }
@@ -287,7 +553,13 @@ async function init() {
     configError.textContent = '';
     try {
       const payload = collectConfigFromForm();
-      await updateConfig('PATCH', payload);
+      const result = await updateConfig('PATCH', payload);
+      if (payload.analysis?.enabled) {
+        startSpectrum();
+      }
+      if (result.restart_required) {
+        configError.textContent = RESTART_NOTICE;
+      }
     } catch (error) {
       configError.textContent = error.message;
     }
@@ -295,6 +567,21 @@ async function init() {
 
   document.getElementById('config-reload').addEventListener('click', reloadConfig);
 
+  const latencyButton = document.getElementById('latency-probe');
+  const latencyResult = document.getElementById('latency-result');
+  latencyButton.addEventListener('click', async () => {
+    latencyButton.disabled = true;
+    latencyResult.textContent = 'Measuring…';
+    try {
+      const result = await probeLatency();
+      latencyResult.textContent = result.detected ? `${result.latency_ms} ms` : 'Marker not detected';
+    } catch (error) {
+      latencyResult.textContent = error.message;
+    } finally {
+      latencyButton.disabled = false;
+    }
+  });
+
   const testButton = document.getElementById('test-input');
   const testError = document.getElementById('test-error');
   testButton.addEventListener('click', async () => {
@@ -308,8 +595,15 @@ async function init() {
     }
   });
 
+  subscribeState();
   setInterval(poll, 1500);
   poll();
+  setInterval(pollEvents, 3000);
+  pollEvents();
+  if (await pollStations()) {
+    setInterval(pollStations, 3000);
+  }
+  startSpectrum();
 }
 
 init();